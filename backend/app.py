@@ -1,20 +1,44 @@
-from fastapi import FastAPI, Depends, HTTPException, Header, Request
+from fastapi import FastAPI, Depends, HTTPException, Header, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
+from fastapi.responses import StreamingResponse
+from fastapi.routing import APIRoute, APIRouter, APIWebSocketRoute
+from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 import bcrypt
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
+from contextlib import asynccontextmanager
 import os
 
 # Tamamı paket içi relative olsun:
 from backend.settings import settings
-from backend.database import get_db, init_db
+from backend.database import get_db, get_readonly_db, init_db
+from backend.rate_limit import charge, limiter
+from backend.sweeper import sweeper
+from backend.credential_expiry import credential_expirer, credential_expires_at, backfill_expires_at
+from backend.credential_export import stream_legacy_list
+from backend.credential_fields import field_reindexer
+from backend.audit import audit_sink, audit_row, log_audit, log_audit_many, backfill_structured_columns
+from backend.verification import (
+    verify_vcs, verify_cache, revoked_ids, expired_ids, vc_identifier, issuer_trusted, check_holder, HOLDER_ERROR_STATUS,
+    presentation_vcs, presentation_outcome, presentation_receipt,
+)
+from backend.issuer_registry import issuer_registry, TRUSTED_ISSUER_STATUSES
+from backend.offline_bundle import export_bundle
+from backend.challenge_store import challenge_store
+from backend.revocation_index import revocation_index
+from backend.server_keys import public_jwks
+from backend.http_cache import collection_validators, conditional_response, make_etag
+from backend.tmp_payloads import tmp_payload_store
+from backend.read_cache import status_cache, recipient_cache, tmp_payload_cache, read_cache_metrics
+from backend.audit_archive import audit_archiver, list_segments
+from backend.issuer_counters import counter_reconciler
+from backend.issuer_rollups import rollup_rebuilder
 from backend.schemas import (
     HealthResp, ChallengeReq, ChallengeResp,
     VerifyReq, VerifyResp,
+    VerifyBatchReq, VerifyBatchItem, VerifyBatchResp,
     RevokeReq, RevokeResp,
     AdminLoginReq, AdminLoginResp,
     IssuerRegisterReq, IssuerRegisterResp,
@@ -45,31 +69,60 @@ from backend.schemas import (
     IssuerVerifyDomainReq, IssuerVerifyDomainResp,
 )
 from backend.core.crypto_ed25519 import Ed25519Signer, b64u_d
-from backend.core.vc import verify_vc
+from backend.core import compact
 from backend.core.vc_crypto import VCEncryptor, generate_encryption_key
 from backend.core.profile_crypto import get_profile_encryptor
 from backend.oauth_endpoints import router as oauth_router
-from backend.issuer_endpoints import router as issuer_router
+from backend.issuer_endpoints import router as issuer_router, list_issuer_credentials
 from backend.payment_endpoints import router as payment_router
 from backend.mock_provider_routes import router as mock_provider_router
+from backend.kiosk import router as kiosk_router
 
 import time, secrets, base64
 import hashlib, os, json
-from typing import Optional
+from typing import List, Optional
 import dns.resolver
 import httpx
 import pyotp
 
-app = FastAPI(title=settings.APP_NAME)
-
-# Rate limiting
-limiter = Limiter(key_func=get_remote_address)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The production launcher (serve.py) runs schema work in the master process
+    if settings.SCHEMA_INIT_ON_STARTUP:
+        await init_db()
+    await issuer_registry.load()
+    issuer_registry.start()
+    await audit_sink.start()
+    await tmp_payload_store.start()
+    if settings.SWEEPER_ENABLED:
+        sweeper.start()
+        credential_expirer.start()
+    if settings.AUDIT_ARCHIVE_ENABLED:
+        audit_archiver.start()
+    counter_reconciler.start()
+    rollup_rebuilder.start()
+    yield
+    await field_reindexer.stop()
+    await rollup_rebuilder.stop()
+    await counter_reconciler.stop()
+    await audit_archiver.stop()
+    await credential_expirer.stop()
+    await sweeper.stop()
+    # Flush queued audit rows and payloads before the worker exits
+    await tmp_payload_store.stop()
+    await audit_sink.stop()
+    await issuer_registry.stop()
+
+
+app = FastAPI(title=settings.APP_NAME, lifespan=lifespan)
+
+# Rate limiting (shared SQLite storage, see rate_limit.py)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 app.add_middleware(SlowAPIMiddleware)
 
 API = settings.API_PREFIX
-ALLOWED_ISSUER_STATUSES = ("approved", "verified")
+ALLOWED_ISSUER_STATUSES = TRUSTED_ISSUER_STATUSES
 WALLET_OPTIONAL_ENDPOINTS = {
     ("POST", f"{API}/user/did-link"),
     ("GET", f"{API}/user/profile"),
@@ -102,17 +155,19 @@ app.add_middleware(
 )
 
 
-@app.on_event("startup")
-async def _startup():
-    await init_db()
-
-
 # ---------- health ----------
 @app.get(f"{API}/health", response_model=HealthResp)
 async def health():
     return HealthResp()
 
 
+# ---------- server keys ----------
+@app.get("/.well-known/worldpass-keys.json")
+async def server_jwks():
+    """Public keys of the server signing key (offline bundles, receipts)"""
+    return public_jwks()
+
+
 # ---------- challenge ----------
 @app.post(f"{API}/challenge/new", response_model=ChallengeResp)
 async def new_challenge(body: ChallengeReq, db=Depends(get_db)):
@@ -120,22 +175,39 @@ async def new_challenge(body: ChallengeReq, db=Depends(get_db)):
     now = int(time.time())
     exp = now + min(body.exp_secs, settings.CHALLENGE_TTL_SECONDS)
 
-    await db.execute(
-        "INSERT OR REPLACE INTO used_nonces(nonce, created_at, expires_at) VALUES(?,?,?)",
-        (nonce, now, exp),
-    )
-    await db.execute(
-        "INSERT INTO audit_logs(ts, action, result, meta) VALUES(?,?,?,?)",
-        (now, "challenge", "ok", json.dumps({"aud": body.audience})),
-    )
+    await challenge_store.put(db, nonce, now, exp)
+    await log_audit(db, "challenge", "ok", meta={"aud": body.audience}, ts=now)
     await db.commit()
 
     return ChallengeResp(challenge=nonce, nonce=nonce, expires_at=exp)
 
 
 # ---------- /present/verify ----------
+async def _burn_nonce(db, ch: str) -> None:
+    # Başarısız denemeler de challenge'ı yakar (replay denemesine ikinci şans yok)
+    await challenge_store.consume(db, ch)
+    await db.commit()
+
+
+async def _presentation_body(request: Request) -> dict:
+    """JSON gövde ya da kompakt ikili kodlama (Content-Type: application/vnd.worldpass+cbor, core/compact.py)"""
+    body = await request.body()
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    try:
+        payload = compact.decode(body) if content_type == compact.MEDIA_TYPE else json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bad_body")
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=400, detail="bad_body")
+    return payload
+
+
 @app.post(f"{API}/present/verify", response_model=VerifyResp)
-async def present_verify(payload: dict, db=Depends(get_db)):
+async def present_verify(
+    payload: dict = Depends(_presentation_body),
+    receipt: bool = Query(False),
+    db=Depends(get_db),
+):
     """
     Holder'dan gelen presentation payload'ını doğrular.
 
@@ -153,6 +225,17 @@ async def present_verify(payload: dict, db=Depends(get_db)):
       },
       "vc": { ... imzalı VC ... }
     }
+
+    Birden fazla VC tek holder imzasıyla sunulabilir: "vc" yerine
+    "vcs": [ {...}, {...} ] gönderilir. Bu durumda VC başına sonuçlar
+    `results` alanında döner; challenge yine tek kez tüketilir.
+
+    `?receipt=true` ile yanıta sunucu anahtarıyla imzalı, kısa ömürlü bir
+    doğrulama makbuzu (JWS) eklenir; açık anahtar
+    /.well-known/worldpass-keys.json adresinde yayınlanır.
+
+    Gövde JSON yerine kompakt ikili kodlamayla da gönderilebilir
+    (Content-Type: application/vnd.worldpass+cbor, bkz. core/compact.py).
     """
     now = int(time.time())
 
@@ -167,28 +250,23 @@ async def present_verify(payload: dict, db=Depends(get_db)):
     if not isinstance(ch, str) or not ch:
         raise HTTPException(status_code=400, detail="missing_challenge")
 
-    # 2) Nonce / replay kontrolü (DB truth)
-    row = await db.execute_fetchone(
-        "SELECT nonce, expires_at FROM used_nonces WHERE nonce=?", (ch,)
-    )
-    if not row:
-        await db.execute(
-            "INSERT INTO audit_logs(ts, action, did_issuer, did_subject, result, meta) "
-            "VALUES(?,?,?,?,?,?)",
-            (now, "present_verify", "", "", "fail",
-             json.dumps({"reason": "replay_or_invalid_nonce"})),
-        )
+    try:
+        multi, vcs = presentation_vcs(payload)
+    except ValueError as e:
+        raise HTTPException(status_code=413 if str(e) == "too_many_vcs" else 400, detail=str(e))
+
+    # 2) Nonce / replay kontrolü (challenge store truth)
+    expires_at = await challenge_store.get(db, ch)
+    if expires_at is None:
+        await log_audit(db, "present_verify", "fail",
+                        meta={"reason": "replay_or_invalid_nonce"}, ts=now)
         await db.commit()
         raise HTTPException(status_code=409, detail="replay_or_invalid_nonce")
 
-    if row["expires_at"] < now:
-        await db.execute("DELETE FROM used_nonces WHERE nonce=?", (ch,))
-        await db.execute(
-            "INSERT INTO audit_logs(ts, action, did_issuer, did_subject, result, meta) "
-            "VALUES(?,?,?,?,?,?)",
-            (now, "present_verify", "", "", "fail",
-             json.dumps({"reason": "nonce_expired"})),
-        )
+    if expires_at < now:
+        await challenge_store.consume(db, ch)
+        await log_audit(db, "present_verify", "fail",
+                        meta={"reason": "nonce_expired"}, ts=now)
         await db.commit()
         raise HTTPException(status_code=409, detail="nonce_expired")
 
@@ -196,106 +274,48 @@ async def present_verify(payload: dict, db=Depends(get_db)):
     if exp is not None:
         try:
             exp_int = int(exp)
-            if exp_int != row["expires_at"]:
-                # çok katı olmasın dersen bu bloğu kaldırabilirsin
-                await db.execute("DELETE FROM used_nonces WHERE nonce=?", (ch,))
-                await db.commit()
-                raise HTTPException(status_code=400, detail="exp_mismatch")
         except Exception:
-            await db.execute("DELETE FROM used_nonces WHERE nonce=?", (ch,))
-            await db.commit()
+            await _burn_nonce(db, ch)
             raise HTTPException(status_code=400, detail="bad_exp")
+        if exp_int != expires_at:
+            # çok katı olmasın dersen bu bloğu kaldırabilirsin
+            await _burn_nonce(db, ch)
+            raise HTTPException(status_code=400, detail="exp_mismatch")
+
+    # 3) VC imzalarını ve issuer bilgisini doğrula (worker pool'da paralel)
+    verdicts = await verify_vcs(vcs, signer)
+    for vc, (ok, reason, issuer, subject) in zip(vcs, verdicts):
+        if not ok:
+            await challenge_store.consume(db, ch)
+            await log_audit(db, "present_verify", "fail",
+                            did_issuer=issuer, did_subject=subject, vc_id=vc_identifier(vc),
+                            meta={"reason": "vc_sig"}, ts=now)
+            await db.commit()
+            raise HTTPException(status_code=401, detail="invalid_vc_signature")
 
-    # 3) VC imzasını ve issuer bilgisini doğrula
-    vc = payload.get("vc") or {}
-    ok, reason, issuer, subject = verify_vc(vc, signer)
-    if not ok:
-        await db.execute("DELETE FROM used_nonces WHERE nonce=?", (ch,))
-        await db.execute(
-            "INSERT INTO audit_logs(ts, action, did_issuer, did_subject, result, meta) "
-            "VALUES(?,?,?,?,?,?)",
-            (now, "present_verify", issuer or "", subject or "", "fail",
-             json.dumps({"reason": "vc_sig"})),
-        )
-        await db.commit()
-        raise HTTPException(status_code=401, detail="invalid_vc_signature")
-
-    # 4) Revocation kontrolü (vc_status tablosı)
-    jti = vc.get("jti")
-    revoked = False
-    if jti:
-        r2 = await db.execute_fetchone(
-            "SELECT status FROM vc_status WHERE vc_id=?", (jti,)
-        )
-        if r2 and r2["status"] == "revoked":
-            revoked = True
-
-    # 5) Holder bilgisi + DID / subject uyumu
-    holder = payload.get("holder") or {}
-    holder_did = holder.get("did") or ""
-    holder_pk_b64u = holder.get("pk_b64u") or ""
-    holder_sig_b64u = holder.get("sig_b64u") or ""
-    alg = holder.get("alg") or "Ed25519"
-
-    if not (holder_did and holder_pk_b64u and holder_sig_b64u):
-        await db.execute("DELETE FROM used_nonces WHERE nonce=?", (ch,))
-        await db.commit()
-        raise HTTPException(status_code=400, detail="missing_holder")
-
-    if alg != "Ed25519":
-        await db.execute("DELETE FROM used_nonces WHERE nonce=?", (ch,))
-        await db.commit()
-        raise HTTPException(status_code=400, detail="unsupported_alg")
+    # 4-5) Holder bilgisi, DID / subject uyumu ve holder imzası (challenge|aud|exp)
+    holder_error = check_holder(payload, vcs, signer)
+    if holder_error:
+        await _burn_nonce(db, ch)
+        raise HTTPException(status_code=HOLDER_ERROR_STATUS.get(holder_error, 400), detail=holder_error)
 
-    subject_did = (vc.get("credentialSubject") or {}).get("id", "") or ""
-    if subject_did != holder_did:
-        await db.execute("DELETE FROM used_nonces WHERE nonce=?", (ch,))
+    # 6) Nonce'i tüket: aynı challenge ile eşzamanlı gelen ikinci istek burada elenir
+    if not await challenge_store.consume(db, ch):
         await db.commit()
-        raise HTTPException(status_code=400, detail="subject_holder_mismatch")
-
-    # DID ↔ pk uyumu (senin önceki mantığı koruyorum)
-    expected_did = f"did:key:z{holder_pk_b64u}"
-    if expected_did != holder_did:
-        await db.execute("DELETE FROM used_nonces WHERE nonce=?", (ch,))
-        await db.commit()
-        raise HTTPException(status_code=400, detail="did_pk_mismatch")
+        raise HTTPException(status_code=409, detail="replay_or_invalid_nonce")
 
-    # 6) Holder imzası: challenge|aud|exp formatı
-    try:
-        pk = b64u_d(holder_pk_b64u)
-        sig = b64u_d(holder_sig_b64u)
-
-        # Frontend Present.jsx ile birebir aynı mesaj:
-        # const parts = [req.challenge, req.aud || "", req.exp ? String(req.exp) : ""].join("|");
-        # msgBytes = enc.encode(parts);
-        parts = [
-            ch,
-            aud or "",
-            str(exp) if exp is not None else "",
-        ]
-        msg = "|".join(parts).encode("utf-8")
-
-        signer.verify(pk, msg, sig)
-    except Exception:
-        await db.execute("DELETE FROM used_nonces WHERE nonce=?", (ch,))
-        await db.commit()
-        raise HTTPException(status_code=401, detail="bad_holder_signature")
+    # 7) Revocation ve süre kontrolü (vc_status / issued_vcs.expires_at, tüm VC'ler için tek sorgu)
+    vc_ids = [vc_identifier(vc) for vc in vcs]
+    revoked_set = await revoked_ids(db, vc_ids)
+    expired_set = await expired_ids(db, vc_ids, now)
 
-    # 7) Nonce'i tüket, audit log yaz, sonucu döndür
-    await db.execute("DELETE FROM used_nonces WHERE nonce=?", (ch,))
-    result = "revoked" if revoked else "ok"
-    await db.execute(
-        "INSERT INTO audit_logs(ts, action, did_issuer, did_subject, result, meta) "
-        "VALUES(?,?,?,?,?,?)",
-        (now, "present_verify", issuer or "", subject or "", result,
-         json.dumps({"revoked": revoked})),
-    )
+    # 8) Audit log yaz, sonucu döndür
+    resp, audit_rows = presentation_outcome("present_verify", vcs, verdicts, revoked_set, multi, now, expired_set)
+    await log_audit_many(db, audit_rows)
     await db.commit()
-
-    if revoked:
-        return VerifyResp(valid=False, reason="revoked", issuer=issuer, subject=subject, revoked=True)
-
-    return VerifyResp(valid=True, reason="ok", issuer=issuer, subject=subject, revoked=False)
+    if receipt:
+        resp.receipt = presentation_receipt(resp, payload, vcs, signer, now)
+    return resp
 
 
 # ---------- admin auth ----------
@@ -373,10 +393,8 @@ async def user_register(request: Request, body: UserRegisterReq, db=Depends(get_
     token = jwt.encode(to_encode, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
     
     # Audit log
-    await db.execute(
-        "INSERT INTO audit_logs(ts, action, result, meta) VALUES(?,?,?,?)",
-        (now, "user_register", "ok", json.dumps({"email": email, "user_id": user_id})),
-    )
+    await log_audit(db, "user_register", "ok", user_id=user_id,
+                    meta={"email": email, "user_id": user_id}, ts=now)
     await db.commit()
     
     return UserRegisterResp(
@@ -453,10 +471,8 @@ async def user_login(request: Request, body: UserLoginReq, db=Depends(get_db)):
     
     # Audit log
     now = int(time.time())
-    await db.execute(
-        "INSERT INTO audit_logs(ts, action, result, meta) VALUES(?,?,?,?)",
-        (now, "user_login", "ok", json.dumps({"email": email, "user_id": user["id"]})),
-    )
+    await log_audit(db, "user_login", "ok", user_id=user["id"],
+                    meta={"email": email, "user_id": user["id"]}, ts=now)
     await db.commit()
     
     return UserLoginResp(
@@ -599,9 +615,15 @@ async def user_vc_add(request: Request, body: UserVCAddReq, user=Depends(_get_cu
 
 @app.get(f"{API}/user/vcs", response_model=UserVCListResp)
 @limiter.limit("30/minute")
-async def user_vc_list(request: Request, user=Depends(_get_current_user), db=Depends(get_db)):
+async def user_vc_list(request: Request, response: Response, user=Depends(_get_current_user), db=Depends(get_db)):
     """Get all VCs for current user (decrypted from storage)"""
     expected_did = (user["did"] or "").strip()
+    etag, last_modified = await collection_validators(
+        db, "user_vcs", "user_id=? AND subject_did=?", (user["id"], expected_did), user["id"], expected_did
+    )
+    not_modified = conditional_response(request, response, etag, last_modified, private=True)
+    if not_modified:
+        return not_modified
     rows = await db.execute_fetchall(
         "SELECT id, vc_id, subject_did, vc_payload, vc_hash, created_at, updated_at FROM user_vcs WHERE user_id=? AND subject_did=? ORDER BY created_at DESC",
         (user["id"], expected_did)
@@ -857,12 +879,13 @@ async def user_rotate_did(request: Request, body: UserDidRotateReq, user=Depends
         (new_did, now, now, user["id"])
     )
 
-    await db.execute(
-        "INSERT INTO audit_logs(ts, action, did_subject, result, meta) VALUES(?,?,?,?,?)",
-        (now, "user_did_rotate", new_did, "ok", json.dumps({"user_id": user["id"], "old_did": current_did, "new_did": new_did, "revoked_vc_count": revoked_vc_count}))
-    )
+    await log_audit(db, "user_did_rotate", "ok", did_subject=new_did, user_id=user["id"],
+                    meta={"user_id": user["id"], "old_did": current_did, "new_did": new_did, "revoked_vc_count": revoked_vc_count},
+                    ts=now)
 
     await db.commit()
+    for vc_id in vc_ids:
+        status_cache.invalidate(vc_id)
     return UserDidRotateResp(ok=True, old_did=current_did, new_did=new_did, revoked_vc_count=revoked_vc_count)
 
 
@@ -915,6 +938,7 @@ async def issuer_register(body: IssuerRegisterReq, db=Depends(get_db)):
     )
     await db.commit()
     issuer_id = cur.lastrowid
+    await issuer_registry.refresh_issuer(db, issuer_id)
     return IssuerRegisterResp(status="pending", issuer_id=issuer_id, verification_code=verification_code)
 
 
@@ -947,10 +971,8 @@ async def issuer_login(body: IssuerLoginReq, db=Depends(get_db)):
     
     # Audit log
     now = int(time.time())
-    await db.execute(
-        "INSERT INTO audit_logs(ts, action, result, meta) VALUES(?,?,?,?)",
-        (now, "issuer_login", "ok", json.dumps({"email": email, "issuer_id": issuer["id"]})),
-    )
+    await log_audit(db, "issuer_login", "ok", issuer_id=issuer["id"],
+                    meta={"email": email, "issuer_id": issuer["id"]}, ts=now)
     await db.commit()
     
     return IssuerLoginResp(
@@ -1085,8 +1107,10 @@ async def issuer_verify_domain(body: IssuerVerifyDomainReq, db=Depends(get_db)):
         new_status_sql = ""
         if row["status"] == "pending":
             new_status_sql = ", status='verified'"
-        await db.execute(f"UPDATE issuers SET meta=?{new_status_sql} WHERE id=?", (json.dumps(meta), body.issuer_id))
+        await db.execute(f"UPDATE issuers SET meta=?, updated_at=?{new_status_sql} WHERE id=?",
+                         (json.dumps(meta), int(time.time()), body.issuer_id))
         await db.commit()
+        await issuer_registry.refresh_issuer(db, body.issuer_id)
         return IssuerVerifyDomainResp(verified=True, message="verification_success")
     else:
         return IssuerVerifyDomainResp(verified=False, message=error_msg or "verification_failed")
@@ -1131,9 +1155,41 @@ async def admin_approve_issuer(body: ApproveIssuerReq, db=Depends(get_db)):
         (_sha256(api_key), now, body.issuer_id),
     )
     await db.commit()
+    await issuer_registry.refresh_issuer(db, body.issuer_id)
     return ApproveIssuerResp(api_key=api_key)
 
 
+@app.post(
+    f"{API}/admin/issuers/revoke",
+    response_model=RevokeResp,
+    dependencies=[Depends(_require_admin)],
+)
+async def admin_revoke_issuer(body: ApproveIssuerReq, db=Depends(get_db)):
+    """Admin endpoint: withdraw an issuer's trust and invalidate its API key"""
+    now = int(time.time())
+    row = await db.execute_fetchone("SELECT id FROM issuers WHERE id=?", (body.issuer_id,))
+    if not row:
+        raise HTTPException(status_code=404, detail="issuer_not_found")
+
+    await db.execute(
+        "UPDATE issuers SET status='revoked', api_key_hash='', updated_at=? WHERE id=?",
+        (now, body.issuer_id),
+    )
+    await log_audit(db, "issuer_revoke_trust", "ok", issuer_id=body.issuer_id, ts=now)
+    await db.commit()
+    await issuer_registry.refresh_issuer(db, body.issuer_id)
+    return RevokeResp(status="revoked")
+
+
+@app.get(
+    f"{API}/admin/issuers/registry",
+    dependencies=[Depends(_require_admin)],
+)
+async def admin_issuer_registry_metrics():
+    """Admin endpoint: size and reload counters of the in-memory trusted issuer registry"""
+    return issuer_registry.metrics()
+
+
 @app.post(
     f"{API}/admin/migrations/backfill-payload-hash",
     dependencies=[Depends(_require_admin)],
@@ -1162,9 +1218,149 @@ async def admin_backfill_payload_hash(db=Depends(get_db)):
             print(f"Failed to backfill row {row['id']}: {e}")
     
     await db.commit()
+    recipient_cache.clear()
     return {"ok": True, "updated": updated}
 
 
+@app.post(
+    f"{API}/admin/migrations/backfill-audit-columns",
+    dependencies=[Depends(_require_admin)],
+)
+async def admin_backfill_audit_columns(after_id: int = 0, chunk_size: int = 5000, db=Depends(get_db)):
+    """Admin endpoint: populate vc_id/issuer_id/user_id of legacy audit rows from meta"""
+    result = await backfill_structured_columns(db, chunk_size=chunk_size, after_id=after_id)
+    return {"ok": True, **result}
+
+
+@app.post(
+    f"{API}/admin/migrations/backfill-expires-at",
+    dependencies=[Depends(_require_admin)],
+)
+async def admin_backfill_expires_at(after_id: int = 0, chunk_size: int = 1000, db=Depends(get_db)):
+    """Admin endpoint: populate issued_vcs.expires_at of credentials issued before it was extracted"""
+    result = await backfill_expires_at(db, chunk_size=chunk_size, after_id=after_id)
+    # Backfilled expiry times may lie behind the sweep's progress
+    await credential_expirer.rescan(db)
+    return {"ok": True, **result}
+
+
+@app.get(
+    f"{API}/admin/credentials/expiry/metrics",
+    dependencies=[Depends(_require_admin)],
+)
+async def admin_credential_expiry_metrics():
+    """Admin endpoint: progress and counters of the credential expiry sweep"""
+    return credential_expirer.metrics()
+
+
+@app.get(
+    f"{API}/admin/credentials/fields/metrics",
+    dependencies=[Depends(_require_admin)],
+)
+async def admin_credential_fields_metrics():
+    """Admin endpoint: pending and finished background rebuilds of credential_fields"""
+    return field_reindexer.metrics()
+
+
+@app.get(
+    f"{API}/admin/sweeper/metrics",
+    dependencies=[Depends(_require_admin)],
+)
+async def admin_sweeper_metrics():
+    """Admin endpoint: per-table metrics of the background expiry sweeper"""
+    return sweeper.metrics()
+
+
+@app.get(
+    f"{API}/admin/audit/metrics",
+    dependencies=[Depends(_require_admin)],
+)
+async def admin_audit_metrics():
+    """Admin endpoint: queue depth and write/drop counters of the batched audit writer"""
+    return audit_sink.metrics()
+
+
+@app.get(
+    f"{API}/admin/verify/metrics",
+    dependencies=[Depends(_require_admin)],
+)
+async def admin_verify_metrics():
+    """Admin endpoint: hit/miss counters of the signature verdict cache"""
+    return verify_cache.metrics()
+
+
+@app.get(
+    f"{API}/admin/cache/metrics",
+    dependencies=[Depends(_require_admin)],
+)
+async def admin_cache_metrics():
+    """Admin endpoint: hit, load and coalescing counters of the single-flight read caches"""
+    return read_cache_metrics()
+
+
+@app.get(
+    f"{API}/admin/tmp-payloads/metrics",
+    dependencies=[Depends(_require_admin)],
+)
+async def admin_tmp_payload_metrics():
+    """Admin endpoint: size, hit and eviction counters of the temporary payload memory tier"""
+    return tmp_payload_store.metrics()
+
+
+@app.get(
+    f"{API}/admin/audit/segments",
+    dependencies=[Depends(_require_admin)],
+)
+async def admin_audit_segments():
+    """Admin endpoint: archived monthly audit segments (without their vc_id filters)"""
+    return {"segments": list_segments(), "last_run": audit_archiver.last_run}
+
+
+@app.post(
+    f"{API}/admin/audit/archive",
+    dependencies=[Depends(_require_admin)],
+)
+async def admin_audit_archive():
+    """Admin endpoint: export closed audit months now and apply retention"""
+    return await audit_archiver.run_once()
+
+
+@app.get(
+    f"{API}/admin/issuers/counters",
+    dependencies=[Depends(_require_admin)],
+)
+async def admin_issuer_counters_metrics():
+    """Admin endpoint: state of the issuer dashboard counter reconcile job"""
+    return counter_reconciler.metrics()
+
+
+@app.post(
+    f"{API}/admin/issuers/counters/reconcile",
+    dependencies=[Depends(_require_admin)],
+)
+async def admin_issuer_counters_reconcile():
+    """Admin endpoint: recompute issuer dashboard counters now and fix drifted rows"""
+    return await counter_reconciler.run_once()
+
+
+@app.get(
+    f"{API}/admin/issuers/rollups",
+    dependencies=[Depends(_require_admin)],
+)
+async def admin_issuer_rollups_metrics():
+    """Admin endpoint: state of the issuer analytics rollup rebuild job"""
+    return rollup_rebuilder.metrics()
+
+
+@app.post(
+    f"{API}/admin/issuers/rollups/rebuild",
+    dependencies=[Depends(_require_admin)],
+)
+async def admin_issuer_rollups_rebuild(days: Optional[int] = Query(None, ge=1)):
+    """Admin endpoint: recompute the last `days` days of issuer analytics rollups now (verification counts only inside the hot audit window)"""
+    return await rollup_rebuilder.run_once(days)
+
+
 async def _get_approved_issuer_by_key(db, api_key: str):
     h = _sha256(api_key)
     row = await db.execute_fetchone(
@@ -1262,9 +1458,12 @@ async def issuer_issue(
     else:
         credential_type = str(vc_types) if vc_types else "Unknown"
 
+    # Geçerlilik sonu (expirationDate / validUntil) bir kez çıkarılır; verify ve expiry sweep bunu kullanır
+    expires_at = credential_expires_at(vc)
+
     await db.execute(
-        "INSERT INTO issued_vcs(vc_id, issuer_id, subject_did, recipient_id, payload, payload_hash, credential_type, template_id, created_at, updated_at) "
-        "VALUES(?,?,?,?,?,?,?,?,?,?)",
+        "INSERT INTO issued_vcs(vc_id, issuer_id, subject_did, recipient_id, payload, payload_hash, credential_type, template_id, expires_at, created_at, updated_at) "
+        "VALUES(?,?,?,?,?,?,?,?,?,?,?)",
         (
             jti,
             issuer["id"],
@@ -1274,6 +1473,7 @@ async def issuer_issue(
             payload_hash,
             credential_type,
             template_id,
+            expires_at,
             now,
             now,
         ),
@@ -1282,13 +1482,14 @@ async def issuer_issue(
     await db.execute(
         """
         INSERT INTO vc_status(vc_id, issuer_did, subject_did, status, reason, created_at, updated_at)
-        VALUES(?, ?, ?, 'valid', '', ?, ?)
+        VALUES(?, ?, ?, ?, '', ?, ?)
         ON CONFLICT(vc_id) DO NOTHING
         """,
         (
             jti,
             vc.get("issuer", ""),
             subject_did,
+            "expired" if expires_at is not None and expires_at <= now else "valid",
             now,
             now,
         ),
@@ -1320,6 +1521,8 @@ async def issuer_issue(
                 print(f"Failed to auto-add VC to user wallet: {e}")
 
     await db.commit()
+    status_cache.invalidate(jti)
+    recipient_cache.invalidate(recipient_id)
     # Dispatch webhook event (async, non-blocking)
     try:
         await _dispatch_webhooks(db, issuer["id"], "credential.issued", {
@@ -1374,6 +1577,7 @@ async def issuer_revoke(
         (now, body.vc_id),
     )
     await db.commit()
+    status_cache.invalidate(body.vc_id)
     
     # Dispatch webhook event for revocation
     try:
@@ -1390,9 +1594,23 @@ async def issuer_revoke(
 @app.get(f"{API}/issuer/credentials")
 async def get_issuer_credentials(
     x_token: Optional[str] = Header(None),
+    page: Optional[int] = Query(None, ge=1),
+    per_page: Optional[int] = Query(None, ge=1, le=100),
+    status: Optional[str] = Query(None),
+    template_type: Optional[str] = Query(None),
+    search: Optional[str] = Query(None),
+    date_from: Optional[int] = Query(None),
+    date_to: Optional[int] = Query(None),
+    cursor: Optional[str] = Query(None),
+    total: Optional[str] = Query(None, pattern="^(exact|estimate|none)$"),
+    field: Optional[List[str]] = Query(None, description="Indexed payload field filter: path=value, path>=value, path<=value"),
     db=Depends(get_db)
 ):
-    """Get all credentials issued by this issuer"""
+    """Get all credentials issued by this issuer
+
+    Sayfalama / filtre parametrelerinden biri verilirse istek
+    issuer_endpoints.list_issuer_credentials'a (keyset cursor) gider.
+    """
     if not x_token:
         raise HTTPException(status_code=401, detail="authentication_required")
     
@@ -1407,32 +1625,17 @@ async def get_issuer_credentials(
     issuer = await db.execute_fetchone("SELECT * FROM issuers WHERE id=?", (issuer_id,))
     if not issuer or issuer["status"] not in ALLOWED_ISSUER_STATUSES:
         raise HTTPException(status_code=403, detail="issuer_not_authorized")
+
+    listing = dict(page=page, per_page=per_page, status=status, template_type=template_type, search=search,
+                   date_from=date_from, date_to=date_to, cursor=cursor, total=total, fields=field)
+    if any(v is not None for v in listing.values()):
+        listing["page"] = page or 1
+        listing["per_page"] = per_page or 20
+        listing["total"] = total or "exact"
+        return await list_issuer_credentials(issuer, db, **listing)
     
-    # Get all issued credentials
-    rows = await db.execute_fetchall(
-        """
-        SELECT vc_id, subject_did, recipient_id, credential_type, payload_hash, template_id, created_at, updated_at
-        FROM issued_vcs 
-        WHERE issuer_id=? 
-        ORDER BY created_at DESC
-        """,
-        (issuer_id,)
-    )
-    
-    credentials = []
-    for row in rows:
-        credentials.append({
-            "vc_id": row["vc_id"],
-            "subject_did": row["subject_did"],
-            "recipient_id": row["recipient_id"],
-            "credential_type": row["credential_type"],
-            "payload_hash": row["payload_hash"],
-            "template_id": row["template_id"],
-            "created_at": row["created_at"],
-            "updated_at": row["updated_at"]
-        })
-    
-    return {"ok": True, "credentials": credentials}
+    # Parametresiz çağrı: tüm liste (eski konsol), satır satır stream edilir
+    return StreamingResponse(stream_legacy_list(issuer_id), media_type="application/json")
 
 
 # ---------- public revoke & status ----------
@@ -1520,27 +1723,33 @@ async def revoke(body: RevokeReq, db=Depends(get_db)):
             now,
         ),
     )
-    await db.execute(
-        "INSERT INTO audit_logs(ts, action, result, meta) VALUES(?,?,?,?)",
-        (now, "revoke", "ok", json.dumps({"vc_id": body.vc_id})),
-    )
+    await log_audit(db, "revoke", "ok", vc_id=body.vc_id,
+                    meta={"vc_id": body.vc_id}, ts=now)
     await db.commit()
+    status_cache.invalidate(body.vc_id)
     return RevokeResp(status="revoked")
 
 
 @app.get(f"{API}/status/{{vc_id}}")
-async def get_status(vc_id: str, db=Depends(get_db)):
-    row = await db.execute_fetchone(
-        "SELECT status, updated_at FROM vc_status WHERE vc_id=?", (vc_id,)
-    )
-    if not row:
-        return {"vc_id": vc_id, "status": "unknown"}
-    return {"vc_id": vc_id, "status": row["status"], "updated_at": row["updated_at"]}
+async def get_status(vc_id: str, request: Request, response: Response, db=Depends(get_db)):
+    async def load():
+        row = await db.execute_fetchone(
+            "SELECT status, updated_at FROM vc_status WHERE vc_id=?", (vc_id,)
+        )
+        if not row:
+            return {"vc_id": vc_id, "status": "unknown"}
+        return {"vc_id": vc_id, "status": row["status"], "updated_at": row["updated_at"]}
+
+    # Aynı VC için eşzamanlı sorgular tek DB okumasını paylaşır (read_cache.py)
+    status = await status_cache.get(vc_id, load)
+    etag = make_etag("status", vc_id, status["status"], status.get("updated_at"))
+    # Revocation must show up at once: caches revalidate on every request (no-cache)
+    return conditional_response(request, response, etag, status.get("updated_at"), revalidate=True) or status
 
 
 # ---------- temporary presentation hosting (for QR / NFC) ----------
 @app.post(f"{API}/present/upload")
-async def present_upload(payload: dict, db=Depends(get_db)):
+async def present_upload(request: Request, payload: dict = Depends(_presentation_body), db=Depends(get_db)):
     """Store a short-lived presentation payload and return a path that can be embedded into QR / NFC.
     Frontend should compose full URL as window.location.origin + returned path.
     """
@@ -1548,10 +1757,13 @@ async def present_upload(payload: dict, db=Depends(get_db)):
     ttl = 300
     exp = now + ttl
     pid = base64.urlsafe_b64encode(secrets.token_bytes(8)).decode().rstrip("=")
-    await db.execute(
-        "INSERT INTO tmp_payloads(id, payload, created_at, expires_at) VALUES(?,?,?,?)",
-        (pid, json.dumps(payload), now, exp),
-    )
+    # Gövde zaten doğrulandı; GET aynı baytları parse etmeden döndürür (tmp_payloads.py).
+    # Kompakt kodlanmış yüklemeler JSON olarak saklanır.
+    if request.headers.get("content-type", "").split(";")[0].strip().lower() == compact.MEDIA_TYPE:
+        body = json.dumps(payload, separators=(",", ":")).encode()
+    else:
+        body = await request.body()
+    await tmp_payload_store.put(db, pid, body, now, exp)
     await db.commit()
     return {"path": f"{API}/present/tmp/{pid}", "id": pid, "expires_at": exp}
 
@@ -1559,20 +1771,29 @@ async def present_upload(payload: dict, db=Depends(get_db)):
 @app.get(f"{API}/present/tmp/{{pid}}")
 async def present_get_tmp(pid: str, db=Depends(get_db)):
     now = int(time.time())
-    row = await db.execute_fetchone(
-        "SELECT payload, expires_at FROM tmp_payloads WHERE id=?", (pid,)
-    )
-    if not row:
-        raise HTTPException(status_code=404, detail="not_found")
-    if row["expires_at"] < now:
+    hit = tmp_payload_store.get(pid)
+    if hit is not None:
+        body, expires_at = hit
+    else:
+        # Başka bir worker'ın yüklediği ya da bellekten düşmüş payload: SQLite'tan oku
+        async def load():
+            return await db.execute_fetchone(
+                "SELECT payload, expires_at FROM tmp_payloads WHERE id=?", (pid,)
+            )
+
+        row = await tmp_payload_cache.get(pid, load)
+        if not row:
+            raise HTTPException(status_code=404, detail="not_found")
+        body, expires_at = row["payload"].encode("utf-8"), row["expires_at"]
+
+    if expires_at < now:
         # cleanup
         await db.execute("DELETE FROM tmp_payloads WHERE id=?", (pid,))
         await db.commit()
+        tmp_payload_store.discard(pid)
+        tmp_payload_cache.invalidate(pid)
         raise HTTPException(status_code=404, detail="expired")
-    try:
-        return json.loads(row["payload"])
-    except Exception:
-        raise HTTPException(status_code=500, detail="bad_payload")
+    return Response(content=body, media_type="application/json")
 
 
 # ---------- VC Templates management ----------
@@ -1597,8 +1818,13 @@ async def create_template(request: Request, body: VCTemplateCreateReq, user=Depe
 
 @app.get(f"{API}/user/templates", response_model=VCTemplateListResp)
 @limiter.limit("30/minute")
-async def list_templates(request: Request, user=Depends(_get_current_user), db=Depends(get_db)):
+async def list_templates(request: Request, response: Response, user=Depends(_get_current_user), db=Depends(get_db)):
     """Get all templates for current user"""
+    etag, last_modified = await collection_validators(db, "vc_templates", "user_id=?", (user["id"],), user["id"])
+    not_modified = conditional_response(request, response, etag, last_modified, private=True)
+    if not_modified:
+        return not_modified
+
     rows = await db.execute_fetchall(
         "SELECT id, name, description, vc_type, fields, created_at, updated_at FROM vc_templates WHERE user_id=? ORDER BY created_at DESC",
         (user["id"],)
@@ -1688,15 +1914,26 @@ async def delete_template(request: Request, template_id: int, user=Depends(_get_
 
 # ---------- Recipient ID lookup (QR/NFC scanning) ----------
 @app.get(f"{API}/recipient/{{recipient_id}}", response_model=RecipientLookupResp)
-async def lookup_recipient(recipient_id: str, db=Depends(get_db)):
+async def lookup_recipient(recipient_id: str, request: Request, response: Response, db=Depends(get_db)):
     """Lookup a VC by recipient ID (for QR/NFC scanning)"""
-    row = await db.execute_fetchone(
-        "SELECT vc_id, subject_did, payload, payload_hash, template_id FROM issued_vcs WHERE recipient_id=?",
-        (recipient_id,)
-    )
+    async def load():
+        return await db.execute_fetchone(
+            "SELECT vc_id, subject_did, payload, payload_hash, template_id, created_at, updated_at "
+            "FROM issued_vcs WHERE recipient_id=?",
+            (recipient_id,)
+        )
+
+    row = await recipient_cache.get(recipient_id, load)
     
     if not row:
         return RecipientLookupResp(found=False)
+
+    # payload_hash değişmedikçe gövde aynıdır: 304 için payload parse edilmez
+    last_modified = row["updated_at"] or row["created_at"]
+    etag = make_etag("recipient", row["vc_id"], row["payload_hash"] or last_modified, row["template_id"])
+    not_modified = conditional_response(request, response, etag, last_modified)
+    if not_modified:
+        return not_modified
     
     try:
         vc_payload = json.loads(row["payload"])
@@ -1724,6 +1961,9 @@ app.include_router(payment_router, prefix="/api")
 # Mount Mock Payment Provider
 app.include_router(mock_provider_router)
 
+# Mount Kiosk verifier sessions (WebSocket)
+app.include_router(kiosk_router)
+
 # ---------- simple VC verify (no presentation) ----------
 @app.post(f"{API}/vc/verify", response_model=VerifyResp)
 async def vc_verify_simple(body: VerifyReq, db=Depends(get_db)):
@@ -1734,36 +1974,119 @@ async def vc_verify_simple(body: VerifyReq, db=Depends(get_db)):
     """
     vc = body.vc
     
-    # 1) VC imzasını doğrula
-    ok, reason, issuer, subject = verify_vc(vc, signer)
+    # 1) VC imzasını doğrula (verdict cache üzerinden; revocation her seferinde taze okunur)
+    [(ok, reason, issuer, subject)] = await verify_vcs([vc], signer)
     
-    # 2) Revocation kontrolü
-    revoked = False
-    jti = vc.get("jti") or vc.get("id")
-    if jti:
-        r2 = await db.execute_fetchone(
-            "SELECT status FROM vc_status WHERE vc_id=?", (jti,)
-        )
-        if r2 and r2["status"] == "revoked":
-            revoked = True
+    # 2) Revocation ve süre kontrolü (issuance'ta çıkarılan expires_at)
+    now = int(time.time())
+    jti = vc_identifier(vc)
+    revoked = jti in await revoked_ids(db, [jti])
+    expired = ok and not revoked and jti in await expired_ids(db, [jti], now)
             
+    # 3) Issuer güven kontrolü (bellek içi issuer registry)
+    trusted = ok and issuer_trusted(vc)
+    untrusted_rejected = ok and not trusted and settings.VERIFY_REQUIRE_TRUSTED_ISSUER
+
     # Audit log (opsiyonel)
-    now = int(time.time())
-    await db.execute(
-        "INSERT INTO audit_logs(ts, action, did_issuer, did_subject, result, meta) "
-        "VALUES(?,?,?,?,?,?)",
-        (now, "vc_verify_simple", issuer or "", subject or "", "revoked" if revoked else ("ok" if ok else "fail"),
-         json.dumps({"reason": reason})),
-    )
+    await log_audit(db, "vc_verify_simple",
+                    "revoked" if revoked else ("ok" if ok and not untrusted_rejected and not expired else "fail"),
+                    did_issuer=issuer, did_subject=subject, vc_id=jti,
+                    meta={"reason": "expired" if expired else ("untrusted_issuer" if untrusted_rejected else reason)},
+                    ts=now)
     await db.commit()
 
     if not ok:
-        return VerifyResp(valid=False, reason=reason or "invalid_signature", issuer=issuer, subject=subject, revoked=False)
+        return VerifyResp(valid=False, reason=reason or "invalid_signature", issuer=issuer, subject=subject, revoked=False,
+                          issuer_trusted=False)
         
     if revoked:
-        return VerifyResp(valid=False, reason="revoked", issuer=issuer, subject=subject, revoked=True)
+        return VerifyResp(valid=False, reason="revoked", issuer=issuer, subject=subject, revoked=True,
+                          issuer_trusted=trusted)
+
+    if expired:
+        return VerifyResp(valid=False, reason="expired", issuer=issuer, subject=subject, revoked=False,
+                          issuer_trusted=trusted)
+
+    if untrusted_rejected:
+        return VerifyResp(valid=False, reason="untrusted_issuer", issuer=issuer, subject=subject, revoked=False,
+                          issuer_trusted=False)
+
+    return VerifyResp(valid=True, reason="ok", issuer=issuer, subject=subject, revoked=False, issuer_trusted=trusted)
 
-    return VerifyResp(valid=True, reason="ok", issuer=issuer, subject=subject, revoked=False)
+
+@app.post(f"{API}/vc/verify/batch", response_model=VerifyBatchResp)
+@limiter.limit("10/minute")
+async def vc_verify_batch(request: Request, body: VerifyBatchReq, db=Depends(get_db)):
+    """
+    Birden fazla VC'yi tek istekte doğrular (vc/verify'ın toplu hali).
+    İmzalar worker pool üzerinde paralel kontrol edilir, revocation durumu
+    tek sorguyla okunur, audit kayıtları tek seferde yazılır.
+    Sonuçlar girdi sırasıyla, VC başına döner.
+    İstek sayısının yanında istemci başına doğrulanan VC sayısı da
+    VERIFY_BATCH_RATE_LIMIT ile sınırlanır.
+    """
+    if len(body.vcs) > settings.VERIFY_BATCH_MAX:
+        raise HTTPException(status_code=413, detail="batch_too_large")
+    charge(request, "vc_verify_batch_items", settings.VERIFY_BATCH_RATE_LIMIT, len(body.vcs))
+
+    verdicts = await verify_vcs(body.vcs, signer)
+    vc_ids = [vc_identifier(vc) for vc in body.vcs]
+    now = int(time.time())
+    signed_ids = [vc_id for vc_id, v in zip(vc_ids, verdicts) if v[0]]
+    revoked_set = await revoked_ids(db, signed_ids)
+    expired_set = await expired_ids(db, signed_ids, now)
+
+    results = []
+    audit_rows = []
+    for index, (vc, vc_id, (ok, reason, issuer, subject)) in enumerate(zip(body.vcs, vc_ids, verdicts)):
+        revoked = ok and vc_id in revoked_set
+        trusted = ok and issuer_trusted(vc)
+        if not ok:
+            item = VerifyBatchItem(index=index, vc_id=vc_id, valid=False, reason=reason or "invalid_signature",
+                                   issuer=issuer, subject=subject, revoked=False, issuer_trusted=False)
+        elif revoked:
+            item = VerifyBatchItem(index=index, vc_id=vc_id, valid=False, reason="revoked",
+                                   issuer=issuer, subject=subject, revoked=True, issuer_trusted=trusted)
+        elif vc_id in expired_set:
+            item = VerifyBatchItem(index=index, vc_id=vc_id, valid=False, reason="expired",
+                                   issuer=issuer, subject=subject, revoked=False, issuer_trusted=trusted)
+        elif not trusted and settings.VERIFY_REQUIRE_TRUSTED_ISSUER:
+            item = VerifyBatchItem(index=index, vc_id=vc_id, valid=False, reason="untrusted_issuer",
+                                   issuer=issuer, subject=subject, revoked=False, issuer_trusted=False)
+        else:
+            item = VerifyBatchItem(index=index, vc_id=vc_id, valid=True, reason="ok",
+                                   issuer=issuer, subject=subject, revoked=False, issuer_trusted=trusted)
+        results.append(item)
+        audit_rows.append(audit_row("vc_verify_batch", "revoked" if revoked else ("ok" if item.valid else "fail"),
+                                    did_issuer=issuer, did_subject=subject, vc_id=vc_id,
+                                    meta={"reason": item.reason, "index": index}, ts=now))
+
+    await log_audit_many(db, audit_rows)
+    await db.commit()
+
+    return VerifyBatchResp(results=results, total=len(results), valid_count=sum(1 for r in results if r.valid))
+
+
+# ---------- offline verifier bundles ----------
+@app.get(f"{API}/offline/bundle")
+async def offline_bundle(db=Depends(get_db)):
+    """
+    Offline doğrulayıcılar için imzalı güven paketi (güvenilir issuer'lar +
+    geçersiz VC durumları). Format ve doğrulama: backend/core/offline.py
+    """
+    return await export_bundle(db)
+
+
+@app.get(f"{API}/offline/bundle/delta")
+async def offline_bundle_delta(since: int = Query(..., ge=0), db=Depends(get_db)):
+    """
+    `since` sequence numarasından sonraki değişiklikleri içeren imzalı delta paketi.
+    `since` sonrası değişiklikler budanmışsa 410 döner; istemci tam paketi yeniden yükler.
+    """
+    try:
+        return await export_bundle(db, since=since)
+    except ValueError as e:
+        raise HTTPException(status_code=410, detail=str(e))
 
 
 @app.post(f"{API}/auth/backup-codes/generate", response_model=BackupCodesResp)
@@ -2029,3 +2352,82 @@ async def save_user_profile_data(
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"internal_error: {str(e)}")
+
+
+# ---------- app profiles ----------
+# Routes served by the verify-only profile (kiosks, gates, edge verifier nodes)
+VERIFY_PROFILE_ROUTES = {
+    ("GET", f"{API}/health"),
+    ("GET", "/.well-known/worldpass-keys.json"),
+    ("POST", f"{API}/challenge/new"),
+    ("POST", f"{API}/present/verify"),
+    ("POST", f"{API}/vc/verify"),
+    ("POST", f"{API}/vc/verify/batch"),
+    ("GET", f"{API}/status/{{vc_id}}"),
+    ("GET", f"{API}/recipient/{{recipient_id}}"),
+    ("WS", f"{API}/kiosk/ws"),
+}
+
+
+@asynccontextmanager
+async def verify_lifespan(app: FastAPI):
+    # No schema work, sweeper or archiver: the full deployment owns the database.
+    # Audit rows go to AUDIT_STORE_URI (see create_app).
+    await audit_sink.start()
+    await issuer_registry.load()
+    issuer_registry.start()
+    await revocation_index.start()
+    yield
+    await revocation_index.stop()
+    await issuer_registry.stop()
+    await audit_sink.stop()
+
+
+def create_app(profile: Optional[str] = None) -> FastAPI:
+    """
+    Return the ASGI app for a deployment profile (APP_PROFILE by default).
+
+    'full' is the complete API above. 'verify' mounts only VERIFY_PROFILE_ROUTES,
+    serves them from read-only database connections with revocation and issuer
+    trust answered from in-memory indexes, and keeps challenges in
+    CHALLENGE_STORE_URI (a challenges.db next to the database if unset).
+    It writes nothing to the main database: audit rows go to AUDIT_STORE_URI
+    (an audit.db next to the database if unset). Point AUDIT_STORE_URI at the
+    main database (sqlite://<SQLITE_PATH>) where it is writable, so the issuer
+    verification rollups count this traffic too.
+    """
+    profile = profile or settings.APP_PROFILE
+    if profile == "full":
+        return app
+    if profile != "verify":
+        raise ValueError(f"unknown app profile: {profile}")
+
+    if not settings.CHALLENGE_STORE_URI:
+        db_dir = os.path.dirname(settings.SQLITE_PATH) or "."
+        challenge_store.configure(f"sqlite://{os.path.join(db_dir, 'challenges.db')}")
+    if not settings.AUDIT_STORE_URI:
+        db_dir = os.path.dirname(settings.SQLITE_PATH) or "."
+        audit_sink.configure(f"sqlite://{os.path.join(db_dir, 'audit.db')}")
+
+    verify_app = FastAPI(title=f"{settings.APP_NAME} (verify)", lifespan=verify_lifespan)
+    verify_app.state.limiter = limiter
+    verify_app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+    verify_app.add_middleware(SlowAPIMiddleware)
+    verify_app.add_middleware(
+        CORSMiddleware,
+        allow_origins=origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    # include_router re-creates the routes on verify_app, so they resolve
+    # dependencies through its dependency_overrides rather than app's
+    verify_routes = APIRouter()
+    for route in app.routes:
+        if isinstance(route, APIRoute) and any((m, route.path) in VERIFY_PROFILE_ROUTES for m in route.methods):
+            verify_routes.routes.append(route)
+        elif isinstance(route, APIWebSocketRoute) and ("WS", route.path) in VERIFY_PROFILE_ROUTES:
+            verify_routes.routes.append(route)
+    verify_app.include_router(verify_routes)
+    verify_app.dependency_overrides[get_db] = get_readonly_db
+    return verify_app
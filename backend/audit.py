@@ -0,0 +1,313 @@
+"""
+Audit Log
+Single write path for audit_logs rows. Besides the free-form JSON `meta`,
+each row carries indexed vc_id / issuer_id / user_id columns so history
+lookups never have to scan `meta` with LIKE.
+
+While the app is running, rows go to an in-memory AuditSink that writes
+them with executemany in one transaction every AUDIT_FLUSH_INTERVAL_MS or
+AUDIT_FLUSH_BATCH rows, keeping audit persistence off the request path.
+The sink writes to AUDIT_STORE_URI:
+
+    (empty)                 audit_logs of the main database (default)
+    sqlite:///path/to.db    audit_logs in a separate SQLite file, e.g. for
+                            verify-only nodes whose main database connection
+                            is read-only (created on first use)
+
+While the sink is not running (startup, shutdown) rows for the main
+database are inserted on the request's connection, and the caller commits.
+Rows for a separate store are dropped and counted in the sink metrics, so a
+read-only request connection is never written to.
+"""
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+import aiosqlite
+
+from backend.settings import settings
+
+AUDIT_INSERT_SQL = (
+    "INSERT INTO audit_logs(ts, action, did_issuer, did_subject, result, meta, vc_id, issuer_id, user_id) "
+    "VALUES(?,?,?,?,?,?,?,?,?)"
+)
+
+
+def audit_row(
+    action: str,
+    result: str,
+    *,
+    did_issuer: str = "",
+    did_subject: str = "",
+    vc_id: Optional[str] = None,
+    issuer_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    meta: Optional[Dict[str, Any]] = None,
+    ts: Optional[int] = None,
+) -> tuple:
+    """Build the parameter tuple for AUDIT_INSERT_SQL"""
+    return (
+        ts if ts is not None else int(time.time()),
+        action,
+        did_issuer or "",
+        did_subject or "",
+        result,
+        json.dumps(meta or {}),
+        vc_id or None,
+        issuer_id,
+        user_id,
+    )
+
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "block")
+
+# Same columns as audit_logs in database.py, for a separate AUDIT_STORE_URI file
+AUDIT_STORE_SQL = """
+PRAGMA journal_mode=WAL;
+CREATE TABLE IF NOT EXISTS audit_logs (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  ts INTEGER NOT NULL,
+  action TEXT NOT NULL,
+  did_issuer TEXT,
+  did_subject TEXT,
+  result TEXT NOT NULL,
+  meta TEXT,
+  vc_id TEXT,
+  issuer_id INTEGER,
+  user_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_audit_logs_ts ON audit_logs(ts);
+CREATE INDEX IF NOT EXISTS idx_audit_logs_vc_id_ts ON audit_logs(vc_id, ts);
+"""
+
+
+def audit_store_path(uri: str) -> str:
+    if not uri:
+        return settings.SQLITE_PATH
+    if uri.startswith("sqlite://"):
+        return uri[len("sqlite://"):]
+    raise ValueError(f"unsupported AUDIT_STORE_URI: {uri}")
+
+
+class AuditSink:
+    """Bounded in-memory queue of audit rows flushed in batches by a background task"""
+
+    def __init__(
+        self,
+        max_queue: Optional[int] = None,
+        flush_interval_ms: Optional[int] = None,
+        flush_batch: Optional[int] = None,
+        overflow_policy: Optional[str] = None,
+        uri: Optional[str] = None,
+    ):
+        self.max_queue = max_queue or settings.AUDIT_QUEUE_MAX
+        self.flush_interval = (flush_interval_ms or settings.AUDIT_FLUSH_INTERVAL_MS) / 1000
+        self.flush_batch = flush_batch or settings.AUDIT_FLUSH_BATCH
+        self.overflow_policy = overflow_policy or settings.AUDIT_OVERFLOW_POLICY
+        if self.overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"unknown audit overflow policy: {self.overflow_policy}")
+        self.configure(settings.AUDIT_STORE_URI if uri is None else uri)
+
+        self._buffer: deque = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._drained: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._conn: Optional[aiosqlite.Connection] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._stopping = False
+        self.stats = {"enqueued": 0, "written": 0, "dropped": 0, "flushes": 0, "errors": 0}
+
+    def configure(self, uri: str) -> None:
+        """Point the sink at another AUDIT_STORE_URI; takes effect on the next start()"""
+        self.path = audit_store_path(uri)
+        self.uri = uri
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done() and not self._stopping
+
+    @property
+    def separate_store(self) -> bool:
+        """True when rows do not go to the main database"""
+        return bool(self.uri)
+
+    async def start(self):
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._drained = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._stopping = False
+        self._conn = await aiosqlite.connect(self.path)
+        if self.separate_store:
+            await self._conn.executescript(AUDIT_STORE_SQL)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background task and flush everything still queued"""
+        if self._task is not None:
+            # Let an in-flight flush finish instead of cancelling it mid-write
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        if self._conn is not None:
+            while self._buffer:
+                if not await self.flush():
+                    break
+            await self._conn.close()
+            self._conn = None
+
+    async def submit(self, row: tuple) -> None:
+        if not self.running:
+            self.stats["dropped"] += 1
+            return
+        if len(self._buffer) >= self.max_queue:
+            if self.overflow_policy == "drop_newest":
+                self.stats["dropped"] += 1
+                return
+            if self.overflow_policy == "drop_oldest":
+                self._buffer.popleft()
+                self.stats["dropped"] += 1
+            else:
+                while len(self._buffer) >= self.max_queue and self.running:
+                    self._wakeup.set()
+                    self._drained.clear()
+                    await self._drained.wait()
+        self._buffer.append(row)
+        self.stats["enqueued"] += 1
+        if len(self._buffer) >= self.flush_batch:
+            self._wakeup.set()
+
+    async def flush(self) -> bool:
+        """Write all queued rows in one transaction. Returns False if the write failed."""
+        async with self._flush_lock:
+            if not self._buffer:
+                return True
+            rows = list(self._buffer)
+            self._buffer.clear()
+            try:
+                await self._conn.executemany(AUDIT_INSERT_SQL, rows)
+                await self._conn.commit()
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"Audit sink: flush of {len(rows)} rows failed: {e}")
+                # Undo the rows of this batch that did get in before re-queueing all of them
+                try:
+                    await self._conn.rollback()
+                except Exception:
+                    pass
+                # Put the rows back in front, keeping within the queue bound
+                room = max(self.max_queue - len(self._buffer), 0)
+                self._buffer.extendleft(reversed(rows[-room:] if room else []))
+                self.stats["dropped"] += len(rows) - min(room, len(rows))
+                return False
+            finally:
+                self._drained.set()
+            self.stats["written"] += len(rows)
+            self.stats["flushes"] += 1
+            return True
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Audit sink: run failed: {e}")
+
+    def metrics(self) -> dict:
+        return {
+            "running": self.running,
+            "store": self.uri or "main",
+            "queued": len(self._buffer),
+            "max_queue": self.max_queue,
+            "overflow_policy": self.overflow_policy,
+            **self.stats,
+        }
+
+
+audit_sink = AuditSink()
+
+
+async def log_audit(db: aiosqlite.Connection, action: str, result: str, **fields) -> None:
+    """Record an audit row.
+
+    Goes through the batched audit_sink while it is running. Otherwise the
+    row is inserted on `db` and the caller commits, unless the sink writes
+    to a separate store; then it is dropped and counted.
+    """
+    await log_audit_many(db, [audit_row(action, result, **fields)])
+
+
+async def log_audit_many(db: aiosqlite.Connection, rows: List[tuple]) -> None:
+    """Record several audit_row() tuples at once; same rules as log_audit"""
+    if audit_sink.running or audit_sink.separate_store:
+        for row in rows:
+            await audit_sink.submit(row)
+    elif rows:
+        await db.executemany(AUDIT_INSERT_SQL, rows)
+
+
+def _structured_fields(meta_json: Optional[str]) -> tuple:
+    try:
+        meta = json.loads(meta_json or "{}")
+    except Exception:
+        return None, None, None
+    if not isinstance(meta, dict):
+        return None, None, None
+
+    def _int(value):
+        try:
+            return int(value) if value is not None else None
+        except (TypeError, ValueError):
+            return None
+
+    return meta.get("vc_id") or None, _int(meta.get("issuer_id")), _int(meta.get("user_id"))
+
+
+async def backfill_structured_columns(db: aiosqlite.Connection, chunk_size: int = 5000, after_id: int = 0) -> Dict[str, int]:
+    """Populate vc_id / issuer_id / user_id of legacy rows from their `meta` JSON.
+
+    Walks audit_logs by primary key in chunks and commits after each chunk,
+    so it can run on a live database and be resumed from `last_id`.
+    """
+    scanned = 0
+    updated = 0
+    last_id = after_id
+    while True:
+        cur = await db.execute(
+            """
+            SELECT id, meta FROM audit_logs
+            WHERE id > ? AND vc_id IS NULL AND issuer_id IS NULL AND user_id IS NULL
+            ORDER BY id LIMIT ?
+            """,
+            (last_id, chunk_size),
+        )
+        rows = await cur.fetchall()
+        if not rows:
+            break
+
+        updates = []
+        for row in rows:
+            vc_id, issuer_id, user_id = _structured_fields(row[1])
+            if vc_id or issuer_id is not None or user_id is not None:
+                updates.append((vc_id, issuer_id, user_id, row[0]))
+
+        if updates:
+            await db.executemany(
+                "UPDATE audit_logs SET vc_id=?, issuer_id=?, user_id=? WHERE id=?", updates
+            )
+        await db.commit()
+
+        scanned += len(rows)
+        updated += len(updates)
+        last_id = rows[-1][0]
+
+    return {"scanned": scanned, "updated": updated, "last_id": last_id}
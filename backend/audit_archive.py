@@ -0,0 +1,408 @@
+"""
+Audit Log Archive
+Monthly partitioning of audit history. The hot `audit_logs` table keeps the
+current month plus AUDIT_HOT_MONTHS closed months; older months are exported
+to gzip-compressed NDJSON segments (one per month) with a small JSON index
+next to each, then deleted from the database. Segments older than
+AUDIT_RETENTION_MONTHS are removed. The export runs in a worker thread on
+its own read-only connection, so writing a month never blocks the event
+loop.
+
+query_audit() is the read facade: it serves from the hot table first and
+falls back to the archived segments whose index matches the query. An
+index records the credentials of its segment as a bloom filter (VcIdFilter,
+about 10 bits per vc_id) instead of listing them.
+"""
+import asyncio
+import base64
+import gzip
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional, Tuple
+
+import aiosqlite
+
+from backend.settings import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines run a single worker
+    fcntl = None
+
+AUDIT_COLUMNS = ("id", "ts", "action", "did_issuer", "did_subject", "result", "meta", "vc_id", "issuer_id", "user_id")
+EXPORT_CHUNK = 5000
+
+
+def _month_start(ts: int) -> datetime:
+    dt = datetime.fromtimestamp(ts, tz=timezone.utc)
+    return dt.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _add_months(dt: datetime, months: int) -> datetime:
+    index = dt.year * 12 + (dt.month - 1) + months
+    return dt.replace(year=index // 12, month=index % 12 + 1)
+
+
+def hot_window_start(now: int) -> int:
+    """Start of the oldest month audit_logs keeps; older months may only exist in archives"""
+    return int(_add_months(_month_start(now), -settings.AUDIT_HOT_MONTHS).timestamp())
+
+
+def _period(dt: datetime) -> str:
+    return f"{dt.year:04d}-{dt.month:02d}"
+
+
+def archive_dir() -> str:
+    if settings.AUDIT_ARCHIVE_DIR:
+        return settings.AUDIT_ARCHIVE_DIR
+    return os.path.join(os.path.dirname(settings.SQLITE_PATH) or ".", "audit_archive")
+
+
+class VcIdFilter:
+    """Bloom filter over the vc_ids of one segment, ~1% false positives
+
+    `in` can say a segment holds a credential it does not (the segment is
+    then scanned for nothing) but never misses one that it holds.
+    """
+
+    HASHES = 7
+    BITS_PER_ITEM = 10
+
+    def __init__(self, bits: int, data: Optional[bytearray] = None):
+        self.bits = bits
+        self.data = data if data is not None else bytearray((bits + 7) // 8)
+
+    @classmethod
+    def build(cls, vc_ids: Iterable[str]) -> "VcIdFilter":
+        vc_ids = list(vc_ids)
+        vc_filter = cls(max(64, math.ceil(len(vc_ids) * cls.BITS_PER_ITEM)))
+        for vc_id in vc_ids:
+            for position in vc_filter._positions(vc_id):
+                vc_filter.data[position // 8] |= 1 << (position % 8)
+        return vc_filter
+
+    def _positions(self, vc_id: str):
+        digest = hashlib.sha256(vc_id.encode()).digest()
+        h1, h2 = int.from_bytes(digest[:8], "big"), int.from_bytes(digest[8:16], "big") | 1
+        return ((h1 + i * h2) % self.bits for i in range(self.HASHES))
+
+    def __contains__(self, vc_id: str) -> bool:
+        return all(self.data[p // 8] & (1 << (p % 8)) for p in self._positions(vc_id))
+
+    def to_json(self) -> dict:
+        return {"bits": self.bits, "data": base64.b64encode(bytes(self.data)).decode()}
+
+    @classmethod
+    def from_json(cls, value: dict) -> "VcIdFilter":
+        return cls(value["bits"], bytearray(base64.b64decode(value["data"])))
+
+
+def _read_segments(directory: str, names: List[str]) -> List[dict]:
+    segments = []
+    for name in names:
+        try:
+            with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+                segments.append(json.load(f))
+        except Exception as e:
+            print(f"Audit archive: unreadable index {name}: {e}")
+    return segments
+
+
+class SegmentIndex:
+    """In-memory copy of the archive's .idx.json files
+
+    Indexes are parsed once and re-read only when the set of index files in
+    the archive directory changes (segments are immutable once written), so
+    a query costs one directory listing. Each segment's vc_ids are held as
+    its VcIdFilter; indexes written before the filter existed still list
+    their vc_ids and get one built on load.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state: Tuple[Optional[tuple], List[dict], List[Optional[VcIdFilter]]] = (None, [], [])
+
+    def load(self) -> Tuple[List[dict], List[Optional[VcIdFilter]]]:
+        """(segments oldest first, their vc_id filters); blocking, call off the event loop"""
+        directory = archive_dir()
+        names = sorted(n for n in os.listdir(directory) if n.endswith(".idx.json")) if os.path.isdir(directory) else []
+        key = (directory, tuple(names))
+        with self._lock:
+            if self._state[0] != key:
+                segments = _read_segments(directory, names)
+                filters: List[Optional[VcIdFilter]] = []
+                for segment in segments:
+                    if "vc_id_filter" in segment:
+                        filters.append(VcIdFilter.from_json(segment.pop("vc_id_filter")))
+                    elif "vc_ids" in segment:
+                        filters.append(VcIdFilter.build(segment.pop("vc_ids")))
+                    else:
+                        filters.append(None)
+                self._state = (key, segments, filters)
+            return self._state[1], self._state[2]
+
+
+segment_index = SegmentIndex()
+
+
+def list_segments() -> List[dict]:
+    """Return the index of every archived segment, oldest first"""
+    return list(segment_index.load()[0])
+
+
+def _segment_rows(segment: dict):
+    path = os.path.join(archive_dir(), segment["file"])
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _row_to_entry(row: dict) -> dict:
+    return {
+        "timestamp": row["ts"],
+        "action": row["action"],
+        "result": row["result"],
+        "meta": json.loads(row["meta"] or "{}"),
+    }
+
+
+async def query_audit(
+    db: aiosqlite.Connection,
+    vc_id: Optional[str] = None,
+    action: Optional[str] = None,
+    since: Optional[int] = None,
+    until: Optional[int] = None,
+    limit: int = 50,
+) -> List[dict]:
+    """Newest-first audit entries matching the filters, across hot and archived partitions"""
+    where = []
+    params: list = []
+    if vc_id is not None:
+        where.append("vc_id=?")
+        params.append(vc_id)
+    if action is not None:
+        where.append("action=?")
+        params.append(action)
+    if since is not None:
+        where.append("ts >= ?")
+        params.append(since)
+    if until is not None:
+        where.append("ts < ?")
+        params.append(until)
+    where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+
+    cur = await db.execute(
+        f"SELECT ts, action, result, meta FROM audit_logs {where_sql} ORDER BY ts DESC LIMIT ?",
+        (*params, limit),
+    )
+    rows = await cur.fetchall()
+    entries = [_row_to_entry(dict(zip(("ts", "action", "result", "meta"), r))) for r in rows]
+    if len(entries) >= limit:
+        return entries
+
+    # Older history lives in the archive; walk matching segments newest first
+    segments, filters = await asyncio.to_thread(segment_index.load)
+    if vc_id is not None:
+        segments = [seg for seg, vc_filter in zip(segments, filters) if vc_filter is None or vc_id in vc_filter]
+    for segment in reversed(segments):
+        if since is not None and segment["max_ts"] < since:
+            break
+        if until is not None and segment["min_ts"] >= until:
+            continue
+        if action is not None and action not in segment.get("actions", {}):
+            continue
+        matched = await asyncio.to_thread(
+            lambda seg=segment: [
+                r for r in _segment_rows(seg)
+                if (vc_id is None or r["vc_id"] == vc_id)
+                and (action is None or r["action"] == action)
+                and (since is None or r["ts"] >= since)
+                and (until is None or r["ts"] < until)
+            ]
+        )
+        matched.sort(key=lambda r: r["ts"], reverse=True)
+        entries.extend(_row_to_entry(r) for r in matched[: limit - len(entries)])
+        if len(entries) >= limit:
+            break
+    return entries
+
+
+def _write_segment(directory: str, base: str, period: str, start_ts: int, end_ts: int) -> dict:
+    """Export one month of audit_logs to <base>.ndjson.gz plus <base>.idx.json; blocking"""
+    tmp_path = os.path.join(directory, f"{base}.ndjson.gz.tmp")
+    digest = hashlib.sha256()
+    index = {
+        "period": period,
+        "file": f"{base}.ndjson.gz",
+        "rows": 0,
+        "min_ts": None,
+        "max_ts": None,
+        "min_id": None,
+        "max_id": None,
+        "actions": {},
+    }
+    vc_ids = set()
+
+    with closing(sqlite3.connect(f"file:{settings.SQLITE_PATH}?mode=ro", uri=True)) as conn, \
+            gzip.open(tmp_path, "wt", encoding="utf-8") as out:
+        cur = conn.execute(
+            f"SELECT {', '.join(AUDIT_COLUMNS)} FROM audit_logs WHERE ts >= ? AND ts < ? ORDER BY id",
+            (start_ts, end_ts),
+        )
+        while True:
+            rows = cur.fetchmany(EXPORT_CHUNK)
+            if not rows:
+                break
+            for r in rows:
+                record = dict(zip(AUDIT_COLUMNS, r))
+                line = json.dumps(record, separators=(",", ":")) + "\n"
+                out.write(line)
+                digest.update(line.encode())
+                index["rows"] += 1
+                index["min_ts"] = record["ts"] if index["min_ts"] is None else min(index["min_ts"], record["ts"])
+                index["max_ts"] = record["ts"] if index["max_ts"] is None else max(index["max_ts"], record["ts"])
+                index["min_id"] = record["id"] if index["min_id"] is None else index["min_id"]
+                index["max_id"] = record["id"]
+                index["actions"][record["action"]] = index["actions"].get(record["action"], 0) + 1
+                if record["vc_id"]:
+                    vc_ids.add(record["vc_id"])
+
+    os.replace(tmp_path, os.path.join(directory, index["file"]))
+    index["vc_id_filter"] = VcIdFilter.build(vc_ids).to_json()
+    index["sha256"] = digest.hexdigest()
+    index["archived_at"] = int(time.time())
+    # Readers list *.idx.json, so the index only appears once it is complete
+    index_path = os.path.join(directory, f"{base}.idx.json")
+    with open(f"{index_path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    os.replace(f"{index_path}.tmp", index_path)
+    return index
+
+
+class AuditArchiver:
+    """Exports closed monthly partitions of audit_logs and applies retention"""
+
+    def __init__(self, interval: Optional[int] = None):
+        self.interval = interval or settings.AUDIT_ARCHIVE_INTERVAL_SECONDS
+        self._task: Optional[asyncio.Task] = None
+        self.last_run: Optional[dict] = None
+
+    async def _export_period(self, conn: aiosqlite.Connection, start: datetime, end: datetime) -> Optional[dict]:
+        start_ts, end_ts = int(start.timestamp()), int(end.timestamp())
+        directory = archive_dir()
+        os.makedirs(directory, exist_ok=True)
+
+        cur = await conn.execute(
+            "SELECT MIN(id) FROM audit_logs WHERE ts >= ? AND ts < ?", (start_ts, end_ts)
+        )
+        first = await cur.fetchone()
+        if not first or first[0] is None:
+            return None
+
+        # A previous run exported these rows but stopped before deleting them all
+        for segment in await asyncio.to_thread(list_segments):
+            if segment["period"] == _period(start) and segment["min_id"] <= first[0] <= segment["max_id"]:
+                deleted = await self._delete_exported(conn, start_ts, end_ts, segment["max_id"])
+                return {"period": segment["period"], "file": segment["file"], "rows": 0, "deleted": deleted}
+
+        # Late rows for an already archived month get their own segment
+        index = await asyncio.to_thread(
+            _write_segment, directory, f"audit-{_period(start)}-{first[0]}", _period(start), start_ts, end_ts
+        )
+
+        # Only now that the segment is durable, drop the rows from the hot table
+        deleted = await self._delete_exported(conn, start_ts, end_ts, index["max_id"])
+        return {"period": index["period"], "file": index["file"], "rows": index["rows"], "deleted": deleted}
+
+    async def _delete_exported(self, conn: aiosqlite.Connection, start_ts: int, end_ts: int, max_id: int) -> int:
+        deleted = 0
+        while True:
+            cur = await conn.execute(
+                "DELETE FROM audit_logs WHERE id IN "
+                "(SELECT id FROM audit_logs WHERE ts >= ? AND ts < ? AND id <= ? LIMIT ?)",
+                (start_ts, end_ts, max_id, EXPORT_CHUNK),
+            )
+            await conn.commit()
+            deleted += cur.rowcount
+            if cur.rowcount < EXPORT_CHUNK:
+                return deleted
+
+    def _apply_retention(self, now: int) -> List[str]:
+        if settings.AUDIT_RETENTION_MONTHS <= 0:
+            return []
+        cutoff = _period(_add_months(_month_start(now), -settings.AUDIT_RETENTION_MONTHS))
+        removed = []
+        for segment in list_segments():
+            if segment["period"] >= cutoff:
+                continue
+            base = segment["file"][: -len(".ndjson.gz")]
+            for name in (segment["file"], f"{base}.idx.json"):
+                path = os.path.join(archive_dir(), name)
+                if os.path.exists(path):
+                    os.remove(path)
+            removed.append(segment["file"])
+        return removed
+
+    async def run_once(self, now: Optional[int] = None) -> dict:
+        now = now or int(time.time())
+        os.makedirs(archive_dir(), exist_ok=True)
+        lock_fd = os.open(os.path.join(archive_dir(), ".lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    # Another worker is archiving
+                    return {"skipped": True}
+
+            cutoff = datetime.fromtimestamp(hot_window_start(now), tz=timezone.utc)
+            exported = []
+            async with aiosqlite.connect(settings.SQLITE_PATH) as conn:
+                cur = await conn.execute("SELECT MIN(ts) FROM audit_logs")
+                oldest = await cur.fetchone()
+                if oldest and oldest[0] is not None:
+                    period = _month_start(oldest[0])
+                    while period < cutoff:
+                        nxt = _add_months(period, 1)
+                        result = await self._export_period(conn, period, nxt)
+                        if result:
+                            exported.append(result)
+                        period = nxt
+
+            removed = await asyncio.to_thread(self._apply_retention, now)
+            self.last_run = {"at": now, "exported": exported, "removed": removed}
+            return self.last_run
+        finally:
+            os.close(lock_fd)
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"Audit archive: run failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+audit_archiver = AuditArchiver()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark: offline credential verification throughput.
+
+Builds a sealed trust bundle in memory (50 trusted issuers and a configurable
+number of revoked credentials), loads it into an OfflineVerifier and measures
+presentation checks per second (holder signature, challenge / aud / exp,
+subject binding and the credential against the bundle), plus bundle size
+and load time.
+
+Run with:
+    python backend/benchmarks/bench_offline_verify.py [iterations] [revoked]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from backend.core.crypto_ed25519 import Ed25519Signer, b64u
+from backend.core.offline import OfflineVerifier, seal_bundle, vc_ref
+from backend.core.vc import sign_vc
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    revoked = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    signer = Ed25519Signer()
+    server_sk, server_pk = signer.generate_keypair()
+
+    issuers = []
+    for i in range(50):
+        sk, pk = signer.generate_keypair()
+        issuers.append((i, f"did:key:z{b64u(pk)}", sk, pk))
+
+    bundle = {
+        "type": "full",
+        "seq": revoked,
+        "generated_at": int(time.time()),
+        "issuers": [{"id": i, "did": did, "pk_b64u": b64u(pk), "name": f"Issuer {i}", "domain_verified": True}
+                    for i, did, _, pk in issuers],
+        "statuses": {vc_ref(f"vc-revoked-{i}"): "revoked" for i in range(revoked)},
+    }
+    started = time.perf_counter()
+    envelope = seal_bundle(bundle, signer, server_sk, "bench")
+    seal_ms = (time.perf_counter() - started) * 1000
+
+    verifier = OfflineVerifier(server_pk)
+    started = time.perf_counter()
+    verifier.load(envelope)
+    load_ms = (time.perf_counter() - started) * 1000
+
+    challenge, aud, exp = "bench-nonce", "gate-1", int(time.time()) + 3600
+    presentations = []
+    for n in range(200):
+        i, did, sk, pk = issuers[n % len(issuers)]
+        holder_sk, holder_pk = signer.generate_keypair()
+        holder_did = f"did:key:z{b64u(holder_pk)}"
+        jti = f"vc-revoked-{n}" if n % 10 == 0 else f"vc-live-{n}"
+        body = {"jti": jti, "issuer": did, "credentialSubject": {"id": holder_did, "name": f"Student {n}"}}
+        msg = "|".join([challenge, aud, str(exp)]).encode()
+        presentations.append({
+            "type": "presentation",
+            "challenge": challenge,
+            "aud": aud,
+            "exp": exp,
+            "holder": {"did": holder_did, "pk_b64u": b64u(holder_pk), "sig_b64u": b64u(signer.sign(holder_sk, msg))},
+            "vc": sign_vc(body, signer, sk, b64u(pk), f"{did}#key-1"),
+        })
+
+    started = time.perf_counter()
+    valid = 0
+    for n in range(iterations):
+        valid += verifier.verify_presentation(presentations[n % len(presentations)], challenge, aud)[0]
+    elapsed = time.perf_counter() - started
+
+    print(f"Offline verification ({iterations} presentations, {revoked} revoked credentials in bundle)")
+    print("-" * 80)
+    print(f"{'bundle size (compressed, base64url)':<40} {len(envelope['payload']) / 1024:10.1f} KiB")
+    print(f"{'seal bundle':<40} {seal_ms:10.1f} ms")
+    print(f"{'load + check bundle signature':<40} {load_ms:10.1f} ms")
+    print(f"{'verify presentation':<40} {elapsed / iterations * 1e6:8.1f} µs/vp  {iterations / elapsed:10.0f} vp/s")
+    print(f"{'valid results':<40} {valid:10d}")
+
+
+if __name__ == "__main__":
+    main()
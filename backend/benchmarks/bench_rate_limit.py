@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-request overhead of the rate limiter storage.
+
+Compares the in-process memory storage with the shared SQLite storage used
+by the API (see rate_limit.py) for the fixed and sliding window strategies.
+
+Run with:
+    python backend/benchmarks/bench_rate_limit.py [iterations]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from limits import parse
+from limits.storage import MemoryStorage
+from limits.strategies import FixedWindowRateLimiter, SlidingWindowCounterRateLimiter
+
+from backend.rate_limit import SQLiteStorage
+
+
+def bench(label, strategy, iterations):
+    limit = parse(f"{iterations * 2}/minute")
+    keys = [f"10.0.{i // 256}.{i % 256}" for i in range(100)]
+    start = time.perf_counter()
+    for i in range(iterations):
+        strategy.hit(limit, "bench", keys[i % len(keys)])
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {elapsed / iterations * 1e6:8.1f} µs/hit  {iterations / elapsed:10.0f} hits/s")
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    path = os.path.join(tempfile.mkdtemp(), "bench_ratelimit.db")
+
+    print(f"Rate limiter overhead ({iterations} hits, 100 client keys)")
+    print("-" * 80)
+    bench("memory / fixed-window", FixedWindowRateLimiter(MemoryStorage()), iterations)
+    bench("memory / sliding-window-counter", SlidingWindowCounterRateLimiter(MemoryStorage()), iterations)
+    bench("sqlite / fixed-window", FixedWindowRateLimiter(SQLiteStorage(f"sqlite://{path}")), iterations)
+    bench("sqlite / sliding-window-counter", SlidingWindowCounterRateLimiter(SQLiteStorage(f"sqlite://{path}")), iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark: compact credential codec vs JSON.
+
+Encodes a signed credential and a three-credential presentation with plain
+JSON, JSON + zlib and the compact codec (core/compact.py), and reports the
+encoded size and encode/decode time per document.
+
+Run with:
+    python backend/benchmarks/bench_vc_codec.py [iterations]
+"""
+import json
+import os
+import sys
+import time
+import zlib
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from backend.core import compact
+from backend.core.crypto_ed25519 import Ed25519Signer, b64u
+from backend.core.vc import sign_vc
+
+
+def _signed_vc(signer, n):
+    sk, pk = signer.generate_keypair()
+    did = f"did:key:z{b64u(pk)}"
+    body = {
+        "@context": ["https://www.w3.org/2018/credentials/v1"],
+        "type": ["VerifiableCredential", "StudentCard"],
+        "jti": f"vc-bench-{n}",
+        "issuer": did,
+        "issuanceDate": "2025-09-01T00:00:00Z",
+        "expirationDate": "2029-09-01T00:00:00Z",
+        "credentialSubject": {"id": f"did:key:zholder{n}", "name": f"Student {n}", "studentNumber": 2021000 + n},
+    }
+    return sign_vc(body, signer, sk, b64u(pk), f"{did}#key-1")
+
+
+def _time(fn, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    signer = Ed25519Signer()
+    vcs = [_signed_vc(signer, n) for n in range(3)]
+    documents = {
+        "single credential": vcs[0],
+        "presentation (3 VCs)": {"type": "presentation", "challenge": "Qm9uam91ci1ub25jZQ", "aud": "kampus-kapi",
+                                 "exp": 1731000000, "holder": {"did": "did:key:zholder0", "alg": "Ed25519"},
+                                 "vcs": vcs},
+    }
+
+    for name, doc in documents.items():
+        as_json = json.dumps(doc, separators=(",", ":")).encode()
+        zipped = zlib.compress(as_json, 9)
+        packed = compact.encode(doc)
+        print(f"{name} ({iterations} iterations)")
+        print("-" * 80)
+        print(f"{'codec':<16} {'bytes':>8} {'ratio':>8} {'encode µs':>12} {'decode µs':>12}")
+        rows = [
+            ("json", len(as_json), lambda: json.dumps(doc, separators=(",", ":")).encode(), lambda: json.loads(as_json)),
+            ("json+zlib", len(zipped),
+             lambda: zlib.compress(json.dumps(doc, separators=(",", ":")).encode(), 9),
+             lambda: json.loads(zlib.decompress(zipped))),
+            ("compact", len(packed), lambda: compact.encode(doc), lambda: compact.decode(packed)),
+        ]
+        for codec, size, enc, dec in rows:
+            print(f"{codec:<16} {size:8d} {size / len(as_json):8.2f} "
+                  f"{_time(enc, iterations):12.1f} {_time(dec, iterations):12.1f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
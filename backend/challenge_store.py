@@ -0,0 +1,200 @@
+"""
+Challenge Store
+Where presentation challenges (nonces) are kept between /challenge/new and
+/present/verify. Selected with CHALLENGE_STORE_URI:
+
+    (empty)                 used_nonces table of the main database (default)
+    sqlite:///path/to.db    separate SQLite file, e.g. for verify-only nodes
+                            whose main database connection is read-only
+    memory://               process memory; single-worker deployments only
+
+put_many / consume_many serve sessions that handle many challenges at once
+(see kiosk.py); consume_many returns the nonces that were still outstanding.
+
+Every method takes the request's database connection. The default store
+writes through it, so the caller's commit covers the nonce together with
+its audit row; the other stores commit on their own.
+"""
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import aiosqlite
+
+from backend.settings import settings
+
+
+class DatabaseChallengeStore:
+    """used_nonces in the main database, on the caller's connection and transaction"""
+
+    async def put(self, db: aiosqlite.Connection, nonce: str, created_at: int, expires_at: int) -> None:
+        await db.execute(
+            "INSERT OR REPLACE INTO used_nonces(nonce, created_at, expires_at) VALUES(?,?,?)",
+            (nonce, created_at, expires_at),
+        )
+
+    async def get(self, db: aiosqlite.Connection, nonce: str) -> Optional[int]:
+        """Expiry of an outstanding challenge, or None if unknown / already consumed"""
+        cur = await db.execute("SELECT expires_at FROM used_nonces WHERE nonce=?", (nonce,))
+        row = await cur.fetchone()
+        return row[0] if row else None
+
+    async def consume(self, db: aiosqlite.Connection, nonce: str) -> bool:
+        """Delete the challenge; False if somebody else consumed it first"""
+        cur = await db.execute("DELETE FROM used_nonces WHERE nonce=?", (nonce,))
+        return cur.rowcount > 0
+
+    async def put_many(self, db: aiosqlite.Connection, items: List[Tuple[str, int, int]]) -> None:
+        await db.executemany(
+            "INSERT OR REPLACE INTO used_nonces(nonce, created_at, expires_at) VALUES(?,?,?)", items
+        )
+
+    async def consume_many(self, db: aiosqlite.Connection, nonces: Iterable[str]) -> Set[str]:
+        return await _delete_returning(db, nonces)
+
+
+async def _delete_returning(conn: aiosqlite.Connection, nonces: Iterable[str]) -> Set[str]:
+    nonces = sorted(set(nonces))
+    consumed: Set[str] = set()
+    for start in range(0, len(nonces), 500):
+        chunk = nonces[start:start + 500]
+        cur = await conn.execute(
+            f"DELETE FROM used_nonces WHERE nonce IN ({','.join('?' * len(chunk))}) RETURNING nonce", chunk
+        )
+        consumed.update(r[0] for r in await cur.fetchall())
+    return consumed
+
+
+class SQLiteChallengeStore:
+    """used_nonces in a dedicated SQLite file shared by the workers of one node"""
+
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path: str):
+        self.path = path
+        self._ready = False
+        self._puts = 0
+
+    async def _connect(self) -> aiosqlite.Connection:
+        conn = await aiosqlite.connect(self.path, isolation_level=None)
+        if not self._ready:
+            await conn.execute("PRAGMA journal_mode=WAL")
+            await conn.execute(
+                "CREATE TABLE IF NOT EXISTS used_nonces ("
+                "nonce TEXT PRIMARY KEY, created_at INTEGER NOT NULL, expires_at INTEGER NOT NULL)"
+            )
+            await conn.execute("CREATE INDEX IF NOT EXISTS idx_used_nonces_expires_at ON used_nonces(expires_at)")
+            self._ready = True
+        return conn
+
+    async def put(self, db: aiosqlite.Connection, nonce: str, created_at: int, expires_at: int) -> None:
+        conn = await self._connect()
+        try:
+            await conn.execute(
+                "INSERT OR REPLACE INTO used_nonces(nonce, created_at, expires_at) VALUES(?,?,?)",
+                (nonce, created_at, expires_at),
+            )
+            self._puts += 1
+            if self._puts % self.PRUNE_EVERY == 0:
+                await conn.execute("DELETE FROM used_nonces WHERE expires_at < ?", (int(time.time()),))
+        finally:
+            await conn.close()
+
+    async def get(self, db: aiosqlite.Connection, nonce: str) -> Optional[int]:
+        conn = await self._connect()
+        try:
+            cur = await conn.execute("SELECT expires_at FROM used_nonces WHERE nonce=?", (nonce,))
+            row = await cur.fetchone()
+            return row[0] if row else None
+        finally:
+            await conn.close()
+
+    async def consume(self, db: aiosqlite.Connection, nonce: str) -> bool:
+        conn = await self._connect()
+        try:
+            cur = await conn.execute("DELETE FROM used_nonces WHERE nonce=?", (nonce,))
+            return cur.rowcount > 0
+        finally:
+            await conn.close()
+
+    async def put_many(self, db: aiosqlite.Connection, items: List[Tuple[str, int, int]]) -> None:
+        conn = await self._connect()
+        try:
+            await conn.execute("BEGIN")
+            await conn.executemany(
+                "INSERT OR REPLACE INTO used_nonces(nonce, created_at, expires_at) VALUES(?,?,?)", items
+            )
+            await conn.execute("COMMIT")
+        finally:
+            await conn.close()
+
+    async def consume_many(self, db: aiosqlite.Connection, nonces: Iterable[str]) -> Set[str]:
+        conn = await self._connect()
+        try:
+            return await _delete_returning(conn, nonces)
+        finally:
+            await conn.close()
+
+
+class MemoryChallengeStore:
+    """Challenges in a dict; not shared between worker processes"""
+
+    def __init__(self):
+        self._expires: Dict[str, int] = {}
+
+    async def put(self, db: aiosqlite.Connection, nonce: str, created_at: int, expires_at: int) -> None:
+        if len(self._expires) % 1000 == 0:
+            now = int(time.time())
+            self._expires = {n: e for n, e in self._expires.items() if e >= now}
+        self._expires[nonce] = expires_at
+
+    async def get(self, db: aiosqlite.Connection, nonce: str) -> Optional[int]:
+        return self._expires.get(nonce)
+
+    async def consume(self, db: aiosqlite.Connection, nonce: str) -> bool:
+        return self._expires.pop(nonce, None) is not None
+
+    async def put_many(self, db: aiosqlite.Connection, items: List[Tuple[str, int, int]]) -> None:
+        for nonce, created_at, expires_at in items:
+            await self.put(db, nonce, created_at, expires_at)
+
+    async def consume_many(self, db: aiosqlite.Connection, nonces: Iterable[str]) -> Set[str]:
+        return {n for n in set(nonces) if self._expires.pop(n, None) is not None}
+
+
+def build_challenge_store(uri: str):
+    if not uri:
+        return DatabaseChallengeStore()
+    if uri == "memory://":
+        return MemoryChallengeStore()
+    if uri.startswith("sqlite://"):
+        return SQLiteChallengeStore(uri[len("sqlite://"):])
+    raise ValueError(f"unsupported CHALLENGE_STORE_URI: {uri}")
+
+
+class ChallengeStore:
+    """Stable handle the endpoints import; configure() swaps the backing store"""
+
+    def __init__(self, uri: str):
+        self.configure(uri)
+
+    def configure(self, uri: str) -> None:
+        self.uri = uri
+        self.backend = build_challenge_store(uri)
+
+    async def put(self, db: aiosqlite.Connection, nonce: str, created_at: int, expires_at: int) -> None:
+        await self.backend.put(db, nonce, created_at, expires_at)
+
+    async def get(self, db: aiosqlite.Connection, nonce: str) -> Optional[int]:
+        return await self.backend.get(db, nonce)
+
+    async def consume(self, db: aiosqlite.Connection, nonce: str) -> bool:
+        return await self.backend.consume(db, nonce)
+
+    async def put_many(self, db: aiosqlite.Connection, items: List[Tuple[str, int, int]]) -> None:
+        await self.backend.put_many(db, items)
+
+    async def consume_many(self, db: aiosqlite.Connection, nonces: Iterable[str]) -> Set[str]:
+        return await self.backend.consume_many(db, nonces)
+
+
+challenge_store = ChallengeStore(settings.CHALLENGE_STORE_URI)
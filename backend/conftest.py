@@ -13,17 +13,24 @@ sys.path.insert(0, os.path.dirname(__file__))
 
 # Use a file-based database for testing to ensure consistency
 TEST_DB_PATH = os.path.join(tempfile.gettempdir(), 'worldpass_test.db')
+TEST_RATE_LIMIT_PATH = os.path.join(tempfile.gettempdir(), 'worldpass_test_ratelimit.db')
+TEST_CHALLENGES_PATH = os.path.join(tempfile.gettempdir(), 'worldpass_test_challenges.db')
+TEST_AUDIT_PATH = os.path.join(tempfile.gettempdir(), 'worldpass_test_audit.db')
 
 # Set test environment variables BEFORE any backend imports
 os.environ['VC_ENCRYPTION_KEY'] = 'test-key-for-integration-test-12345'
 os.environ['PROFILE_ENCRYPTION_KEY'] = 'lIwAjiHC7Rep5_Vb5vH-nXBHDWiMQnwclFUCga2CNLE='
 os.environ['SQLITE_PATH'] = TEST_DB_PATH
+os.environ['RATE_LIMIT_STORAGE_URI'] = f'sqlite://{TEST_RATE_LIMIT_PATH}'
+os.environ['AUDIT_ARCHIVE_DIR'] = tempfile.mkdtemp(prefix='worldpass_audit_archive_')
+os.environ['SERVER_SIGNING_KEY_PATH'] = os.path.join(tempfile.mkdtemp(prefix='worldpass_keys_'), 'server_signing.key')
 os.environ['JWT_SECRET'] = 'test-jwt-secret-key-12345'
 os.environ['ADMIN_PASS_HASH'] = '$2b$12$rV305vOf0QA17Bq1o4WrPOzsfWpI7y9cSviK5zl3JHcEXqLRjDq4u'
 
 # Clean up any existing test database before importing anything
-if os.path.exists(TEST_DB_PATH):
-    os.remove(TEST_DB_PATH)
+for path in (TEST_DB_PATH, TEST_RATE_LIMIT_PATH, TEST_CHALLENGES_PATH, TEST_AUDIT_PATH):
+    if os.path.exists(path):
+        os.remove(path)
 
 # Now import settings and patch the SQLITE_PATH
 from settings import settings
@@ -41,8 +48,9 @@ def setup_test_db():
     yield  # Run tests
     
     # Clean up after all tests
-    if os.path.exists(TEST_DB_PATH):
-        os.remove(TEST_DB_PATH)
+    for path in (TEST_DB_PATH, TEST_RATE_LIMIT_PATH, TEST_CHALLENGES_PATH, TEST_AUDIT_PATH):
+        if os.path.exists(path):
+            os.remove(path)
 
 
 @pytest.fixture(scope="module")
@@ -54,6 +62,45 @@ def client():
         yield test_client
 
 
+@pytest.fixture
+def issuer_with_credentials():
+    """Factory: an approved issuer named `name` with `count` issued credentials.
+
+    Credential n is vc-<name>-<n>: StudentCard for odd n, Membership for even
+    n, revoked when n % 5 == 0, and every three share a created_at. Returns
+    (issuer_id, X-Token headers).
+    """
+    import sqlite3
+    import time
+    from jose import jwt
+
+    def make(count: int, name: str):
+        now = int(time.time())
+        with sqlite3.connect(settings.SQLITE_PATH) as conn:
+            cur = conn.execute(
+                "INSERT INTO issuers(name, email, did, status, created_at, updated_at) VALUES(?,?,?,?,?,?)",
+                (name, f"{name}@example.edu", f"did:key:z{name}", "approved", now, now),
+            )
+            issuer_id = cur.lastrowid
+            for n in range(count):
+                vc_id = f"vc-{name}-{n}"
+                # Several credentials share a timestamp; the id breaks the tie
+                conn.execute(
+                    "INSERT INTO issued_vcs(vc_id, issuer_id, subject_did, payload, credential_type, created_at, updated_at) "
+                    "VALUES(?,?,?,?,?,?,?)",
+                    (vc_id, issuer_id, f"did:key:zholder{n}", "{}", "StudentCard" if n % 2 else "Membership",
+                     now - n // 3, now - n // 3),
+                )
+                conn.execute(
+                    "INSERT INTO vc_status(vc_id, issuer_did, subject_did, status, created_at, updated_at) VALUES(?,?,?,?,?,?)",
+                    (vc_id, f"did:key:z{name}", "s", "revoked" if n % 5 == 0 else "valid", now, now),
+                )
+        token = jwt.encode({"issuer_id": issuer_id, "role": "issuer"}, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
+        return issuer_id, {"X-Token": token}
+
+    return make
+
+
 # Configure pytest markers
 def pytest_configure(config):
     """Register pytest markers for async tests"""
@@ -0,0 +1,240 @@
+"""
+Compact binary encoding for credentials and presentations.
+
+JSON documents are encoded as CBOR (RFC 8949) and then raw-deflated with a
+preset dictionary. Map keys that appear in STRINGS are written as their
+index; other string values from STRINGS are written as a tagged index
+(tag 6, CBOR's "shared reference" range). Everything else is plain CBOR.
+Map order is kept, so a decoded credential re-serialises to the exact JSON
+its JWS signature was computed over.
+
+Wire format: b"WPC" + version byte + raw deflate stream. STRINGS and ZDICT
+belong to the version: only ever append to STRINGS, and bump
+CODEC_VERSION if ZDICT changes.
+
+Only the JSON data model is supported: null, booleans, integers up to 64
+bits, floats, strings, arrays and objects with string keys. The decoder
+rejects indefinite lengths, unknown tags, excessive nesting and outputs
+larger than `max_size`.
+"""
+import struct
+import zlib
+from typing import Any, Dict, List, Tuple
+
+MEDIA_TYPE = "application/vnd.worldpass+cbor"
+MAGIC = b"WPC"
+CODEC_VERSION = 1
+MAX_DEPTH = 64
+DEFAULT_MAX_SIZE = 1 << 20
+
+TAG_STRING_REF = 6
+
+# Append only: the index of an entry is part of the wire format
+STRINGS: List[str] = [
+    "@context", "type", "id", "jti", "issuer", "issuanceDate", "expirationDate",
+    "credentialSubject", "credentialStatus", "proof", "created", "proofPurpose",
+    "verificationMethod", "jws", "issuer_pk_b64u", "holder", "challenge", "aud",
+    "exp", "vc", "vcs", "did", "pk_b64u", "sig_b64u", "alg", "name", "email",
+    "studentNumber", "student_id", "presentation", "Ed25519", "EdDSA",
+    "Ed25519Signature2020", "assertionMethod", "VerifiableCredential",
+    "VerifiablePresentation", "https://www.w3.org/2018/credentials/v1",
+    "https://www.w3.org/ns/credentials/v2", "https://w3id.org/security/suites/ed25519-2020/v1",
+    "StudentCard", "Membership", "validFrom", "validUntil", "description",
+]
+_STRING_INDEX: Dict[str, int] = {s: i for i, s in enumerate(STRINGS)}
+
+# Preset deflate dictionary: byte sequences common in signed credentials
+ZDICT = (
+    b"did:key:z#key-1did:web:" + "".join(STRINGS).encode()
+    + b"T00:00:00Z2025-2026-"
+)
+
+
+class CodecError(ValueError):
+    pass
+
+
+# ---------- CBOR ----------
+
+def _head(out: bytearray, major: int, value: int) -> None:
+    if value < 24:
+        out.append(major << 5 | value)
+    elif value < 0x100:
+        out.append(major << 5 | 24)
+        out.append(value)
+    elif value < 0x10000:
+        out.append(major << 5 | 25)
+        out += struct.pack(">H", value)
+    elif value < 0x100000000:
+        out.append(major << 5 | 26)
+        out += struct.pack(">I", value)
+    elif value < 0x10000000000000000:
+        out.append(major << 5 | 27)
+        out += struct.pack(">Q", value)
+    else:
+        raise CodecError("integer_out_of_range")
+
+
+def _text(out: bytearray, s: str) -> None:
+    data = s.encode("utf-8")
+    _head(out, 3, len(data))
+    out += data
+
+
+def _encode(out: bytearray, obj: Any, depth: int) -> None:
+    if depth > MAX_DEPTH:
+        raise CodecError("too_deep")
+    if obj is None:
+        out.append(0xF6)
+    elif obj is True:
+        out.append(0xF5)
+    elif obj is False:
+        out.append(0xF4)
+    elif isinstance(obj, int):
+        if obj >= 0:
+            _head(out, 0, obj)
+        else:
+            _head(out, 1, -1 - obj)
+    elif isinstance(obj, float):
+        out.append(0xFB)
+        out += struct.pack(">d", obj)
+    elif isinstance(obj, str):
+        index = _STRING_INDEX.get(obj)
+        if index is None:
+            _text(out, obj)
+        else:
+            _head(out, 6, TAG_STRING_REF)
+            _head(out, 0, index)
+    elif isinstance(obj, (list, tuple)):
+        _head(out, 4, len(obj))
+        for item in obj:
+            _encode(out, item, depth + 1)
+    elif isinstance(obj, dict):
+        _head(out, 5, len(obj))
+        for key, value in obj.items():
+            if not isinstance(key, str):
+                raise CodecError("non_string_key")
+            index = _STRING_INDEX.get(key)
+            if index is None:
+                _text(out, key)
+            else:
+                _head(out, 0, index)
+            _encode(out, value, depth + 1)
+    else:
+        raise CodecError(f"unsupported_type: {type(obj).__name__}")
+
+
+class _Decoder:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+
+    def _take(self, n: int) -> bytes:
+        end = self.pos + n
+        if end > len(self.data):
+            raise CodecError("truncated")
+        chunk = self.data[self.pos:end]
+        self.pos = end
+        return chunk
+
+    def _head(self) -> Tuple[int, int]:
+        initial = self._take(1)[0]
+        major, info = initial >> 5, initial & 0x1F
+        if info < 24:
+            return major, info
+        if info == 24:
+            return major, self._take(1)[0]
+        if info == 25:
+            return major, struct.unpack(">H", self._take(2))[0]
+        if info == 26:
+            return major, struct.unpack(">I", self._take(4))[0]
+        if info == 27:
+            if major == 7:
+                return major, info
+            return major, struct.unpack(">Q", self._take(8))[0]
+        raise CodecError("unsupported_length")
+
+    def _string_ref(self, index: int) -> str:
+        if index >= len(STRINGS):
+            raise CodecError("unknown_string_ref")
+        return STRINGS[index]
+
+    def decode(self, depth: int = 0) -> Any:
+        if depth > MAX_DEPTH:
+            raise CodecError("too_deep")
+        major, value = self._head()
+        if major == 0:
+            return value
+        if major == 1:
+            return -1 - value
+        if major == 3:
+            try:
+                return self._take(value).decode("utf-8")
+            except UnicodeDecodeError:
+                raise CodecError("bad_utf8")
+        if major == 4:
+            if value > len(self.data) - self.pos:
+                raise CodecError("truncated")
+            return [self.decode(depth + 1) for _ in range(value)]
+        if major == 5:
+            if value > len(self.data) - self.pos:
+                raise CodecError("truncated")
+            obj = {}
+            for _ in range(value):
+                k_major, k_value = self._head()
+                if k_major == 0:
+                    key = self._string_ref(k_value)
+                elif k_major == 3:
+                    try:
+                        key = self._take(k_value).decode("utf-8")
+                    except UnicodeDecodeError:
+                        raise CodecError("bad_utf8")
+                else:
+                    raise CodecError("non_string_key")
+                obj[key] = self.decode(depth + 1)
+            return obj
+        if major == 6:
+            if value != TAG_STRING_REF:
+                raise CodecError("unsupported_tag")
+            i_major, index = self._head()
+            if i_major != 0:
+                raise CodecError("bad_string_ref")
+            return self._string_ref(index)
+        if major == 7:
+            if value == 20:
+                return False
+            if value == 21:
+                return True
+            if value == 22:
+                return None
+            if value == 27:
+                return struct.unpack(">d", self._take(8))[0]
+        raise CodecError("unsupported_item")
+
+
+# ---------- public API ----------
+
+def encode(obj: Any) -> bytes:
+    out = bytearray()
+    _encode(out, obj, 0)
+    deflater = zlib.compressobj(level=9, wbits=-15, zdict=ZDICT)
+    return MAGIC + bytes([CODEC_VERSION]) + deflater.compress(bytes(out)) + deflater.flush()
+
+
+def decode(data: bytes, max_size: int = DEFAULT_MAX_SIZE) -> Any:
+    if data[:3] != MAGIC or len(data) < 4:
+        raise CodecError("not_compact_encoded")
+    if data[3] != CODEC_VERSION:
+        raise CodecError("unsupported_codec_version")
+    inflater = zlib.decompressobj(wbits=-15, zdict=ZDICT)
+    try:
+        raw = inflater.decompress(data[4:], max_size)
+    except zlib.error:
+        raise CodecError("bad_deflate_stream")
+    if inflater.unconsumed_tail:
+        raise CodecError("too_large")
+    decoder = _Decoder(raw)
+    obj = decoder.decode()
+    if decoder.pos != len(raw):
+        raise CodecError("trailing_data")
+    return obj
@@ -0,0 +1,168 @@
+"""
+Offline verification against a signed trust bundle.
+
+The server exports a bundle holding the trusted issuers (DID + signing key)
+and the non-valid credential statuses, tagged with the sequence number of
+the last trust change it includes. Bundles are zlib-compressed JSON signed
+with the server's Ed25519 key; deltas carry only the changes after a given
+sequence number. A verifier loads one full bundle, applies deltas as they
+arrive and then checks credentials, or whole presentations (holder
+signature, challenge / aud / exp and subject binding, see presentation.py),
+without any network access.
+
+Credential ids are shipped as truncated SHA-256 references (vc_ref) so the
+bundle does not enumerate credential ids.
+"""
+import hashlib
+import json
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from .crypto_base import Signer
+from .crypto_ed25519 import Ed25519Signer, b64u, b64u_d
+from .presentation import check_holder, split_presentation
+from .vc import verify_vc
+
+BUNDLE_VERSION = 1
+
+
+def vc_ref(vc_id: str) -> str:
+    """Reference a credential id the way bundles do (first 16 bytes of SHA-256, hex)"""
+    return hashlib.sha256(vc_id.encode()).hexdigest()[:32]
+
+
+def seal_bundle(bundle: Dict, signer: Signer, sk: bytes, kid: str) -> Dict:
+    body = zlib.compress(json.dumps(bundle, separators=(",", ":")).encode(), 9)
+    return {
+        "v": BUNDLE_VERSION,
+        "alg": "EdDSA",
+        "kid": kid,
+        "payload": b64u(body),
+        "sig": b64u(signer.sign(sk, body)),
+    }
+
+
+def open_bundle(envelope: Dict, server_pk: bytes, signer: Optional[Signer] = None) -> Dict:
+    """Check the server signature and return the decoded bundle; raises ValueError"""
+    if envelope.get("v") != BUNDLE_VERSION or envelope.get("alg") != "EdDSA":
+        raise ValueError("unsupported_bundle")
+    body = b64u_d(envelope.get("payload") or "")
+    try:
+        (signer or Ed25519Signer()).verify(server_pk, body, b64u_d(envelope.get("sig") or ""))
+    except Exception:
+        raise ValueError("bad_bundle_signature")
+    return json.loads(zlib.decompress(body))
+
+
+class OfflineVerifier:
+    """Verifies credentials against the trust state of the bundles it was fed"""
+
+    def __init__(self, server_pk: bytes, signer: Optional[Signer] = None):
+        self.server_pk = server_pk
+        self.signer = signer or Ed25519Signer()
+        self.seq: Optional[int] = None
+        self.generated_at: Optional[int] = None
+        self._issuers: Dict[int, Dict] = {}
+        self._issuer_by_did: Dict[str, Dict] = {}
+        self._statuses: Dict[str, str] = {}
+
+    def _reindex_issuers(self):
+        self._issuer_by_did = {i["did"]: i for i in self._issuers.values() if i.get("did")}
+
+    def load(self, envelope: Dict) -> None:
+        """Replace all trust state with a full bundle"""
+        bundle = open_bundle(envelope, self.server_pk, self.signer)
+        if bundle.get("type") != "full":
+            raise ValueError("not_a_full_bundle")
+        self._issuers = {i["id"]: i for i in bundle["issuers"]}
+        self._reindex_issuers()
+        self._statuses = dict(bundle["statuses"])
+        self.seq = bundle["seq"]
+        self.generated_at = bundle["generated_at"]
+
+    def apply_delta(self, envelope: Dict) -> None:
+        """Apply a delta; it must start at or before the sequence already held"""
+        bundle = open_bundle(envelope, self.server_pk, self.signer)
+        if bundle.get("type") != "delta":
+            raise ValueError("not_a_delta")
+        if self.seq is None or bundle["since"] > self.seq:
+            raise ValueError("delta_gap")
+        if bundle["seq"] <= self.seq:
+            return
+        for issuer in bundle["issuers"]:
+            self._issuers[issuer["id"]] = issuer
+        for issuer_id in bundle["removed_issuers"]:
+            self._issuers.pop(issuer_id, None)
+        self._reindex_issuers()
+        for ref, status in bundle["statuses"].items():
+            if status == "valid":
+                self._statuses.pop(ref, None)
+            else:
+                self._statuses[ref] = status
+        self.seq = bundle["seq"]
+        self.generated_at = bundle["generated_at"]
+
+    def verify(self, vc: Dict) -> Tuple[bool, str, Optional[str], Optional[str]]:
+        """Same result shape as verify_vc, plus issuer trust and status checks"""
+        ok, reason, issuer, subject = verify_vc(vc, self.signer)
+        if not ok:
+            return ok, reason, issuer, subject
+
+        issuer_did = issuer.get("id") if isinstance(issuer, dict) else issuer
+        entry = self._issuer_by_did.get(issuer_did)
+        if entry is None or entry.get("pk_b64u") != vc["proof"].get("issuer_pk_b64u"):
+            return False, "untrusted_issuer", issuer, subject
+
+        vc_id = vc.get("jti") or vc.get("id")
+        status = self._statuses.get(vc_ref(vc_id)) if vc_id else None
+        if status is not None:
+            return False, status, issuer, subject
+        return True, "ok", issuer, subject
+
+    def verify_presentation(
+        self,
+        payload: Dict,
+        challenge: str,
+        aud: Optional[str] = None,
+        now: Optional[int] = None,
+        max_vcs: int = 500,
+    ) -> Tuple[bool, str, List[Tuple[bool, str, Optional[str], Optional[str]]]]:
+        """(valid, reason, per-credential verify() results) of a presentation
+        answering `challenge`, the nonce this device handed out, for audience
+        `aud`. Checked in the order the server uses: presentation fields,
+        holder, then each credential."""
+        now = now or int(time.time())
+        if payload.get("type") != "presentation":
+            return False, "bad_type", []
+        if not challenge or payload.get("challenge") != challenge:
+            return False, "challenge_mismatch", []
+        if aud is not None and (payload.get("aud") or "") != aud:
+            return False, "aud_mismatch", []
+        exp = payload.get("exp")
+        if exp is not None:
+            try:
+                if int(exp) < now:
+                    return False, "presentation_expired", []
+            except (TypeError, ValueError):
+                return False, "bad_exp", []
+        try:
+            _, vcs = split_presentation(payload, max_vcs)
+        except ValueError as e:
+            return False, str(e), []
+
+        holder_error = check_holder(payload, vcs, self.signer)
+        if holder_error:
+            return False, holder_error, []
+
+        results = [self.verify(vc) for vc in vcs]
+        failed = next((r for r in results if not r[0]), None)
+        return failed is None, failed[1] if failed else "ok", results
+
+    def stats(self) -> Dict:
+        return {
+            "seq": self.seq,
+            "generated_at": self.generated_at,
+            "issuers": len(self._issuers),
+            "statuses": len(self._statuses),
+        }
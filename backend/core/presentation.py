@@ -0,0 +1,52 @@
+"""
+Presentation checks shared by online and offline verification.
+
+A presentation carries one credential ("vc") or several ("vcs") plus a
+holder block: the holder DID, its key and a detached Ed25519 signature over
+"challenge|aud|exp". The server (backend/verification.py) and the offline
+verifier (offline.py) run the same holder checks.
+"""
+from typing import Dict, List, Optional, Tuple
+
+from .crypto_base import Signer
+from .crypto_ed25519 import b64u_d
+
+
+def split_presentation(payload: Dict, max_vcs: int) -> Tuple[bool, List]:
+    """(multi, vcs) of a presentation carrying either "vc" or a "vcs" array; raises ValueError"""
+    multi = "vcs" in payload
+    vcs = payload.get("vcs") if multi else [payload.get("vc") or {}]
+    if not isinstance(vcs, list) or not vcs:
+        raise ValueError("missing_vcs")
+    if len(vcs) > max_vcs:
+        raise ValueError("too_many_vcs")
+    return multi, vcs
+
+
+def check_holder(payload: Dict, vcs: List[Dict], signer: Signer) -> Optional[str]:
+    """Holder part of a presentation: fields, subject binding, DID/key match and
+    the detached signature over "challenge|aud|exp". Returns an error code or None."""
+    holder = payload.get("holder") or {}
+    holder_did = holder.get("did") or ""
+    holder_pk_b64u = holder.get("pk_b64u") or ""
+    holder_sig_b64u = holder.get("sig_b64u") or ""
+    alg = holder.get("alg") or "Ed25519"
+
+    if not (holder_did and holder_pk_b64u and holder_sig_b64u):
+        return "missing_holder"
+    if alg != "Ed25519":
+        return "unsupported_alg"
+    for vc in vcs:
+        if ((vc.get("credentialSubject") or {}).get("id", "") or "") != holder_did:
+            return "subject_holder_mismatch"
+    if f"did:key:z{holder_pk_b64u}" != holder_did:
+        return "did_pk_mismatch"
+
+    # Same message as the wallet (Present.jsx): [challenge, aud || "", exp ? String(exp) : ""].join("|")
+    exp = payload.get("exp")
+    parts = [payload.get("challenge") or "", payload.get("aud") or "", str(exp) if exp is not None else ""]
+    try:
+        signer.verify(b64u_d(holder_pk_b64u), "|".join(parts).encode("utf-8"), b64u_d(holder_sig_b64u))
+    except Exception:
+        return "bad_holder_signature"
+    return None
@@ -0,0 +1,58 @@
+"""
+Verification receipts.
+
+A receipt is a compact JWS (header.payload.signature, EdDSA) the server
+issues over the outcome of a presentation check, so a relying party can hand
+it on or store it as proof of the verification without calling back. It is
+signed with the server key published at /.well-known/worldpass-keys.json;
+the header's kid selects the key.
+
+Claims: iss, sub (holder DID), aud (presentation audience), iat, exp, jti,
+plus the verdict (valid, reason, revoked, issuer_trusted), and per
+credential its issuer (vc_iss) and id (vc_ids), in presentation order.
+
+A relying party should pass the audience it asked for and the issuer it
+expects, so a receipt minted for another verifier is rejected.
+"""
+import json
+import time
+from typing import Dict, Optional
+
+from .crypto_base import Signer
+from .crypto_ed25519 import Ed25519Signer, b64u, b64u_d
+from .vc import jws_message
+
+RECEIPT_TYP = "worldpass-receipt+jwt"
+
+
+def sign_receipt(claims: Dict, signer: Signer, sk: bytes, kid: str) -> str:
+    header = {"alg": "EdDSA", "typ": RECEIPT_TYP, "kid": kid}
+    msg = jws_message(header, claims)
+    return msg.decode() + "." + b64u(signer.sign(sk, msg))
+
+
+def verify_receipt(token: str, server_pk: bytes, signer: Optional[Signer] = None,
+                   now: Optional[int] = None, audience: Optional[str] = None,
+                   issuer: Optional[str] = None) -> Dict:
+    """Check signature, expiry and, when given, aud / iss; return the claims; raises ValueError"""
+    try:
+        header_b64, claims_b64, sig_b64 = token.split(".")
+        header = json.loads(b64u_d(header_b64))
+        claims = json.loads(b64u_d(claims_b64))
+    except Exception:
+        raise ValueError("malformed_receipt")
+    if header.get("alg") != "EdDSA" or header.get("typ") != RECEIPT_TYP:
+        raise ValueError("unsupported_receipt")
+    try:
+        (signer or Ed25519Signer()).verify(
+            server_pk, f"{header_b64}.{claims_b64}".encode(), b64u_d(sig_b64)
+        )
+    except Exception:
+        raise ValueError("bad_receipt_signature")
+    if int(claims.get("exp", 0)) < (now if now is not None else int(time.time())):
+        raise ValueError("receipt_expired")
+    if audience is not None and claims.get("aud") != audience:
+        raise ValueError("receipt_audience_mismatch")
+    if issuer is not None and claims.get("iss") != issuer:
+        raise ValueError("receipt_issuer_mismatch")
+    return claims
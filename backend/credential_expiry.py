@@ -0,0 +1,184 @@
+"""
+Credential Expiry
+Issued credentials carry their expirationDate (VC 1.1) or validUntil
+(VC 2.0) as epoch seconds in issued_vcs.expires_at, extracted once at
+issuance, so nothing has to parse dates out of stored payloads again.
+
+CredentialExpirer moves credentials whose expires_at has passed from
+'valid' to 'expired' in vc_status with batched set-based UPDATEs over the
+partial idx_issued_vcs_expires_at index. Each run only scans the range of
+expiry times since the previous run; that watermark is kept in job_state,
+so restarts don't rescan past expiries, and the sweep runs on one worker
+per node (LeaderLease). The status change goes through the
+vc_status triggers, so issuer counters, trust_changes (and with it the
+verify-only revocation index and offline bundles) follow automatically.
+
+Verification does not wait for the sweep: verification.expired_ids reads
+expires_at directly.
+"""
+import asyncio
+import json
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+import aiosqlite
+
+from backend.database import LeaderLease
+from backend.read_cache import status_cache
+from backend.settings import settings
+
+EXPIRE_SQL = """
+    UPDATE vc_status SET status='expired', reason='expired', updated_at=:now
+    WHERE vc_id IN (
+        SELECT iv.vc_id FROM issued_vcs iv JOIN vc_status vs ON vs.vc_id = iv.vc_id
+        WHERE iv.expires_at > :since AND iv.expires_at <= :now AND vs.status = 'valid'
+        LIMIT :limit
+    )
+    RETURNING vc_id
+"""
+
+# Advances the watermark only if it is still the value the run started from,
+# so a rescan() issued during the run is not overwritten.
+WATERMARK_SQL = """
+    INSERT INTO job_state(name, value, updated_at) VALUES(:name, :now, :now)
+    ON CONFLICT(name) DO UPDATE SET value=excluded.value, updated_at=excluded.updated_at
+    WHERE job_state.value = :since
+"""
+
+
+def credential_expires_at(vc: Dict) -> Optional[int]:
+    """expirationDate / validUntil of a credential as epoch seconds, None if absent or unparseable"""
+    value = vc.get("expirationDate") or vc.get("validUntil")
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+async def backfill_expires_at(db: aiosqlite.Connection, chunk_size: int = 1000, after_id: int = 0) -> Dict[str, int]:
+    """Populate issued_vcs.expires_at of credentials issued before it was extracted.
+
+    Walks issued_vcs by primary key in chunks and commits after each chunk,
+    so it can run on a live database and be resumed from `last_id`.
+    """
+    scanned = 0
+    updated = 0
+    last_id = after_id
+    while True:
+        cur = await db.execute(
+            "SELECT id, payload FROM issued_vcs WHERE id > ? AND expires_at IS NULL ORDER BY id LIMIT ?",
+            (last_id, chunk_size),
+        )
+        rows = await cur.fetchall()
+        if not rows:
+            break
+
+        updates = []
+        for row_id, payload in rows:
+            try:
+                expires_at = credential_expires_at(json.loads(payload or "{}"))
+            except (ValueError, AttributeError):
+                expires_at = None
+            if expires_at is not None:
+                updates.append((expires_at, row_id))
+
+        if updates:
+            await db.executemany("UPDATE issued_vcs SET expires_at=? WHERE id=?", updates)
+        await db.commit()
+
+        scanned += len(rows)
+        updated += len(updates)
+        last_id = rows[-1][0]
+        await asyncio.sleep(0)
+
+    return {"scanned": scanned, "updated": updated, "last_id": last_id}
+
+
+class CredentialExpirer:
+    """Periodically marks credentials past their expires_at as 'expired'"""
+
+    def __init__(self, interval: Optional[int] = None, batch_size: Optional[int] = None):
+        self.interval = interval or settings.CREDENTIAL_EXPIRY_INTERVAL_SECONDS
+        self.batch_size = batch_size or settings.CREDENTIAL_EXPIRY_BATCH
+        self._task: Optional[asyncio.Task] = None
+        self.lease = LeaderLease("expiry")
+        self._since = 0  # expires_at up to here is already swept (job_state); 0 = full scan
+        self.runs = 0
+        self.expired_total = 0
+        self.last_run: Optional[dict] = None
+
+    async def rescan(self, db: aiosqlite.Connection) -> None:
+        """Make the next run, on whichever worker leads, cover all past expiry times again (e.g. after a backfill)"""
+        await db.execute("UPDATE job_state SET value=0, updated_at=? WHERE name='credential_expiry'", (int(time.time()),))
+        await db.commit()
+        self._since = 0
+
+    async def expire_once(self, now: Optional[int] = None) -> int:
+        now = now or int(time.time())
+        expired = 0
+        async with aiosqlite.connect(settings.SQLITE_PATH) as conn:
+            cur = await conn.execute("SELECT value FROM job_state WHERE name='credential_expiry'")
+            row = await cur.fetchone()
+            self._since = row[0] if row else 0
+            while True:
+                cur = await conn.execute(EXPIRE_SQL, {"now": now, "since": self._since, "limit": self.batch_size})
+                vc_ids = [r[0] for r in await cur.fetchall()]
+                await conn.commit()
+                for vc_id in vc_ids:
+                    status_cache.invalidate(vc_id)
+                expired += len(vc_ids)
+                if len(vc_ids) < self.batch_size:
+                    break
+                # Let request handlers get at the write lock between batches
+                await asyncio.sleep(0)
+            await conn.execute(WATERMARK_SQL, {"name": "credential_expiry", "now": now, "since": self._since})
+            await conn.commit()
+        self._since = now
+        self.runs += 1
+        self.expired_total += expired
+        self.last_run = {"at": now, "expired": expired}
+        return expired
+
+    async def _run(self):
+        while True:
+            if self.lease.acquire():
+                try:
+                    await self.expire_once()
+                except Exception as e:
+                    print(f"Credential expiry: run failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.lease.release()
+
+    def metrics(self) -> dict:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "leader": self.lease.held,
+            "interval_seconds": self.interval,
+            "batch_size": self.batch_size,
+            "swept_up_to": self._since,
+            "runs": self.runs,
+            "expired_total": self.expired_total,
+            "last_run": self.last_run,
+        }
+
+
+credential_expirer = CredentialExpirer()
@@ -0,0 +1,172 @@
+"""
+Credential Fields
+Issuer templates can declare payload paths as indexed (indexed_fields, e.g.
+["credentialSubject.department", "issuanceDate"]). For every credential of
+that issuer, the scalar at each declared path is copied into the
+credential_fields (credential_id, key, value) side table. Triggers on
+issued_vcs do this at issuance and on payload changes (see
+CREDENTIAL_FIELDS_SQL in database.py). The credential list then filters
+through idx_credential_fields_lookup instead of parsing payloads.
+
+Fields are declared per issuer: a path declared by any of its templates is
+indexed for all of its credentials. When the declarations change, the
+template endpoints hand the issuer to field_reindexer, which rebuilds its
+rows with reindex_issuer_fields in the background.
+
+Values are stored as text, so `>=` / `<=` filters compare lexicographically.
+That orders ISO 8601 dates and fixed-width codes correctly, but not
+numbers of different lengths.
+"""
+import asyncio
+import re
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+import aiosqlite
+
+from backend.database import credential_fields_select
+from backend.settings import settings
+
+MAX_INDEXED_FIELDS = 16
+FIELD_PATH_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*){0,7}$")
+FILTER_RE = re.compile(r"^([^<>=]+?)(>=|<=|=)(.*)$")
+FILTER_OPS = {"=": "=", ">=": ">=", "<=": "<="}
+
+
+def validate_indexed_fields(fields: List[str]) -> List[str]:
+    """Deduplicated payload paths; raises ValueError on a malformed path or too many"""
+    cleaned = list(dict.fromkeys(f.strip() for f in fields))
+    if len(cleaned) > MAX_INDEXED_FIELDS:
+        raise ValueError("too_many_indexed_fields")
+    for field in cleaned:
+        if not FIELD_PATH_RE.match(field):
+            raise ValueError("bad_indexed_field")
+    return cleaned
+
+
+def parse_field_filters(filters: List[str]) -> List[Tuple[str, str, str]]:
+    """(key, op, value) for filters written as key=value, key>=value or key<=value"""
+    parsed = []
+    for item in filters:
+        match = FILTER_RE.match(item)
+        if not match or not FIELD_PATH_RE.match(match.group(1).strip()):
+            raise ValueError("bad_field_filter")
+        parsed.append((match.group(1).strip(), FILTER_OPS[match.group(2)], match.group(3)))
+    return parsed
+
+
+async def issuer_indexed_fields(db: aiosqlite.Connection, issuer_id: int) -> Set[str]:
+    cur = await db.execute(
+        "SELECT DISTINCT f.value FROM issuer_templates t, json_each(t.indexed_fields) f WHERE t.issuer_id=?",
+        (issuer_id,),
+    )
+    return {r[0] for r in await cur.fetchall()}
+
+
+async def reindex_issuer_fields(db: aiosqlite.Connection, issuer_id: int, chunk_size: int = 1000) -> int:
+    """Rebuild the issuer's credential_fields rows from its current declarations.
+
+    Walks the issuer's credentials by id in chunks and commits after each
+    chunk, so a large issuer never holds the write lock for long. Commit the
+    declaration change first; credentials issued meanwhile are indexed by the
+    triggers. Until it finishes, filters may see some credentials with the
+    old fields.
+    """
+    written = 0
+    last_id = 0
+    while True:
+        cur = await db.execute(
+            "SELECT MAX(id) FROM (SELECT id FROM issued_vcs WHERE issuer_id=? AND id > ? ORDER BY id LIMIT ?)",
+            (issuer_id, last_id, chunk_size),
+        )
+        upper = (await cur.fetchone())[0]
+        if upper is None:
+            # Rows left over from credentials no longer issued by this issuer
+            await db.execute("DELETE FROM credential_fields WHERE issuer_id=? AND credential_id > ?", (issuer_id, last_id))
+            await db.commit()
+            return written
+
+        chunk = (issuer_id, last_id, upper)
+        await db.execute(
+            "DELETE FROM credential_fields WHERE credential_id IN "
+            "(SELECT id FROM issued_vcs WHERE issuer_id=? AND id > ? AND id <= ?)",
+            chunk,
+        )
+        cur = await db.execute(
+            "INSERT OR REPLACE INTO credential_fields(credential_id, issuer_id, key, value)"
+            + credential_fields_select("iv", "issued_vcs iv, ")
+            + " AND iv.issuer_id = ? AND iv.id > ? AND iv.id <= ?",
+            chunk,
+        )
+        written += cur.rowcount
+        await db.commit()
+        last_id = upper
+        # Let request handlers get at the write lock between chunks
+        await asyncio.sleep(0)
+
+
+class FieldReindexer:
+    """Runs reindex_issuer_fields off the request, one task per issuer.
+
+    Declarations that change while the issuer's rebuild is running mark it
+    dirty, and the task makes exactly one more pass when it finishes, so a
+    burst of template edits costs at most two rebuilds.
+    """
+
+    def __init__(self, chunk_size: int = 1000):
+        self.chunk_size = chunk_size
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._dirty: Set[int] = set()
+        self.runs = 0
+        self.failed = 0
+        self.last_run: Optional[dict] = None
+
+    def schedule(self, issuer_id: int) -> None:
+        task = self._tasks.get(issuer_id)
+        if task is not None and not task.done():
+            self._dirty.add(issuer_id)
+            return
+        self._tasks[issuer_id] = asyncio.create_task(self._run(issuer_id))
+
+    async def _run(self, issuer_id: int):
+        try:
+            while True:
+                self._dirty.discard(issuer_id)
+                try:
+                    # The request's connection is closed once the response is sent
+                    async with aiosqlite.connect(settings.SQLITE_PATH) as db:
+                        written = await reindex_issuer_fields(db, issuer_id, self.chunk_size)
+                    self.runs += 1
+                    self.last_run = {"at": int(time.time()), "issuer_id": issuer_id, "written": written}
+                except Exception as e:
+                    self.failed += 1
+                    print(f"Credential fields: reindex of issuer {issuer_id} failed: {e}")
+                if issuer_id not in self._dirty:
+                    break
+        finally:
+            self._tasks.pop(issuer_id, None)
+
+    async def wait(self):
+        """Until every scheduled rebuild (including reruns) has finished"""
+        while self._tasks:
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    async def stop(self):
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+        self._dirty.clear()
+
+    def metrics(self) -> dict:
+        return {
+            "pending": sorted(self._tasks),
+            "chunk_size": self.chunk_size,
+            "runs": self.runs,
+            "failed": self.failed,
+            "last_run": self.last_run,
+        }
+
+
+field_reindexer = FieldReindexer()
@@ -1,7 +1,15 @@
 import aiosqlite
-from typing import AsyncGenerator
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, Optional
 from backend.settings import settings
 
+try:
+    import fcntl
+except ImportError:  # Windows dev machines run a single worker
+    fcntl = None
+
 SCHEMA_SQL = """
 PRAGMA journal_mode=WAL;
 
@@ -11,6 +19,8 @@ CREATE TABLE IF NOT EXISTS used_nonces (
   expires_at INTEGER NOT NULL
 );
 
+CREATE INDEX IF NOT EXISTS idx_used_nonces_expires_at ON used_nonces(expires_at);
+
 CREATE TABLE IF NOT EXISTS vc_status (
   vc_id TEXT PRIMARY KEY,
   issuer_did TEXT NOT NULL,
@@ -28,7 +38,10 @@ CREATE TABLE IF NOT EXISTS audit_logs (
   did_issuer TEXT,
   did_subject TEXT,
   result TEXT NOT NULL,         -- 'ok' | 'fail' | 'replay' | 'revoked'
-  meta TEXT
+  meta TEXT,
+  vc_id TEXT,                   -- credential the event refers to (indexed, replaces meta LIKE)
+  issuer_id INTEGER,
+  user_id INTEGER
 );
 
 CREATE TABLE IF NOT EXISTS users (
@@ -68,6 +81,7 @@ CREATE TABLE IF NOT EXISTS user_vcs (
   vc_payload TEXT NOT NULL,     -- full VC JSON
   vc_hash TEXT,                 -- SHA256 canonical hash for quick lookups
   subject_did TEXT NOT NULL DEFAULT '', -- cached subject DID for enforcement
+  version INTEGER NOT NULL DEFAULT 0,   -- bumped on every update (ROW_VERSION_SQL)
   created_at INTEGER NOT NULL,
   updated_at INTEGER NOT NULL,
   FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE,
@@ -133,6 +147,7 @@ CREATE TABLE IF NOT EXISTS issued_vcs (
   payload_hash TEXT,            -- SHA256(payload canonical JSON)
   credential_type TEXT,         -- extracted from payload for filtering
   template_id INTEGER,          -- reference to issuer_templates (optional)
+  expires_at INTEGER,           -- expirationDate / validUntil as epoch seconds (NULL = no expiry)
   created_at INTEGER NOT NULL,
   updated_at INTEGER,
   FOREIGN KEY(issuer_id) REFERENCES issuers(id),
@@ -150,7 +165,9 @@ CREATE TABLE IF NOT EXISTS issuer_templates (
   description TEXT,
   vc_type TEXT NOT NULL,
   schema_json TEXT NOT NULL,    -- JSON schema for the template
+  indexed_fields TEXT NOT NULL DEFAULT '[]',  -- JSON array of payload paths copied to credential_fields
   is_active INTEGER DEFAULT 1,
+  version INTEGER NOT NULL DEFAULT 0,   -- bumped on every update (ROW_VERSION_SQL)
   created_at INTEGER NOT NULL,
   updated_at INTEGER NOT NULL,
   FOREIGN KEY(issuer_id) REFERENCES issuers(id) ON DELETE CASCADE
@@ -158,6 +175,20 @@ CREATE TABLE IF NOT EXISTS issuer_templates (
 
 CREATE INDEX IF NOT EXISTS idx_issuer_templates_issuer_id ON issuer_templates(issuer_id);
 
+-- Payload fields an issuer's templates declare as indexed (indexed_fields),
+-- one row per credential and field, so the credential list can filter on
+-- them without parsing payloads. Maintained by CREDENTIAL_FIELDS_SQL triggers
+-- and credential_fields.reindex_issuer_fields.
+CREATE TABLE IF NOT EXISTS credential_fields (
+  credential_id INTEGER NOT NULL,  -- issued_vcs.id
+  issuer_id INTEGER NOT NULL,
+  key TEXT NOT NULL,               -- payload path, e.g. 'credentialSubject.department'
+  value TEXT,                      -- scalar value as text
+  PRIMARY KEY(credential_id, key)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_credential_fields_lookup ON credential_fields(issuer_id, key, value, credential_id);
+
 CREATE TABLE IF NOT EXISTS issuer_webhooks (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
   issuer_id INTEGER NOT NULL,
@@ -180,6 +211,7 @@ CREATE TABLE IF NOT EXISTS vc_templates (
   description TEXT,             -- template description
   vc_type TEXT NOT NULL,        -- e.g., "StudentCard", "Membership"
   fields TEXT NOT NULL,         -- JSON: field definitions
+  version INTEGER NOT NULL DEFAULT 0,   -- bumped on every update (ROW_VERSION_SQL)
   created_at INTEGER NOT NULL,
   updated_at INTEGER NOT NULL,
   FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE
@@ -194,6 +226,8 @@ CREATE TABLE IF NOT EXISTS tmp_payloads (
   expires_at INTEGER NOT NULL
 );
 
+CREATE INDEX IF NOT EXISTS idx_tmp_payloads_expires_at ON tmp_payloads(expires_at);
+
 CREATE TABLE IF NOT EXISTS user_did_rotations (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
   user_id INTEGER NOT NULL,
@@ -232,6 +266,9 @@ CREATE TABLE IF NOT EXISTS oauth_auth_codes (
   FOREIGN KEY(client_id) REFERENCES oauth_clients(client_id)
 );
 
+CREATE INDEX IF NOT EXISTS idx_oauth_auth_codes_expires_at ON oauth_auth_codes(expires_at);
+CREATE INDEX IF NOT EXISTS idx_oauth_auth_codes_used ON oauth_auth_codes(used) WHERE used = 1;
+
 CREATE TABLE IF NOT EXISTS oauth_access_tokens (
   token TEXT PRIMARY KEY,
   client_id TEXT NOT NULL,
@@ -242,6 +279,142 @@ CREATE TABLE IF NOT EXISTS oauth_access_tokens (
   FOREIGN KEY(client_id) REFERENCES oauth_clients(client_id)
 );
 
+CREATE INDEX IF NOT EXISTS idx_oauth_access_tokens_expires_at ON oauth_access_tokens(expires_at);
+
+-- Sequenced log of trust changes (credential status, issuer status/DID).
+-- Offline verifier bundles are tagged with the last seq they include and
+-- deltas replay everything after it. Filled by triggers, so every write
+-- path is covered. The sweeper drops changes older than
+-- TRUST_CHANGES_RETENTION_DAYS; deltas from before that are refused.
+CREATE TABLE IF NOT EXISTS trust_changes (
+  seq INTEGER PRIMARY KEY AUTOINCREMENT,
+  kind TEXT NOT NULL,           -- 'vc' | 'issuer'
+  ref TEXT NOT NULL,            -- vc_id | issuer id
+  status TEXT,
+  ts INTEGER NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_trust_changes_ts ON trust_changes(ts);
+
+CREATE INDEX IF NOT EXISTS idx_vc_status_status ON vc_status(status) WHERE status != 'valid';
+
+CREATE TRIGGER IF NOT EXISTS trg_vc_status_trust_insert AFTER INSERT ON vc_status
+WHEN NEW.status != 'valid'
+BEGIN
+  INSERT INTO trust_changes(kind, ref, status, ts) VALUES('vc', NEW.vc_id, NEW.status, NEW.updated_at);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_vc_status_trust_update AFTER UPDATE OF status ON vc_status
+WHEN OLD.status IS NOT NEW.status
+BEGIN
+  INSERT INTO trust_changes(kind, ref, status, ts) VALUES('vc', NEW.vc_id, NEW.status, NEW.updated_at);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_issuers_trust_insert AFTER INSERT ON issuers
+BEGIN
+  INSERT INTO trust_changes(kind, ref, status, ts) VALUES('issuer', CAST(NEW.id AS TEXT), NEW.status, NEW.updated_at);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_issuers_trust_update AFTER UPDATE OF status, did ON issuers
+WHEN OLD.status IS NOT NEW.status OR OLD.did IS NOT NEW.did
+BEGIN
+  INSERT INTO trust_changes(kind, ref, status, ts) VALUES('issuer', CAST(NEW.id AS TEXT), NEW.status, NEW.updated_at);
+END;
+
+-- Per-issuer credential counters for the issuer console. Kept current by the
+-- triggers below in the same transaction as the write; issuer_counters.py
+-- rebuilds them from issued_vcs / vc_status (reconcile).
+CREATE TABLE IF NOT EXISTS issuer_counters (
+  issuer_id INTEGER PRIMARY KEY,
+  total INTEGER NOT NULL DEFAULT 0,
+  active INTEGER NOT NULL DEFAULT 0,     -- vc_status 'valid'
+  revoked INTEGER NOT NULL DEFAULT 0,
+  suspended INTEGER NOT NULL DEFAULT 0,
+  expired INTEGER NOT NULL DEFAULT 0,
+  updated_at INTEGER
+);
+
+-- Daily per-issuer event counts for the analytics endpoints, keyed by
+-- (issuer, UTC day 'YYYY-MM-DD', credential type, action) where action is
+-- 'issued' | 'revoked' | 'verified' | 'verify_failed'. Maintained by the
+-- ISSUER_ROLLUP_TRIGGERS_SQL triggers; issuer_rollups.py rebuilds recent days.
+CREATE TABLE IF NOT EXISTS issuer_daily_rollups (
+  issuer_id INTEGER NOT NULL,
+  day TEXT NOT NULL,
+  credential_type TEXT NOT NULL,
+  action TEXT NOT NULL,
+  count INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY(issuer_id, day, credential_type, action)
+) WITHOUT ROWID;
+
+-- Progress of periodic jobs that must survive restarts, e.g. the expires_at
+-- watermark of the credential expiry sweep (credential_expiry.py).
+CREATE TABLE IF NOT EXISTS job_state (
+  name TEXT PRIMARY KEY,
+  value INTEGER NOT NULL,
+  updated_at INTEGER
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_issuer_counters_issue AFTER INSERT ON issued_vcs
+WHEN NEW.issuer_id IS NOT NULL
+BEGIN
+  INSERT OR IGNORE INTO issuer_counters(issuer_id) VALUES(NEW.issuer_id);
+  UPDATE issuer_counters SET
+    total = total + 1,
+    active = active + IFNULL((SELECT status = 'valid' FROM vc_status WHERE vc_id = NEW.vc_id), 0),
+    revoked = revoked + IFNULL((SELECT status = 'revoked' FROM vc_status WHERE vc_id = NEW.vc_id), 0),
+    suspended = suspended + IFNULL((SELECT status = 'suspended' FROM vc_status WHERE vc_id = NEW.vc_id), 0),
+    expired = expired + IFNULL((SELECT status = 'expired' FROM vc_status WHERE vc_id = NEW.vc_id), 0),
+    updated_at = CAST(strftime('%s', 'now') AS INTEGER)
+  WHERE issuer_id = NEW.issuer_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_issuer_counters_unissue AFTER DELETE ON issued_vcs
+WHEN OLD.issuer_id IS NOT NULL
+BEGIN
+  UPDATE issuer_counters SET
+    total = total - 1,
+    active = active - IFNULL((SELECT status = 'valid' FROM vc_status WHERE vc_id = OLD.vc_id), 0),
+    revoked = revoked - IFNULL((SELECT status = 'revoked' FROM vc_status WHERE vc_id = OLD.vc_id), 0),
+    suspended = suspended - IFNULL((SELECT status = 'suspended' FROM vc_status WHERE vc_id = OLD.vc_id), 0),
+    expired = expired - IFNULL((SELECT status = 'expired' FROM vc_status WHERE vc_id = OLD.vc_id), 0),
+    updated_at = CAST(strftime('%s', 'now') AS INTEGER)
+  WHERE issuer_id = OLD.issuer_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_issuer_counters_status_insert AFTER INSERT ON vc_status
+BEGIN
+  UPDATE issuer_counters SET
+    active = active + (NEW.status = 'valid'),
+    revoked = revoked + (NEW.status = 'revoked'),
+    suspended = suspended + (NEW.status = 'suspended'),
+    expired = expired + (NEW.status = 'expired'),
+    updated_at = NEW.updated_at
+  WHERE issuer_id IN (SELECT issuer_id FROM issued_vcs WHERE vc_id = NEW.vc_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_issuer_counters_status_update AFTER UPDATE OF status ON vc_status
+WHEN OLD.status IS NOT NEW.status
+BEGIN
+  UPDATE issuer_counters SET
+    active = active + (NEW.status = 'valid') - (OLD.status = 'valid'),
+    revoked = revoked + (NEW.status = 'revoked') - (OLD.status = 'revoked'),
+    suspended = suspended + (NEW.status = 'suspended') - (OLD.status = 'suspended'),
+    expired = expired + (NEW.status = 'expired') - (OLD.status = 'expired'),
+    updated_at = NEW.updated_at
+  WHERE issuer_id IN (SELECT issuer_id FROM issued_vcs WHERE vc_id = NEW.vc_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_issuer_counters_status_delete AFTER DELETE ON vc_status
+BEGIN
+  UPDATE issuer_counters SET
+    active = active - (OLD.status = 'valid'),
+    revoked = revoked - (OLD.status = 'revoked'),
+    suspended = suspended - (OLD.status = 'suspended'),
+    expired = expired - (OLD.status = 'expired'),
+    updated_at = CAST(strftime('%s', 'now') AS INTEGER)
+  WHERE issuer_id IN (SELECT issuer_id FROM issued_vcs WHERE vc_id = OLD.vc_id);
+END;
 
 """
 
@@ -266,20 +439,236 @@ async def get_db() -> AsyncGenerator[aiosqlite.Connection, None]:
     yield conn
     await conn.close()
 
+async def get_readonly_db() -> AsyncGenerator[aiosqlite.Connection, None]:
+    """Read-only variant of get_db, used by the verify-only app profile"""
+    conn = await aiosqlite.connect(f"file:{settings.SQLITE_PATH}?mode=ro", uri=True)
+    conn.row_factory = aiosqlite.Row
+    yield conn
+    await conn.close()
+
+@asynccontextmanager
+async def _startup_leader_lock(db_path: str):
+    """Elect one process to run schema work when several workers start together.
+
+    Yields True in the elected leader. The other workers block until the
+    leader releases the lock and then yield False, since the schema is ready.
+    """
+    if fcntl is None:
+        yield True
+        return
+
+    fd = os.open(f"{db_path}.init.lock", os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            leader = True
+        except BlockingIOError:
+            await asyncio.to_thread(fcntl.flock, fd, fcntl.LOCK_EX)
+            leader = False
+        try:
+            yield leader
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
+
+
+class LeaderLease:
+    """Non-blocking counterpart of _startup_leader_lock for periodic jobs.
+
+    The first worker whose acquire() gets the flock on <SQLITE_PATH>.<name>.lock
+    keeps it until release() or process exit, so the job runs on one worker
+    per node. The others get False, try again on their next tick and take
+    over once the leader is gone.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._fd: Optional[int] = None
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def acquire(self) -> bool:
+        if fcntl is None:
+            return True
+        if self._fd is not None:
+            return True
+        fd = os.open(f"{settings.SQLITE_PATH}.{self.name}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+def _issued_vcs_fts_values(src: str) -> str:
+    """Column values of issued_vcs_fts for one issued_vcs row (`new` in triggers)"""
+    subject = f"CASE WHEN json_valid({src}.payload) THEN json_extract({src}.payload, '$.credentialSubject.%s') END"
+    return (
+        f"{src}.id, {src}.vc_id, {src}.subject_did, {src}.credential_type, "
+        f"{subject % 'name'}, "
+        f"COALESCE({subject % 'studentId'}, {subject % 'studentNumber'}, {subject % 'student_id'}), "
+        f"'~' || {src}.issuer_id || '~'"
+    )
+
+
+ISSUED_VCS_FTS_COLUMNS = "rowid, vc_id, subject_did, credential_type, subject_name, student_number, issuer_key"
+ISSUED_VCS_FTS_SEARCH_COLUMNS = "vc_id subject_did credential_type subject_name student_number"
+
+
+def issued_vcs_fts_query(issuer_id: int, term: str) -> str:
+    """MATCH expression for `term` as a substring of one issuer's credentials.
+
+    issuer_key holds "~<issuer_id>~", so the issuer's own (short) doclist is
+    intersected with the term's inside the FTS index instead of collecting
+    the term's matches across every issuer.
+    """
+    phrase = '"' + term.replace('"', '""') + '"'
+    return f'issuer_key : "~{int(issuer_id)}~" AND {{{ISSUED_VCS_FTS_SEARCH_COLUMNS}}} : {phrase}'
+
+# Trigram full-text index for the issuer console search (substring matches on
+# ids, DIDs, type and selected subject fields), scoped per issuer through
+# issuer_key (see issued_vcs_fts_query). Created in _run_migrations, after
+# the issued_vcs columns it reads exist.
+ISSUED_VCS_FTS_SQL = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS issued_vcs_fts USING fts5(
+  vc_id, subject_did, credential_type, subject_name, student_number, issuer_key, tokenize='trigram'
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_issued_vcs_fts_insert AFTER INSERT ON issued_vcs
+BEGIN
+  INSERT INTO issued_vcs_fts({ISSUED_VCS_FTS_COLUMNS}) VALUES({_issued_vcs_fts_values('new')});
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_issued_vcs_fts_update
+AFTER UPDATE OF vc_id, subject_did, credential_type, payload, issuer_id ON issued_vcs
+BEGIN
+  DELETE FROM issued_vcs_fts WHERE rowid = old.id;
+  INSERT INTO issued_vcs_fts({ISSUED_VCS_FTS_COLUMNS}) VALUES({_issued_vcs_fts_values('new')});
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_issued_vcs_fts_delete AFTER DELETE ON issued_vcs
+BEGIN
+  DELETE FROM issued_vcs_fts WHERE rowid = old.id;
+END;
+"""
+
+
+def credential_fields_select(src: str, source: str = "") -> str:
+    """credential_fields rows of the issued_vcs row(s) `src`: every scalar at a
+    path declared in indexed_fields of one of the issuer's templates"""
+    path = "'$.' || f.value"
+    return f"""
+  SELECT {src}.id, {src}.issuer_id, f.value, CAST(json_extract({src}.payload, {path}) AS TEXT)
+  FROM {source}issuer_templates t, json_each(t.indexed_fields) f
+  WHERE t.issuer_id = {src}.issuer_id AND json_valid({src}.payload)
+    AND json_type({src}.payload, {path}) IN ('text', 'integer', 'real', 'true', 'false')"""
+
+
+# Created in _run_migrations, after the migrated indexed_fields column exists
+CREDENTIAL_FIELDS_SQL = f"""
+CREATE TRIGGER IF NOT EXISTS trg_credential_fields_insert AFTER INSERT ON issued_vcs
+WHEN NEW.issuer_id IS NOT NULL
+BEGIN
+  INSERT OR REPLACE INTO credential_fields(credential_id, issuer_id, key, value){credential_fields_select("NEW")};
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_credential_fields_update AFTER UPDATE OF payload, issuer_id ON issued_vcs
+BEGIN
+  DELETE FROM credential_fields WHERE credential_id = OLD.id;
+  INSERT OR REPLACE INTO credential_fields(credential_id, issuer_id, key, value){credential_fields_select("NEW")};
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_credential_fields_delete AFTER DELETE ON issued_vcs
+BEGIN
+  DELETE FROM credential_fields WHERE credential_id = OLD.id;
+END;
+"""
+
+
+# Audit actions that record the verification of one credential (vc_id set)
+VERIFY_AUDIT_ACTIONS = ("present_verify", "vc_verify_simple", "vc_verify_batch", "kiosk_verify")
+_VERIFY_ACTIONS_SQL = ", ".join(f"'{a}'" for a in VERIFY_AUDIT_ACTIONS)
+
+
+def _rollup_upsert(issuer_id: str, ts: str, credential_type: str, action: str, source: str) -> str:
+    """Add one event per matching row of `source` to issuer_daily_rollups"""
+    return f"""
+  INSERT INTO issuer_daily_rollups(issuer_id, day, credential_type, action, count)
+  SELECT {issuer_id}, date({ts}, 'unixepoch'), COALESCE({credential_type}, 'Unknown'), {action}, 1
+  {source}
+  ON CONFLICT(issuer_id, day, credential_type, action) DO UPDATE SET count = count + 1;"""
+
+
+# Incremental maintenance of issuer_daily_rollups from the issue, status and
+# audit write paths. Created in _run_migrations, after the migrated
+# issued_vcs.credential_type and audit_logs.vc_id columns exist.
+ISSUER_ROLLUP_TRIGGERS_SQL = f"""
+CREATE TRIGGER IF NOT EXISTS trg_issuer_rollups_issue AFTER INSERT ON issued_vcs
+WHEN NEW.issuer_id IS NOT NULL
+BEGIN{_rollup_upsert("NEW.issuer_id", "NEW.created_at", "NEW.credential_type", "'issued'", "WHERE 1")}
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_issuer_rollups_revoke_insert AFTER INSERT ON vc_status
+WHEN NEW.status = 'revoked'
+BEGIN{_rollup_upsert("issuer_id", "NEW.updated_at", "credential_type", "'revoked'",
+                     "FROM issued_vcs WHERE vc_id = NEW.vc_id AND issuer_id IS NOT NULL")}
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_issuer_rollups_revoke_update AFTER UPDATE OF status ON vc_status
+WHEN NEW.status = 'revoked' AND OLD.status IS NOT 'revoked'
+BEGIN{_rollup_upsert("issuer_id", "NEW.updated_at", "credential_type", "'revoked'",
+                     "FROM issued_vcs WHERE vc_id = NEW.vc_id AND issuer_id IS NOT NULL")}
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_issuer_rollups_verify AFTER INSERT ON audit_logs
+WHEN NEW.vc_id IS NOT NULL AND NEW.action IN ({_VERIFY_ACTIONS_SQL})
+BEGIN{_rollup_upsert("issuer_id", "NEW.ts", "credential_type",
+                     "CASE WHEN NEW.result = 'ok' THEN 'verified' ELSE 'verify_failed' END",
+                     "FROM issued_vcs WHERE vc_id = NEW.vc_id AND issuer_id IS NOT NULL")}
+END;
+"""
+
+
+# Tables whose list endpoints send collection ETags (http_cache.py). updated_at
+# only has second resolution, so every update also bumps the row's version.
+ROW_VERSION_TABLES = ("user_vcs", "vc_templates", "issuer_templates")
+
+ROW_VERSION_SQL = "".join(f"""
+CREATE TRIGGER IF NOT EXISTS trg_{table}_version AFTER UPDATE ON {table}
+WHEN NEW.version = OLD.version
+BEGIN
+  UPDATE {table} SET version = OLD.version + 1 WHERE id = NEW.id;
+END;
+""" for table in ROW_VERSION_TABLES)
+
+
 async def init_db():
-    import os
     # Ensure the directory exists
     db_path = settings.SQLITE_PATH
     db_dir = os.path.dirname(db_path)
     if db_dir and not os.path.exists(db_dir):
         os.makedirs(db_dir, exist_ok=True)
-    
-    async with aiosqlite.connect(settings.SQLITE_PATH) as conn:
-        await conn.executescript(SCHEMA_SQL)
-        await conn.commit()
-        
-        # Run migrations for existing databases
-        await _run_migrations(conn)
+
+    async with _startup_leader_lock(db_path) as leader:
+        if not leader:
+            return
+
+        async with aiosqlite.connect(settings.SQLITE_PATH) as conn:
+            await conn.executescript(SCHEMA_SQL)
+            await conn.commit()
+
+            # Run migrations for existing databases
+            await _run_migrations(conn)
 
 async def _run_migrations(conn: aiosqlite.Connection):
     """Run database migrations to add new columns to existing tables"""
@@ -343,6 +732,16 @@ async def _run_migrations(conn: aiosqlite.Connection):
             except Exception as e:
                 print(f"Migration warning: Could not add column {column_name} to issuers: {e}")
     
+    # Check and migrate issuer_templates table
+    cursor = await conn.execute("PRAGMA table_info(issuer_templates)")
+    template_column_names = [col[1] for col in await cursor.fetchall()]
+    if "indexed_fields" not in template_column_names:
+        try:
+            await conn.execute("ALTER TABLE issuer_templates ADD COLUMN indexed_fields TEXT NOT NULL DEFAULT '[]'")
+            print("Migration: Added column indexed_fields to issuer_templates table")
+        except Exception as e:
+            print(f"Migration warning: Could not add column indexed_fields to issuer_templates: {e}")
+
     # Check and migrate issued_vcs table
     cursor = await conn.execute("PRAGMA table_info(issued_vcs)")
     columns = await cursor.fetchall()
@@ -353,6 +752,7 @@ async def _run_migrations(conn: aiosqlite.Connection):
         ("updated_at", "ALTER TABLE issued_vcs ADD COLUMN updated_at INTEGER"),
         ("payload_hash", "ALTER TABLE issued_vcs ADD COLUMN payload_hash TEXT"),
         ("template_id", "ALTER TABLE issued_vcs ADD COLUMN template_id INTEGER REFERENCES issuer_templates(id) ON DELETE SET NULL"),
+        ("expires_at", "ALTER TABLE issued_vcs ADD COLUMN expires_at INTEGER"),
     ]
     
     for column_name, alter_sql in issued_vcs_migrations:
@@ -363,6 +763,57 @@ async def _run_migrations(conn: aiosqlite.Connection):
             except Exception as e:
                 print(f"Migration warning: Could not add column {column_name} to issued_vcs: {e}")
 
+    # Composite indexes for the issuer console credential list (keyset order + filters)
+    await conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_issued_vcs_issuer_created ON issued_vcs(issuer_id, created_at DESC, id DESC)"
+    )
+    await conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_issued_vcs_issuer_type_created "
+        "ON issued_vcs(issuer_id, credential_type, created_at DESC, id DESC)"
+    )
+    await conn.execute("CREATE INDEX IF NOT EXISTS idx_vc_status_vc_id_status ON vc_status(vc_id, status)")
+    # Day-window scans of the issuer rollup rebuild (issuer_rollups.py)
+    await conn.execute("CREATE INDEX IF NOT EXISTS idx_issued_vcs_created_at ON issued_vcs(created_at)")
+    await conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_vc_status_revoked_updated ON vc_status(updated_at) WHERE status = 'revoked'"
+    )
+    # Expiry sweep range scans (credential_expiry.py); most credentials never expire
+    await conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_issued_vcs_expires_at ON issued_vcs(expires_at) WHERE expires_at IS NOT NULL"
+    )
+
+    cursor = await conn.execute("SELECT name FROM pragma_table_info('issued_vcs_fts')")
+    fts_columns = {row[0] for row in await cursor.fetchall()}
+    if fts_columns and "issuer_key" not in fts_columns:
+        # Built before searches were scoped per issuer: rebuild it with issuer_key
+        await conn.executescript(
+            "DROP TRIGGER IF EXISTS trg_issued_vcs_fts_insert;"
+            "DROP TRIGGER IF EXISTS trg_issued_vcs_fts_update;"
+            "DROP TRIGGER IF EXISTS trg_issued_vcs_fts_delete;"
+            "DROP TABLE issued_vcs_fts;"
+        )
+        print("Migration: Dropped issued_vcs_fts to add issuer_key")
+    fts_exists = "issuer_key" in fts_columns
+    await conn.executescript(ISSUED_VCS_FTS_SQL)
+    if not fts_exists:
+        cursor = await conn.execute(
+            f"INSERT INTO issued_vcs_fts({ISSUED_VCS_FTS_COLUMNS}) "
+            f"SELECT {_issued_vcs_fts_values('issued_vcs')} FROM issued_vcs"
+        )
+        print(f"Migration: Built issued_vcs_fts search index ({cursor.rowcount} rows)")
+
+    await conn.executescript(CREDENTIAL_FIELDS_SQL)
+
+    # Seed issuer_counters once for databases that predate it
+    await conn.commit()
+    cursor = await conn.execute(
+        "SELECT NOT EXISTS(SELECT 1 FROM issuer_counters) AND EXISTS(SELECT 1 FROM issued_vcs)"
+    )
+    if (await cursor.fetchone())[0]:
+        from backend.issuer_counters import reconcile_issuer_counters
+        result = await reconcile_issuer_counters(conn)
+        print(f"Migration: Seeded issuer_counters for {result['issuers']} issuers")
+
     # Check and migrate user_vcs table
     cursor = await conn.execute("PRAGMA table_info(user_vcs)")
     columns = await cursor.fetchall()
@@ -394,6 +845,49 @@ async def _run_migrations(conn: aiosqlite.Connection):
     except Exception as e:
         print(f"Migration warning: Could not normalize subject_did column: {e}")
 
+    # Check and migrate audit_logs table (structured, indexed columns)
+    cursor = await conn.execute("PRAGMA table_info(audit_logs)")
+    columns = await cursor.fetchall()
+    audit_column_names = [col[1] for col in columns]
+
+    audit_migrations = [
+        ("vc_id", "ALTER TABLE audit_logs ADD COLUMN vc_id TEXT"),
+        ("issuer_id", "ALTER TABLE audit_logs ADD COLUMN issuer_id INTEGER"),
+        ("user_id", "ALTER TABLE audit_logs ADD COLUMN user_id INTEGER"),
+    ]
+
+    for column_name, alter_sql in audit_migrations:
+        if column_name not in audit_column_names:
+            try:
+                await conn.execute(alter_sql)
+                print(f"Migration: Added column {column_name} to audit_logs table")
+            except Exception as e:
+                print(f"Migration warning: Could not add column {column_name} to audit_logs: {e}")
+
+    await conn.execute("CREATE INDEX IF NOT EXISTS idx_audit_logs_vc_id_ts ON audit_logs(vc_id, ts)")
+    await conn.execute("CREATE INDEX IF NOT EXISTS idx_audit_logs_action_ts ON audit_logs(action, ts)")
+    await conn.execute("CREATE INDEX IF NOT EXISTS idx_audit_logs_ts ON audit_logs(ts)")
+
+    # Daily issuer rollups: triggers, then a first build for existing data
+    await conn.executescript(ISSUER_ROLLUP_TRIGGERS_SQL)
+    cursor = await conn.execute(
+        "SELECT NOT EXISTS(SELECT 1 FROM issuer_daily_rollups) AND EXISTS(SELECT 1 FROM issued_vcs)"
+    )
+    if (await cursor.fetchone())[0]:
+        from backend.issuer_rollups import rebuild_issuer_rollups
+        result = await rebuild_issuer_rollups(conn)
+        print(f"Migration: Built issuer_daily_rollups ({result['rows']} rows)")
+
+    for table in ROW_VERSION_TABLES:
+        cursor = await conn.execute(f"PRAGMA table_info({table})")
+        if "version" not in [col[1] for col in await cursor.fetchall()]:
+            try:
+                await conn.execute(f"ALTER TABLE {table} ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+                print(f"Migration: Added column version to {table} table")
+            except Exception as e:
+                print(f"Migration warning: Could not add column version to {table}: {e}")
+    await conn.executescript(ROW_VERSION_SQL)
+
     # Ensure new indexes exist for DID enforcement tables
     await conn.execute("CREATE INDEX IF NOT EXISTS idx_user_vcs_subject_did ON user_vcs(subject_did)")
     await conn.execute("CREATE INDEX IF NOT EXISTS idx_user_did_rotations_user_id ON user_did_rotations(user_id)")
@@ -0,0 +1,93 @@
+"""
+HTTP Caching
+ETag / Last-Modified helpers for read endpoints whose answer only changes
+when the underlying rows do. Validators come from columns the tables
+already keep (payload hashes, updated_at timestamps, row ids), so a
+conditional request is answered with 304 after one small indexed query,
+before the response body is built (no decryption, JSON parsing or model
+validation).
+
+Public lookups (/recipient) may be cached by browsers and proxies for
+HTTP_CACHE_MAX_AGE seconds and served stale while revalidating. Revocation
+status (/status) must never be answered from a stale copy, so it is
+`no-cache`: caches keep it but revalidate every time, which stays cheap
+thanks to the ETag. Per-account lists are `private` and always revalidated:
+their validators include the account, so a 304 only ever confirms the
+caller's own copy.
+"""
+import hashlib
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Optional, Tuple
+
+import aiosqlite
+from fastapi import Request, Response
+
+from backend.settings import settings
+
+
+def make_etag(*parts: Any) -> str:
+    digest = hashlib.sha256("|".join(str(p) for p in parts).encode()).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+async def collection_validators(
+    db: aiosqlite.Connection, table: str, where: str, params: tuple, *scope: Any
+) -> Tuple[str, Optional[int]]:
+    """ETag and Last-Modified of the rows of `table` matching `where`
+
+    `table` must be one of ROW_VERSION_TABLES. Row count and the sum of row
+    ids change on every insert and delete, the sum of row versions on every
+    update, including several within the same second of updated_at.
+    """
+    cur = await db.execute(
+        f"SELECT COUNT(*), MAX(updated_at), TOTAL(id), TOTAL(version) FROM {table} WHERE {where}", params
+    )
+    count, last_modified, id_sum, version_sum = await cur.fetchone()
+    return make_etag(table, *scope, count, last_modified, id_sum, version_sum), last_modified
+
+
+def cache_headers(etag: str, last_modified: Optional[int], private: bool = False, revalidate: bool = False) -> dict:
+    if private:
+        cache_control = "private, max-age=0, must-revalidate"
+    elif revalidate:
+        cache_control = "no-cache"
+    else:
+        cache_control = (
+            f"public, max-age={settings.HTTP_CACHE_MAX_AGE}, "
+            f"stale-while-revalidate={settings.HTTP_CACHE_STALE_WHILE_REVALIDATE}"
+        )
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified:
+        headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+    return headers
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[int]) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match wins over If-Modified-Since (RFC 9110 13.2.2)
+        tags = [t.strip() for t in if_none_match.split(",")]
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            return last_modified <= int(parsedate_to_datetime(if_modified_since).timestamp())
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def conditional_response(
+    request: Request,
+    response: Response,
+    etag: str,
+    last_modified: Optional[int],
+    private: bool = False,
+    revalidate: bool = False,
+) -> Optional[Response]:
+    """304 response if the client's copy is current, else None after setting the headers on `response`"""
+    headers = cache_headers(etag, last_modified, private, revalidate)
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
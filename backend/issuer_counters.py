@@ -0,0 +1,161 @@
+"""
+Issuer Counters
+Per-issuer credential totals (total / active / revoked / suspended /
+expired) for the issuer dashboard, so a dashboard load reads one row of
+issuer_counters instead of counting issued_vcs joined to vc_status.
+
+The counters are maintained by the trg_issuer_counters_* triggers in
+database.py, inside the same transaction as the issuance or status change.
+Writes that bypass SQLite (manual edits, restored backups) can still make
+them drift, so CounterReconciler recomputes every issuer from the source
+tables every ISSUER_COUNTERS_RECONCILE_SECONDS and corrects the rows that
+differ. It runs on one worker per node (LeaderLease), and the full recount
+is a plain read; only the drifted issuers are recounted again and
+corrected inside a short write transaction.
+"""
+import asyncio
+import time
+from typing import Dict, Optional
+
+import aiosqlite
+
+from backend.database import LeaderLease
+from backend.settings import settings
+
+COUNTER_COLUMNS = ("total", "active", "revoked", "suspended", "expired")
+
+# vc_status.status -> counter column
+STATUS_COLUMNS: Dict[str, str] = {
+    "valid": "active",
+    "revoked": "revoked",
+    "suspended": "suspended",
+    "expired": "expired",
+}
+
+_RECOUNT_SQL = """
+    SELECT iv.issuer_id,
+           COUNT(*) AS total,
+           IFNULL(SUM(vs.status = 'valid'), 0) AS active,
+           IFNULL(SUM(vs.status = 'revoked'), 0) AS revoked,
+           IFNULL(SUM(vs.status = 'suspended'), 0) AS suspended,
+           IFNULL(SUM(vs.status = 'expired'), 0) AS expired
+    FROM issued_vcs iv
+    LEFT JOIN vc_status vs ON vs.vc_id = iv.vc_id
+    WHERE {where}
+    GROUP BY iv.issuer_id
+"""
+RECOUNT_SQL = _RECOUNT_SQL.format(where="iv.issuer_id IS NOT NULL")
+ISSUER_RECOUNT_SQL = _RECOUNT_SQL.format(where="iv.issuer_id = ?")
+STORED_SQL = f"SELECT issuer_id, {', '.join(COUNTER_COLUMNS)} FROM issuer_counters"
+
+
+async def read_issuer_counters(db: aiosqlite.Connection, issuer_id: int) -> Dict[str, int]:
+    """Counters of one issuer; zeros if it has not issued anything yet"""
+    cur = await db.execute(
+        f"SELECT {', '.join(COUNTER_COLUMNS)} FROM issuer_counters WHERE issuer_id=?",
+        (issuer_id,),
+    )
+    row = await cur.fetchone()
+    if row is None:
+        return {column: 0 for column in COUNTER_COLUMNS}
+    return {column: row[i] for i, column in enumerate(COUNTER_COLUMNS)}
+
+
+async def reconcile_issuer_counters(conn: aiosqlite.Connection) -> dict:
+    """Recompute all counters from issued_vcs / vc_status and fix the rows that drifted
+
+    The full recount runs outside any write transaction, so issuance is
+    never blocked by it. Issuers whose counters look wrong are then counted
+    again one by one under BEGIN IMMEDIATE and corrected, so a write that
+    landed after the recount cannot be overwritten with a stale value.
+    """
+    now = int(time.time())
+    cur = await conn.execute(RECOUNT_SQL)
+    expected = {row[0]: tuple(row[1:]) for row in await cur.fetchall()}
+    cur = await conn.execute(STORED_SQL)
+    stored = {row[0]: tuple(row[1:]) for row in await cur.fetchall()}
+    suspects = [issuer_id for issuer_id, counts in expected.items() if stored.get(issuer_id) != counts]
+    suspects += [issuer_id for issuer_id, counts in stored.items() if issuer_id not in expected and any(counts)]
+    await conn.commit()  # BEGIN IMMEDIATE needs the connection outside a transaction
+
+    corrected = 0
+    if suspects:
+        await conn.execute("BEGIN IMMEDIATE")
+        try:
+            for issuer_id in suspects:
+                cur = await conn.execute(ISSUER_RECOUNT_SQL, (issuer_id,))
+                row = await cur.fetchone()
+                cur = await conn.execute(STORED_SQL + " WHERE issuer_id=?", (issuer_id,))
+                current = await cur.fetchone()
+                if row is not None:
+                    if current is None or tuple(current[1:]) != tuple(row[1:]):
+                        await conn.execute(
+                            f"INSERT OR REPLACE INTO issuer_counters(issuer_id, {', '.join(COUNTER_COLUMNS)}, updated_at) "
+                            "VALUES(?,?,?,?,?,?,?)",
+                            (issuer_id, *row[1:], now),
+                        )
+                        corrected += 1
+                elif current is not None and any(current[1:]):
+                    await conn.execute("DELETE FROM issuer_counters WHERE issuer_id=?", (issuer_id,))
+                    corrected += 1
+            await conn.commit()
+        except BaseException:
+            await conn.rollback()
+            raise
+    return {"issuers": len(expected), "corrected": corrected, "at": now}
+
+
+class CounterReconciler:
+    """Periodically reconciles issuer_counters against the source tables"""
+
+    def __init__(self, interval: Optional[int] = None):
+        self.interval = interval or settings.ISSUER_COUNTERS_RECONCILE_SECONDS
+        self.lease = LeaderLease("counters")
+        self._task: Optional[asyncio.Task] = None
+        self.last_run: Optional[dict] = None
+        self.corrected_total = 0
+
+    async def run_once(self) -> dict:
+        async with aiosqlite.connect(settings.SQLITE_PATH) as conn:
+            result = await reconcile_issuer_counters(conn)
+        if result["corrected"]:
+            print(f"Issuer counters: corrected {result['corrected']} drifted issuers")
+        self.corrected_total += result["corrected"]
+        self.last_run = result
+        return result
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            if not self.lease.acquire():
+                continue  # another worker is the leader
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"Issuer counters: reconcile failed: {e}")
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.lease.release()
+
+    def metrics(self) -> dict:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "leader": self.lease.held,
+            "interval_seconds": self.interval,
+            "corrected_total": self.corrected_total,
+            "last_run": self.last_run,
+        }
+
+
+counter_reconciler = CounterReconciler()
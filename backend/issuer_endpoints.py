@@ -3,14 +3,29 @@ Issuer Console API Endpoints
 Modern, production-grade issuer management APIs
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Header
-from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Header, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
 import time
 import json
-from backend.database import get_db
+from datetime import datetime, timezone
+from backend.core.crypto_ed25519 import b64u, b64u_d
+from backend.database import get_db, issued_vcs_fts_query
+from backend.http_cache import collection_validators, conditional_response
+from backend.audit_archive import query_audit
+from backend.issuer_registry import issuer_registry
+from backend.issuer_counters import STATUS_COLUMNS, read_issuer_counters
+from backend.credential_export import EXPORT_FORMATS, stream_export
+from backend.credential_fields import (
+    field_reindexer, issuer_indexed_fields, parse_field_filters, validate_indexed_fields,
+)
+from backend.issuer_rollups import ROLLUP_ACTIONS, day_label
+from backend.settings import settings
 from backend.schemas import (
     IssuerUpdateReq,
     IssuerStatsResp,
+    IssuerTimeseriesPoint,
+    IssuerTimeseriesResp,
     IssuerCredentialListReq,
     IssuerCredentialListResp,
     IssuerCredentialItem,
@@ -90,6 +105,7 @@ async def update_issuer_profile(
         sql = f"UPDATE issuers SET {', '.join(updates)} WHERE id=?"
         await db.execute(sql, tuple(params))
         await db.commit()
+        await issuer_registry.refresh_issuer(db, issuer["id"])
     
     # Fetch updated issuer
     updated = await db.execute_fetchone(
@@ -124,61 +140,111 @@ async def get_issuer_stats(
     issuer=Depends(_get_current_issuer_from_dep),
     db=Depends(get_db)
 ):
-    """Get dashboard statistics for issuer"""
-    # Total issued
-    total_row = await db.execute_fetchone(
-        "SELECT COUNT(*) as count FROM issued_vcs WHERE issuer_id=?",
-        (issuer["id"],)
-    )
-    total_issued = total_row["count"] if total_row else 0
-    
-    # Active (valid) count
-    active_row = await db.execute_fetchone(
-        """
-        SELECT COUNT(*) as count FROM issued_vcs iv
-        JOIN vc_status vs ON iv.vc_id = vs.vc_id
-        WHERE iv.issuer_id=? AND vs.status='valid'
-        """,
-        (issuer["id"],)
+    """Get dashboard statistics for issuer (one row of issuer_counters)"""
+    counters = await read_issuer_counters(db, issuer["id"])
+    return IssuerStatsResp(
+        total_issued=counters["total"],
+        active_count=counters["active"],
+        revoked_count=counters["revoked"],
+        expired_count=counters["expired"]
     )
-    active_count = active_row["count"] if active_row else 0
-    
-    # Revoked count
-    revoked_row = await db.execute_fetchone(
-        """
-        SELECT COUNT(*) as count FROM issued_vcs iv
-        JOIN vc_status vs ON iv.vc_id = vs.vc_id
-        WHERE iv.issuer_id=? AND vs.status='revoked'
+
+
+def _parse_day(value: str) -> int:
+    try:
+        return int(datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bad_date")
+
+
+@router.get("/analytics/timeseries", response_model=IssuerTimeseriesResp)
+async def get_issuer_timeseries(
+    date_from: Optional[str] = Query(None, description="First UTC day, YYYY-MM-DD (default: 29 days before date_to)"),
+    date_to: Optional[str] = Query(None, description="Last UTC day, YYYY-MM-DD (default: today)"),
+    credential_type: Optional[str] = None,
+    action: Optional[str] = Query(None, description="issued | revoked | verified | verify_failed"),
+    issuer=Depends(_get_current_issuer_from_dep),
+    db=Depends(get_db)
+):
+    """Daily issued / revoked / verified counts per credential type
+
+    Reads only issuer_daily_rollups (see issuer_rollups.py).
+    """
+    end = _parse_day(date_to) if date_to else int(time.time())
+    start = _parse_day(date_from) if date_from else end - 29 * 86400
+    if start > end:
+        raise HTTPException(status_code=400, detail="bad_date_range")
+    if (end - start) // 86400 + 1 > settings.ISSUER_TIMESERIES_MAX_DAYS:
+        raise HTTPException(status_code=400, detail="date_range_too_large")
+    if action and action not in ROLLUP_ACTIONS:
+        raise HTTPException(status_code=400, detail="bad_action")
+
+    where_clauses = ["issuer_id=?", "day BETWEEN ? AND ?"]
+    params = [issuer["id"], day_label(start), day_label(end)]
+    if credential_type:
+        where_clauses.append("credential_type=?")
+        params.append(credential_type)
+    if action:
+        where_clauses.append("action=?")
+        params.append(action)
+
+    rows = await db.execute_fetchall(
+        f"""
+        SELECT day, credential_type, action, count FROM issuer_daily_rollups
+        WHERE {" AND ".join(where_clauses)}
+        ORDER BY day, credential_type, action
         """,
-        (issuer["id"],)
+        tuple(params),
     )
-    revoked_count = revoked_row["count"] if revoked_row else 0
-    
-    # Expired count (for now, we'll estimate or set to 0)
-    expired_count = 0  # TODO: Add expiration logic based on VC exp field
-    
-    return IssuerStatsResp(
-        total_issued=total_issued,
-        active_count=active_count,
-        revoked_count=revoked_count,
-        expired_count=expired_count
+    return IssuerTimeseriesResp(
+        date_from=day_label(start),
+        date_to=day_label(end),
+        points=[
+            IssuerTimeseriesPoint(day=r["day"], credential_type=r["credential_type"], action=r["action"], count=r["count"])
+            for r in rows
+        ],
     )
 
 
 # ---------- Credentials Management ----------
-@router.get("/credentials", response_model=IssuerCredentialListResp)
+def _encode_cursor(created_at: int, row_id: int) -> str:
+    return b64u(json.dumps([created_at, row_id], separators=(",", ":")).encode())
+
+
+def _decode_cursor(cursor: str):
+    try:
+        created_at, row_id = json.loads(b64u_d(cursor))
+        return int(created_at), int(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="bad_cursor")
+
+
 async def list_issuer_credentials(
-    page: int = Query(1, ge=1),
-    per_page: int = Query(20, ge=1, le=100),
-    status: Optional[str] = Query(None),
-    template_type: Optional[str] = Query(None),
-    search: Optional[str] = Query(None),
-    date_from: Optional[int] = Query(None),
-    date_to: Optional[int] = Query(None),
-    issuer=Depends(_get_current_issuer_from_dep),
-    db=Depends(get_db)
-):
-    """List credentials issued by this issuer with pagination and filters"""
+    issuer,
+    db,
+    page: int = 1,
+    per_page: int = 20,
+    status: Optional[str] = None,
+    template_type: Optional[str] = None,
+    search: Optional[str] = None,
+    date_from: Optional[int] = None,
+    date_to: Optional[int] = None,
+    cursor: Optional[str] = None,
+    total: str = "exact",
+    fields: Optional[List[str]] = None,
+) -> IssuerCredentialListResp:
+    """List credentials issued by this issuer with pagination and filters
+
+    Served by GET /api/issuer/credentials in app.py, which owns that path
+    (and still returns the full list when called without parameters).
+
+    Pass `next_cursor` of the previous response as `cursor` for keyset
+    pagination (newest first, stable under concurrent issuance); `page` is
+    the legacy OFFSET mode. `total=estimate` stops counting at
+    ISSUER_LIST_COUNT_CAP and `total=none` skips the count. `fields` filters
+    on payload paths the issuer's templates declare as indexed, written as
+    `path=value`, `path>=value` or `path<=value` (see credential_fields.py).
+    """
     
     # Build query
     where_clauses = ["iv.issuer_id=?"]
@@ -192,7 +258,13 @@ async def list_issuer_credentials(
         where_clauses.append("iv.credential_type=?")
         params.append(template_type)
     
-    if search:
+    if search and len(search) >= 3:
+        # Trigram index: substring match on ids, DID, type, subject name and student
+        # number, intersected with this issuer's rows inside the index
+        where_clauses.append("iv.id IN (SELECT rowid FROM issued_vcs_fts WHERE issued_vcs_fts MATCH ?)")
+        params.append(issued_vcs_fts_query(issuer["id"], search))
+    elif search:
+        # Trigrams need three characters; shorter terms fall back to LIKE
         where_clauses.append("(iv.subject_did LIKE ? OR iv.vc_id LIKE ?)")
         search_pattern = f"%{search}%"
         params.extend([search_pattern, search_pattern])
@@ -204,20 +276,54 @@ async def list_issuer_credentials(
     if date_to:
         where_clauses.append("iv.created_at <= ?")
         params.append(date_to)
+
+    if fields:
+        try:
+            field_filters = parse_field_filters(fields)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if not {key for key, _, _ in field_filters} <= await issuer_indexed_fields(db, issuer["id"]):
+            raise HTTPException(status_code=400, detail="field_not_indexed")
+        for key, op, value in field_filters:
+            where_clauses.append(
+                f"iv.id IN (SELECT credential_id FROM credential_fields WHERE issuer_id=? AND key=? AND value {op} ?)"
+            )
+            params.extend([issuer["id"], key, value])
     
     where_sql = " AND ".join(where_clauses)
     
     # Count total
-    count_sql = f"""
-        SELECT COUNT(*) as count FROM issued_vcs iv
-        LEFT JOIN vc_status vs ON iv.vc_id = vs.vc_id
-        WHERE {where_sql}
-    """
-    total_row = await db.execute_fetchone(count_sql, tuple(params))
-    total = total_row["count"] if total_row else 0
-    
-    # Fetch page
-    offset = (page - 1) * per_page
+    total_count = None
+    total_exact = True
+    counted_by_status = not (template_type or search or date_from or date_to or fields) and (
+        not status or status in STATUS_COLUMNS
+    )
+    if total != "none" and counted_by_status:
+        # No filter beyond issuer / status: the dashboard counters already hold the total
+        counters = await read_issuer_counters(db, issuer["id"])
+        total_count = counters[STATUS_COLUMNS[status] if status else "total"]
+    elif total != "none":
+        count_sql = f"""
+            SELECT 1 FROM issued_vcs iv
+            LEFT JOIN vc_status vs ON iv.vc_id = vs.vc_id
+            WHERE {where_sql}
+        """
+        if total == "estimate":
+            cap = settings.ISSUER_LIST_COUNT_CAP
+            count_sql += f" LIMIT {cap + 1}"
+        total_row = await db.execute_fetchone(f"SELECT COUNT(*) as count FROM ({count_sql})", tuple(params))
+        total_count = total_row["count"] if total_row else 0
+        if total == "estimate" and total_count > cap:
+            total_count, total_exact = cap, False
+    
+    # Fetch page: keyset on (created_at, id), served by idx_issued_vcs_issuer_created
+    list_params = list(params)
+    if cursor:
+        where_sql += " AND (iv.created_at, iv.id) < (?, ?)"
+        list_params.extend(_decode_cursor(cursor))
+        offset = 0
+    else:
+        offset = (page - 1) * per_page
     list_sql = f"""
         SELECT iv.id, iv.vc_id, iv.subject_did, iv.recipient_id, 
                iv.credential_type, iv.created_at, iv.updated_at,
@@ -225,12 +331,16 @@ async def list_issuer_credentials(
         FROM issued_vcs iv
         LEFT JOIN vc_status vs ON iv.vc_id = vs.vc_id
         WHERE {where_sql}
-        ORDER BY iv.created_at DESC
+        ORDER BY iv.created_at DESC, iv.id DESC
         LIMIT ? OFFSET ?
     """
-    params.extend([per_page, offset])
+    list_params.extend([per_page + 1, offset])
     
-    rows = await db.execute_fetchall(list_sql, tuple(params))
+    rows = await db.execute_fetchall(list_sql, tuple(list_params))
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = _encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
     
     credentials = []
     for row in rows:
@@ -247,9 +357,34 @@ async def list_issuer_credentials(
     
     return IssuerCredentialListResp(
         credentials=credentials,
-        total=total,
+        total=total_count,
+        total_exact=total_exact,
         page=page,
-        per_page=per_page
+        per_page=per_page,
+        next_cursor=next_cursor,
+    )
+
+
+@router.get("/credentials/export")
+async def export_issuer_credentials(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    gzip: bool = False,
+    after_id: int = Query(0, ge=0, description="Resume after the last id received"),
+    status: Optional[str] = None,
+    template_type: Optional[str] = None,
+    include_payload: bool = False,
+    issuer=Depends(_get_current_issuer_from_dep),
+):
+    """Stream all credentials of this issuer as NDJSON or CSV, oldest first
+
+    Rows are read through a cursor and sent in chunks, so memory does not
+    grow with the number of credentials (see credential_export.py).
+    """
+    filename = f"credentials-{issuer['id']}.{format}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        stream_export(issuer["id"], format, gzip, after_id, status, template_type, include_payload),
+        media_type="application/gzip" if gzip else EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
 
 
@@ -280,26 +415,8 @@ async def get_credential_detail(
     except:
         credential = {}
     
-    # Fetch audit log for this credential
-    audit_rows = await db.execute_fetchall(
-        """
-        SELECT ts, action, result, meta
-        FROM audit_logs
-        WHERE meta LIKE ?
-        ORDER BY ts DESC
-        LIMIT 50
-        """,
-        (f'%"vc_id": "{vc_id}"%',)
-    )
-    
-    audit_log = []
-    for audit_row in audit_rows:
-        audit_log.append({
-            "timestamp": audit_row["ts"],
-            "action": audit_row["action"],
-            "result": audit_row["result"],
-            "meta": json.loads(audit_row["meta"] or "{}")
-        })
+    # Fetch audit log for this credential (hot table by vc_id index, then archive)
+    audit_log = await query_audit(db, vc_id=vc_id, limit=50)
     
     return IssuerCredentialDetailResp(
         credential=credential,
@@ -311,13 +428,22 @@ async def get_credential_detail(
 # ---------- Templates Management ----------
 @router.get("/templates", response_model=IssuerTemplateListResp)
 async def list_issuer_templates(
+    request: Request,
+    response: Response,
     issuer=Depends(_get_current_issuer_from_dep),
     db=Depends(get_db)
 ):
     """List all templates for this issuer"""
+    etag, last_modified = await collection_validators(
+        db, "issuer_templates", "issuer_id=?", (issuer["id"],), issuer["id"]
+    )
+    not_modified = conditional_response(request, response, etag, last_modified, private=True)
+    if not_modified:
+        return not_modified
+
     rows = await db.execute_fetchall(
         """
-        SELECT id, name, description, vc_type, schema_json, is_active, created_at, updated_at
+        SELECT id, name, description, vc_type, schema_json, indexed_fields, is_active, created_at, updated_at
         FROM issuer_templates
         WHERE issuer_id=?
         ORDER BY created_at DESC
@@ -338,6 +464,7 @@ async def list_issuer_templates(
             description=row["description"],
             vc_type=row["vc_type"],
             schema_data=schema_json,
+            indexed_fields=json.loads(row["indexed_fields"] or "[]"),
             is_active=bool(row["is_active"]),
             created_at=row["created_at"],
             updated_at=row["updated_at"]
@@ -346,6 +473,13 @@ async def list_issuer_templates(
     return IssuerTemplateListResp(templates=templates)
 
 
+def _indexed_fields(body: IssuerTemplateReq) -> List[str]:
+    try:
+        return validate_indexed_fields(body.indexed_fields or [])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.post("/templates")
 async def create_issuer_template(
     body: IssuerTemplateReq,
@@ -354,11 +488,12 @@ async def create_issuer_template(
 ):
     """Create a new template"""
     now = int(time.time())
+    indexed_fields = _indexed_fields(body)
     
     cur = await db.execute(
         """
-        INSERT INTO issuer_templates(issuer_id, name, description, vc_type, schema_json, is_active, created_at, updated_at)
-        VALUES(?, ?, ?, ?, ?, ?, ?, ?)
+        INSERT INTO issuer_templates(issuer_id, name, description, vc_type, schema_json, indexed_fields, is_active, created_at, updated_at)
+        VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?)
         """,
         (
             issuer["id"],
@@ -366,12 +501,15 @@ async def create_issuer_template(
             body.description or "",
             body.vc_type,
             json.dumps(body.schema_data),
+            json.dumps(indexed_fields),
             1 if body.is_active else 0,
             now,
             now
         )
     )
     await db.commit()
+    if indexed_fields:
+        field_reindexer.schedule(issuer["id"])
     
     return {"ok": True, "template_id": cur.lastrowid}
 
@@ -386,17 +524,20 @@ async def update_issuer_template(
     """Update a template"""
     # Check ownership
     existing = await db.execute_fetchone(
-        "SELECT id FROM issuer_templates WHERE id=? AND issuer_id=?",
+        "SELECT id, indexed_fields FROM issuer_templates WHERE id=? AND issuer_id=?",
         (template_id, issuer["id"])
     )
     if not existing:
         raise HTTPException(status_code=404, detail="template_not_found")
+    stored_fields = json.loads(existing["indexed_fields"] or "[]")
+    # The console edits templates without sending indexed_fields; keep them then
+    indexed_fields = stored_fields if body.indexed_fields is None else _indexed_fields(body)
     
     now = int(time.time())
     await db.execute(
         """
         UPDATE issuer_templates
-        SET name=?, description=?, vc_type=?, schema_json=?, is_active=?, updated_at=?
+        SET name=?, description=?, vc_type=?, schema_json=?, indexed_fields=?, is_active=?, updated_at=?
         WHERE id=?
         """,
         (
@@ -404,12 +545,15 @@ async def update_issuer_template(
             body.description or "",
             body.vc_type,
             json.dumps(body.schema_data),
+            json.dumps(indexed_fields),
             1 if body.is_active else 0,
             now,
             template_id
         )
     )
     await db.commit()
+    if stored_fields != indexed_fields:
+        field_reindexer.schedule(issuer["id"])
     
     return {"ok": True}
 
@@ -423,7 +567,7 @@ async def delete_issuer_template(
     """Delete a template"""
     # Check ownership
     existing = await db.execute_fetchone(
-        "SELECT id FROM issuer_templates WHERE id=? AND issuer_id=?",
+        "SELECT id, indexed_fields FROM issuer_templates WHERE id=? AND issuer_id=?",
         (template_id, issuer["id"])
     )
     if not existing:
@@ -431,6 +575,8 @@ async def delete_issuer_template(
     
     await db.execute("DELETE FROM issuer_templates WHERE id=?", (template_id,))
     await db.commit()
+    if json.loads(existing["indexed_fields"] or "[]"):
+        field_reindexer.schedule(issuer["id"])
     
     return {"ok": True}
 
@@ -0,0 +1,148 @@
+"""
+Trusted Issuer Registry
+In-memory index of issuers keyed by DID and by signing public key, so the
+verify paths answer "is this issuer trusted?" with a dict lookup instead of
+a query per credential.
+
+The registry is loaded at startup, updated in place by the endpoints that
+change an issuer (approval, domain verification, API key rotation, profile
+updates) and fully reloaded every ISSUER_REGISTRY_REFRESH_SECONDS so changes
+made by other workers or directly in the database are picked up.
+"""
+import asyncio
+import json
+import time
+from typing import Dict, Optional
+
+import aiosqlite
+
+from backend.core.did import b64u, pk_from_simple_did
+from backend.settings import settings
+
+# Issuer statuses whose credentials are accepted
+TRUSTED_ISSUER_STATUSES = ("approved", "verified")
+
+ISSUER_COLUMNS = "id, name, did, domain, status, meta"
+
+
+def issuer_entry(row) -> dict:
+    """Registry entry for a row of ISSUER_COLUMNS"""
+    try:
+        meta = json.loads(row[5] or "{}")
+    except Exception:
+        meta = {}
+    did = row[2] or ""
+    pk = pk_from_simple_did(did) if did else None
+    return {
+        "id": row[0],
+        "name": row[1],
+        "did": did,
+        "pk_b64u": b64u(pk) if pk else None,
+        "domain": row[3],
+        "status": row[4],
+        "domain_verified": bool(meta.get("domain_verified")),
+    }
+
+
+class IssuerRegistry:
+    """DID / public key → issuer entry, with periodic full reloads"""
+
+    def __init__(self, refresh_interval: Optional[int] = None):
+        self.refresh_interval = refresh_interval or settings.ISSUER_REGISTRY_REFRESH_SECONDS
+        self._by_id: Dict[int, dict] = {}
+        self._by_did: Dict[str, dict] = {}
+        self._by_pk: Dict[str, dict] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.loaded_at: Optional[int] = None
+        self.reloads = 0
+        self.updates = 0
+
+    def _index(self, entry: dict) -> None:
+        self._by_id[entry["id"]] = entry
+        if entry["did"]:
+            self._by_did[entry["did"]] = entry
+        if entry["pk_b64u"]:
+            self._by_pk[entry["pk_b64u"]] = entry
+
+    def _unindex(self, issuer_id: int) -> None:
+        old = self._by_id.pop(issuer_id, None)
+        if old is None:
+            return
+        if self._by_did.get(old["did"]) is old:
+            del self._by_did[old["did"]]
+        if old["pk_b64u"] and self._by_pk.get(old["pk_b64u"]) is old:
+            del self._by_pk[old["pk_b64u"]]
+
+    async def load(self, db: Optional[aiosqlite.Connection] = None) -> int:
+        """Rebuild the whole registry; readers keep the old maps until the swap"""
+        if db is None:
+            async with aiosqlite.connect(f"file:{settings.SQLITE_PATH}?mode=ro", uri=True) as conn:
+                return await self.load(conn)
+        cur = await db.execute(f"SELECT {ISSUER_COLUMNS} FROM issuers")
+        rows = await cur.fetchall()
+        fresh = IssuerRegistry(self.refresh_interval)
+        for row in rows:
+            fresh._index(issuer_entry(row))
+        self._by_id, self._by_did, self._by_pk = fresh._by_id, fresh._by_did, fresh._by_pk
+        self.loaded_at = int(time.time())
+        self.reloads += 1
+        return len(rows)
+
+    async def refresh_issuer(self, db: aiosqlite.Connection, issuer_id: int) -> Optional[dict]:
+        """Re-read one issuer after it changed (call after the change is committed)"""
+        cur = await db.execute(f"SELECT {ISSUER_COLUMNS} FROM issuers WHERE id=?", (issuer_id,))
+        row = await cur.fetchone()
+        self._unindex(issuer_id)
+        self.updates += 1
+        if row is None:
+            return None
+        entry = issuer_entry(row)
+        self._index(entry)
+        return entry
+
+    def get_by_did(self, did: Optional[str]) -> Optional[dict]:
+        return self._by_did.get(did) if did else None
+
+    def get_by_pk(self, pk_b64u: Optional[str]) -> Optional[dict]:
+        return self._by_pk.get(pk_b64u) if pk_b64u else None
+
+    def is_trusted(self, did: Optional[str], pk_b64u: Optional[str]) -> bool:
+        """True if `did` is a trusted issuer and `pk_b64u` is its signing key"""
+        entry = self.get_by_did(did)
+        if entry is None or entry["status"] not in TRUSTED_ISSUER_STATUSES:
+            return False
+        return entry["pk_b64u"] is not None and entry["pk_b64u"] == pk_b64u
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.load()
+            except Exception as e:
+                print(f"Issuer registry: reload failed: {e}")
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def metrics(self) -> dict:
+        return {
+            "issuers": len(self._by_id),
+            "trusted": sum(1 for e in self._by_id.values() if e["status"] in TRUSTED_ISSUER_STATUSES),
+            "loaded_at": self.loaded_at,
+            "refresh_interval_seconds": self.refresh_interval,
+            "reloads": self.reloads,
+            "updates": self.updates,
+        }
+
+
+issuer_registry = IssuerRegistry()
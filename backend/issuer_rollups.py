@@ -0,0 +1,163 @@
+"""
+Issuer Rollups
+Daily per-issuer counts of issued, revoked and verified credentials by
+credential type, for the issuer analytics endpoints. Charts read only
+issuer_daily_rollups and never scan issued_vcs or audit_logs.
+
+Rows are kept current by the trg_issuer_rollups_* triggers in database.py:
+  issued         issued_vcs insert, on its created_at day
+  revoked        vc_status changing to 'revoked', on its updated_at day
+  verified       verification audit row with result 'ok', on its ts day
+  verify_failed  any other verification result
+
+RollupRebuilder recomputes the last ISSUER_ROLLUP_REBUILD_DAYS days from the
+source tables every ISSUER_ROLLUP_REBUILD_SECONDS, which also picks up
+audit rows whose credential was issued after they were written. It runs on
+one worker per node (LeaderLease). The window is computed in a read
+transaction and only swapped in under a short write lock.
+
+Verification counts can only be rebuilt while their audit rows are still
+in the hot table (see audit_archive.py). For days before
+audit_archive.hot_window_start only issued / revoked are rebuilt, and the
+stored verified / verify_failed rows are kept.
+"""
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+import aiosqlite
+
+from backend.audit_archive import hot_window_start
+from backend.database import VERIFY_AUDIT_ACTIONS, LeaderLease
+from backend.settings import settings
+
+ROLLUP_ACTIONS = ("issued", "revoked", "verified", "verify_failed")
+
+REBUILD_SQL = f"""
+    SELECT issuer_id, day, credential_type, action, COUNT(*) FROM (
+        SELECT issuer_id, date(created_at, 'unixepoch') AS day,
+               COALESCE(credential_type, 'Unknown') AS credential_type, 'issued' AS action
+        FROM issued_vcs
+        WHERE +issuer_id IS NOT NULL AND created_at >= :since
+        UNION ALL
+        SELECT iv.issuer_id, date(vs.updated_at, 'unixepoch'),
+               COALESCE(iv.credential_type, 'Unknown'), 'revoked'
+        FROM vc_status vs JOIN issued_vcs iv ON iv.vc_id = vs.vc_id
+        WHERE vs.status = 'revoked' AND vs.updated_at >= :since AND iv.issuer_id IS NOT NULL
+        UNION ALL
+        SELECT iv.issuer_id, date(al.ts, 'unixepoch'), COALESCE(iv.credential_type, 'Unknown'),
+               CASE WHEN al.result = 'ok' THEN 'verified' ELSE 'verify_failed' END
+        FROM audit_logs al JOIN issued_vcs iv ON iv.vc_id = al.vc_id
+        WHERE al.action IN ({", ".join(f"'{a}'" for a in VERIFY_AUDIT_ACTIONS)})
+          AND al.ts >= :verify_since AND iv.issuer_id IS NOT NULL
+    )
+    GROUP BY issuer_id, day, credential_type, action
+"""
+DELETE_SQL = """
+    DELETE FROM issuer_daily_rollups
+    WHERE day >= :since AND (action IN ('issued', 'revoked') OR day >= :verify_since)
+"""
+INSERT_SQL = "INSERT INTO issuer_daily_rollups(issuer_id, day, credential_type, action, count) VALUES(?,?,?,?,?)"
+# Moves whenever an event the triggers count is written
+WATERMARK_SQL = """
+    SELECT (SELECT MAX(id) FROM issued_vcs), (SELECT MAX(seq) FROM trust_changes), (SELECT MAX(id) FROM audit_logs)
+"""
+
+
+def day_start(ts: int) -> int:
+    return ts - ts % 86400
+
+
+def day_label(ts: int) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m-%d")
+
+
+async def rebuild_issuer_rollups(conn: aiosqlite.Connection, since: Optional[int] = None) -> dict:
+    """Recompute issuer_daily_rollups from the day of `since` on (everything if None)
+
+    The window is computed in a read transaction first. Under BEGIN
+    IMMEDIATE it is recomputed only if an issuance, status change or audit
+    row landed in between, so the triggers cannot count an event twice or
+    lose one while the window is swapped in.
+    """
+    since = day_start(since) if since is not None else 0
+    params = {"since": since, "verify_since": max(since, hot_window_start(int(time.time())))}
+    await conn.execute("BEGIN")
+    try:
+        watermark = tuple(await (await conn.execute(WATERMARK_SQL)).fetchone())
+        rows = await (await conn.execute(REBUILD_SQL, params)).fetchall()
+    finally:
+        await conn.rollback()
+
+    await conn.execute("BEGIN IMMEDIATE")
+    try:
+        if tuple(await (await conn.execute(WATERMARK_SQL)).fetchone()) != watermark:
+            rows = await (await conn.execute(REBUILD_SQL, params)).fetchall()
+        await conn.execute(
+            DELETE_SQL, {"since": day_label(since), "verify_since": day_label(params["verify_since"])}
+        )
+        await conn.executemany(INSERT_SQL, rows)
+        await conn.commit()
+    except BaseException:
+        await conn.rollback()
+        raise
+    return {
+        "since": day_label(since),
+        "verify_since": day_label(params["verify_since"]),
+        "rows": len(rows),
+        "at": int(time.time()),
+    }
+
+
+class RollupRebuilder:
+    """Periodically rebuilds the most recent days of issuer_daily_rollups"""
+
+    def __init__(self, interval: Optional[int] = None, days: Optional[int] = None):
+        self.interval = interval or settings.ISSUER_ROLLUP_REBUILD_SECONDS
+        self.days = days or settings.ISSUER_ROLLUP_REBUILD_DAYS
+        self.lease = LeaderLease("rollups")
+        self._task: Optional[asyncio.Task] = None
+        self.last_run: Optional[dict] = None
+
+    async def run_once(self, days: Optional[int] = None) -> dict:
+        since = int(time.time()) - ((days or self.days) - 1) * 86400
+        async with aiosqlite.connect(settings.SQLITE_PATH) as conn:
+            self.last_run = await rebuild_issuer_rollups(conn, since)
+        return self.last_run
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            if not self.lease.acquire():
+                continue  # another worker is the leader
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"Issuer rollups: rebuild failed: {e}")
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.lease.release()
+
+    def metrics(self) -> dict:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "leader": self.lease.held,
+            "interval_seconds": self.interval,
+            "days": self.days,
+            "last_run": self.last_run,
+        }
+
+
+rollup_rebuilder = RollupRebuilder()
@@ -0,0 +1,280 @@
+"""
+Kiosk Verifier Sessions
+WebSocket endpoint for kiosks and gates that verify a stream of
+presentations. On connect the session pre-issues a pool of challenges with
+one batched write and keeps it topped up; the kiosk hands them to wallets
+and forwards the signed presentations over the socket.
+
+Presentations are verified in micro-batches: VC signatures on the
+verification pool, one consume_many for the challenges, one revocation
+query and one audit write per batch. Results are pushed back as soon as
+their batch finishes, tagged with the client's `ref`.
+
+Each session holds a database connection and writes a challenge pool, so
+a client address may open KIOSK_CONNECT_RATE_LIMIT sessions and keep at most
+KIOSK_MAX_SESSIONS_PER_CLIENT of them open per worker; further connections
+are closed with code 1008 before they are accepted.
+
+Protocol (JSON text frames):
+    server → {"type": "challenges", "audience": ..., "items": [{"challenge": ..., "expires_at": ...}]}
+    client → {"type": "presentation", "ref": ..., "payload": {... same body as /present/verify ...}}
+    server → {"type": "result", "ref": ..., "valid": ..., "reason": ..., ...}
+    server → {"type": "error", "ref": ..., "detail": ...}
+"""
+import asyncio
+import base64
+import secrets
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiosqlite
+from fastapi import APIRouter, Depends, Query, WebSocket, WebSocketDisconnect
+from slowapi.util import get_remote_address
+
+from backend.audit import audit_row, log_audit, log_audit_many
+from backend.challenge_store import challenge_store
+from backend.core.crypto_ed25519 import Ed25519Signer
+from backend.database import get_db
+from backend.rate_limit import allow
+from backend.settings import settings
+from backend.verification import (
+    check_holder, expired_ids, presentation_outcome, presentation_vcs, revoked_ids, vc_identifier, verify_vcs,
+)
+
+router = APIRouter()
+API = settings.API_PREFIX
+signer = Ed25519Signer()
+
+# Open sessions per client address in this worker
+_open_sessions: Dict[str, int] = {}
+
+
+def _new_nonce() -> str:
+    return base64.urlsafe_b64encode(secrets.token_bytes(16)).decode().rstrip("=")
+
+
+class KioskSession:
+    """One connected kiosk: its challenge pool and presentation queue"""
+
+    def __init__(self, websocket: WebSocket, db: aiosqlite.Connection, audience: str):
+        self.ws = websocket
+        self.db = db
+        self.audience = audience
+        self.pool: Dict[str, int] = {}  # challenge -> expires_at
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.KIOSK_QUEUE_MAX)
+        self.stats = {"received": 0, "verified": 0, "batches": 0}
+
+    async def send(self, message: Dict[str, Any]) -> None:
+        await self.ws.send_json(message)
+
+    async def refill(self) -> None:
+        """Drop expired challenges and top the pool up once it is half used"""
+        now = int(time.time())
+        for ch, exp in list(self.pool.items()):
+            if exp < now + 5:
+                del self.pool[ch]
+        missing = settings.KIOSK_CHALLENGE_POOL - len(self.pool)
+        if missing <= 0 or (self.pool and missing < settings.KIOSK_CHALLENGE_POOL // 2):
+            return
+
+        exp = now + settings.CHALLENGE_TTL_SECONDS
+        items = [(_new_nonce(), now, exp) for _ in range(missing)]
+        await challenge_store.put_many(self.db, items)
+        await log_audit(self.db, "challenge", "ok",
+                        meta={"aud": self.audience, "count": len(items), "kiosk": True}, ts=now)
+        await self.db.commit()
+        for nonce, _, expires_at in items:
+            self.pool[nonce] = expires_at
+        await self.send({
+            "type": "challenges",
+            "audience": self.audience,
+            "items": [{"challenge": n, "expires_at": e} for n, _, e in items],
+        })
+
+    def _precheck(self, payload: Any, now: int) -> Tuple[Optional[str], bool, List]:
+        """Structural checks; the challenge leaves the pool here, so it is never tried twice"""
+        if not isinstance(payload, dict) or payload.get("type") != "presentation":
+            return "bad_type", False, []
+        ch = payload.get("challenge")
+        expires_at = self.pool.pop(ch, None) if isinstance(ch, str) else None
+        if expires_at is None:
+            return "replay_or_invalid_nonce", False, []
+        if expires_at < now:
+            return "nonce_expired", False, []
+        if (payload.get("aud") or "") != self.audience:
+            return "aud_mismatch", False, []
+        if payload.get("exp") is not None and str(payload.get("exp")) != str(expires_at):
+            return "exp_mismatch", False, []
+        try:
+            multi, vcs = presentation_vcs(payload)
+        except ValueError as e:
+            return str(e), False, []
+        return None, multi, vcs
+
+    async def process(self, batch: List[Tuple[Any, Any]]) -> None:
+        now = int(time.time())
+        errors: Dict[int, str] = {}
+        parsed: Dict[int, Tuple[bool, List]] = {}
+        challenges: Dict[int, str] = {}
+        for i, (_, payload) in enumerate(batch):
+            error, multi, vcs = self._precheck(payload, now)
+            if isinstance(payload, dict) and isinstance(payload.get("challenge"), str):
+                challenges[i] = payload["challenge"]
+            if error:
+                errors[i] = error
+            else:
+                parsed[i] = (multi, vcs)
+
+        # Every VC of the batch goes through the verification pool together
+        flat = [vc for i in sorted(parsed) for vc in parsed[i][1]]
+        flat_verdicts = await verify_vcs(flat, signer)
+        verdicts: Dict[int, list] = {}
+        offset = 0
+        for i in sorted(parsed):
+            n = len(parsed[i][1])
+            verdicts[i] = flat_verdicts[offset:offset + n]
+            offset += n
+
+        audit_rows = []
+        for i in sorted(parsed):
+            vcs = parsed[i][1]
+            bad = next(((vc, v) for vc, v in zip(vcs, verdicts[i]) if not v[0]), None)
+            if bad is not None:
+                errors[i] = "invalid_vc_signature"
+                audit_rows.append(audit_row("kiosk_verify", "fail", did_issuer=bad[1][2], did_subject=bad[1][3],
+                                            vc_id=vc_identifier(bad[0]), meta={"reason": "vc_sig"}, ts=now))
+                continue
+            holder_error = check_holder(batch[i][1], vcs, signer)
+            if holder_error:
+                errors[i] = holder_error
+
+        # One write consumes every challenge the batch touched, failed attempts included
+        consumed = await challenge_store.consume_many(self.db, challenges.values())
+        ok = [i for i in sorted(parsed) if i not in errors]
+        for i in ok:
+            if challenges[i] not in consumed:
+                errors[i] = "replay_or_invalid_nonce"
+        ok = [i for i in ok if i not in errors]
+
+        vc_ids = [vc_identifier(vc) for i in ok for vc in parsed[i][1]]
+        revoked_set = await revoked_ids(self.db, vc_ids)
+        expired_set = await expired_ids(self.db, vc_ids, now)
+        responses = {}
+        for i in ok:
+            multi, vcs = parsed[i]
+            responses[i], rows = presentation_outcome("kiosk_verify", vcs, verdicts[i], revoked_set, multi, now,
+                                                      expired_set)
+            audit_rows.extend(rows)
+        await log_audit_many(self.db, audit_rows)
+        await self.db.commit()
+
+        for i, (ref, _) in enumerate(batch):
+            if i in errors:
+                await self.send({"type": "error", "ref": ref, "detail": errors[i]})
+            else:
+                await self.send({"type": "result", "ref": ref, **responses[i].model_dump(exclude_none=True)})
+        self.stats["verified"] += len(batch)
+        self.stats["batches"] += 1
+
+    async def _next_batch(self) -> List[Tuple[Any, Any]]:
+        """Wait for one presentation, then take whatever else arrives within the batch window"""
+        batch = [await asyncio.wait_for(self.queue.get(), timeout=settings.CHALLENGE_TTL_SECONDS / 3)]
+        deadline = time.monotonic() + settings.KIOSK_BATCH_WINDOW_MS / 1000
+        while len(batch) < settings.KIOSK_BATCH_MAX:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def worker(self) -> None:
+        while True:
+            try:
+                batch = await self._next_batch()
+            except asyncio.TimeoutError:
+                # Idle kiosk: keep the pool from expiring
+                await self.refill()
+                continue
+            try:
+                await self.process(batch)
+            except Exception as e:
+                print(f"Kiosk session: batch of {len(batch)} failed: {e}")
+                for ref, _ in batch:
+                    await self.send({"type": "error", "ref": ref, "detail": "internal_error"})
+            await self.refill()
+
+    async def close(self, worker: asyncio.Task) -> None:
+        worker.cancel()
+        try:
+            await worker
+        except (asyncio.CancelledError, WebSocketDisconnect):
+            pass
+        except Exception as e:
+            print(f"Kiosk session: worker failed: {e}")
+        try:
+            # Unused pool challenges die with the session
+            await challenge_store.consume_many(self.db, self.pool)
+            await log_audit(self.db, "kiosk_session", "closed", meta={"aud": self.audience, **self.stats})
+            await self.db.commit()
+        except Exception as e:
+            print(f"Kiosk session: cleanup failed: {e}")
+            await self.db.rollback()
+
+    async def reader(self) -> None:
+        while True:
+            message = await self.ws.receive_json()
+            if not isinstance(message, dict) or message.get("type") != "presentation":
+                await self.send({"type": "error", "ref": None, "detail": "bad_message"})
+                continue
+            self.stats["received"] += 1
+            # A full queue applies back-pressure to the socket
+            await self.queue.put((message.get("ref"), message.get("payload")))
+
+
+@router.websocket(f"{API}/kiosk/ws")
+async def kiosk_session(
+    websocket: WebSocket,
+    audience: str = Query(..., min_length=1),
+    db=Depends(get_db),
+):
+    client = get_remote_address(websocket)
+    if _open_sessions.get(client, 0) >= settings.KIOSK_MAX_SESSIONS_PER_CLIENT:
+        await websocket.close(code=1008, reason="too_many_sessions")
+        return
+    if not allow(client, "kiosk_session", settings.KIOSK_CONNECT_RATE_LIMIT):
+        await websocket.close(code=1008, reason="rate_limited")
+        return
+
+    _open_sessions[client] = _open_sessions.get(client, 0) + 1
+    try:
+        await _serve_session(websocket, db, audience)
+    finally:
+        _open_sessions[client] -= 1
+        if not _open_sessions[client]:
+            del _open_sessions[client]
+
+
+async def _serve_session(websocket: WebSocket, db: aiosqlite.Connection, audience: str) -> None:
+    await websocket.accept()
+    session = KioskSession(websocket, db, audience)
+    await session.refill()
+    worker = asyncio.create_task(session.worker())
+    try:
+        await session.reader()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        # Shielded: a disconnect can cancel the handler, and an interrupted
+        # cleanup would leave its write transaction open on the connection
+        cleanup = asyncio.ensure_future(session.close(worker))
+        cancelled = False
+        while not cleanup.done():
+            try:
+                await asyncio.shield(cleanup)
+            except asyncio.CancelledError:
+                cancelled = True
+        if cancelled:
+            raise asyncio.CancelledError()
@@ -0,0 +1,120 @@
+"""
+Offline Trust Bundles
+Builds the signed bundles consumed by backend.core.offline.OfflineVerifier:
+a full bundle with every trusted issuer and every non-valid credential
+status, or a delta with only what changed after a given sequence number of
+the trust_changes log. Everything is read inside one transaction so the
+bundle is a consistent snapshot of the seq it is tagged with.
+
+The log only reaches back TRUST_CHANGES_RETENTION_DAYS (see sweeper.py), so
+a delta from before that raises delta_expired and the client reloads the
+full bundle.
+
+The last sealed full bundle is kept per process and reused while the
+sequence number has not moved.
+"""
+import time
+from typing import Dict, Optional, Tuple
+
+import aiosqlite
+
+from backend.core.crypto_ed25519 import Ed25519Signer
+from backend.core.offline import seal_bundle, vc_ref
+from backend.issuer_registry import ISSUER_COLUMNS, TRUSTED_ISSUER_STATUSES, issuer_entry
+from backend.server_keys import server_key
+
+_signer = Ed25519Signer()
+_full_cache: Optional[Tuple[int, Dict]] = None
+_status_placeholders = ",".join("?" * len(TRUSTED_ISSUER_STATUSES))
+
+
+def _bundle_issuer(row) -> Dict:
+    entry = issuer_entry(row)
+    return {
+        "id": entry["id"],
+        "did": entry["did"],
+        "pk_b64u": entry["pk_b64u"],
+        "name": entry["name"],
+        "domain_verified": entry["domain_verified"],
+    }
+
+
+async def _current_seq(db: aiosqlite.Connection) -> int:
+    cur = await db.execute("SELECT COALESCE(MAX(seq), 0) FROM trust_changes")
+    return (await cur.fetchone())[0]
+
+
+async def _full(db: aiosqlite.Connection, seq: int) -> Dict:
+    cur = await db.execute(
+        f"SELECT {ISSUER_COLUMNS} FROM issuers WHERE status IN ({_status_placeholders})",
+        TRUSTED_ISSUER_STATUSES,
+    )
+    issuers = [_bundle_issuer(r) for r in await cur.fetchall()]
+    cur = await db.execute("SELECT vc_id, status FROM vc_status WHERE status != 'valid'")
+    statuses = {vc_ref(r[0]): r[1] for r in await cur.fetchall()}
+    return {"type": "full", "seq": seq, "generated_at": int(time.time()), "issuers": issuers, "statuses": statuses}
+
+
+async def _delta(db: aiosqlite.Connection, since: int, seq: int) -> Dict:
+    cur = await db.execute(
+        "SELECT kind, ref, status FROM trust_changes WHERE seq > ? AND seq <= ? ORDER BY seq",
+        (since, seq),
+    )
+    statuses: Dict[str, str] = {}
+    issuer_ids = set()
+    for kind, ref, status in await cur.fetchall():
+        if kind == "vc":
+            statuses[vc_ref(ref)] = status
+        else:
+            issuer_ids.add(int(ref))
+
+    issuers, removed = [], []
+    if issuer_ids:
+        ids = sorted(issuer_ids)
+        cur = await db.execute(
+            f"SELECT {ISSUER_COLUMNS} FROM issuers WHERE id IN ({','.join('?' * len(ids))})", ids
+        )
+        current = {r[0]: r for r in await cur.fetchall()}
+        for issuer_id in ids:
+            row = current.get(issuer_id)
+            if row is not None and row[4] in TRUSTED_ISSUER_STATUSES:
+                issuers.append(_bundle_issuer(row))
+            else:
+                removed.append(issuer_id)
+
+    return {
+        "type": "delta",
+        "since": since,
+        "seq": seq,
+        "generated_at": int(time.time()),
+        "issuers": issuers,
+        "removed_issuers": removed,
+        "statuses": statuses,
+    }
+
+
+async def export_bundle(db: aiosqlite.Connection, since: Optional[int] = None) -> Dict:
+    """Sealed full bundle, or the delta after `since` when given (ValueError delta_expired if pruned)"""
+    global _full_cache
+    key = server_key()
+    await db.execute("BEGIN")
+    try:
+        seq = await _current_seq(db)
+        if since is None:
+            if _full_cache is not None and _full_cache[0] == seq:
+                return _full_cache[1]
+            bundle = await _full(db, seq)
+        else:
+            cur = await db.execute("SELECT MIN(seq) FROM trust_changes")
+            oldest = (await cur.fetchone())[0]
+            if oldest is not None and since < oldest - 1:
+                # Changes after `since` were already pruned; the client needs a full bundle
+                raise ValueError("delta_expired")
+            bundle = await _delta(db, min(since, seq), seq)
+    finally:
+        await db.rollback()
+
+    envelope = seal_bundle(bundle, _signer, key.sk, key.kid)
+    if since is None:
+        _full_cache = (seq, envelope)
+    return envelope
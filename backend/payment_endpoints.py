@@ -8,10 +8,9 @@ No card data is stored - all payment processing is delegated to the provider.
 from fastapi import APIRouter, Depends, HTTPException, Header, Request
 from typing import Optional
 import time
-from slowapi import Limiter
-from slowapi.util import get_remote_address
 
 from backend.database import get_db
+from backend.rate_limit import limiter
 from backend.payment_schemas import (
     TransactionCreateIntent,
     TransactionRead,
@@ -23,7 +22,6 @@ from backend.payment_schemas import (
 from backend.payment_provider_mock import mock_provider
 
 router = APIRouter(prefix="/payment", tags=["payment"])
-limiter = Limiter(key_func=get_remote_address)
 
 
 async def _get_current_user_for_payment(x_token: Optional[str] = Header(None), db=Depends(get_db)):
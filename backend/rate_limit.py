@@ -0,0 +1,252 @@
+"""
+Rate Limiting
+Shared slowapi limiter backed by a SQLite counter store, so every uvicorn
+worker on the same node sees the same counters and limits survive restarts.
+"""
+import os
+import sqlite3
+import threading
+import time
+from math import floor
+
+from limits import parse
+from limits.storage import Storage, SlidingWindowCounterSupport
+from limits.storage.base import TimestampedSlidingWindow
+from slowapi import Limiter
+from slowapi.errors import RateLimitExceeded
+from slowapi.util import get_remote_address
+from slowapi.wrappers import Limit
+from starlette.requests import Request
+
+from backend.settings import settings
+
+RATE_LIMIT_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS rate_limits (
+  key TEXT PRIMARY KEY,
+  count INTEGER NOT NULL,
+  expires_at REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_rate_limits_expires_at ON rate_limits(expires_at);
+"""
+
+# Expired counters are pruned opportunistically every N increments
+PRUNE_EVERY = 1000
+
+
+class SQLiteStorage(Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    """
+    limits storage using a SQLite file shared by all workers on a node.
+
+    Registered for the ``sqlite://`` scheme, e.g. ``sqlite:///data/ratelimit.db``.
+    Counter updates are single UPSERT statements and sliding window
+    acquisition runs inside ``BEGIN IMMEDIATE``, so concurrent workers
+    cannot both take the last slot of a window.
+    """
+
+    STORAGE_SCHEME = ["sqlite"]
+
+    def __init__(self, uri: str | None = None, wrap_exceptions: bool = False, **options):
+        self.path = (uri or "sqlite://:memory:").split("://", 1)[1] or ":memory:"
+        db_dir = os.path.dirname(self.path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir, exist_ok=True)
+
+        self.timeout = float(options.get("timeout", 5.0))
+        self.lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._writes = 0
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # Connections must not cross fork(); preloaded workers reconnect on first use
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(
+                self.path,
+                timeout=self.timeout,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(RATE_LIMIT_SCHEMA_SQL)
+            self._pid = os.getpid()
+        return self._conn
+
+    def _incr(self, key: str, expiry: float, amount: int, now: float) -> int:
+        row = self.conn.execute(
+            """
+            INSERT INTO rate_limits(key, count, expires_at) VALUES(?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET
+              count = CASE WHEN rate_limits.expires_at <= ? THEN excluded.count
+                           ELSE rate_limits.count + excluded.count END,
+              expires_at = CASE WHEN rate_limits.expires_at <= ? THEN excluded.expires_at
+                                ELSE rate_limits.expires_at END
+            RETURNING count
+            """,
+            (key, amount, now + expiry, now, now),
+        ).fetchone()
+        self._writes += 1
+        if self._writes % PRUNE_EVERY == 0:
+            self.conn.execute("DELETE FROM rate_limits WHERE expires_at <= ?", (now,))
+        return row[0]
+
+    def _get(self, key: str, now: float) -> int:
+        row = self.conn.execute(
+            "SELECT count FROM rate_limits WHERE key=? AND expires_at > ?", (key, now)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def incr(self, key: str, expiry: float, amount: int = 1) -> int:
+        """
+        increments the counter for a given rate limit key
+
+        :param key: the key to increment
+        :param expiry: amount in seconds for the key to expire in
+        :param amount: the number to increment by
+        """
+        with self.lock:
+            return self._incr(key, expiry, amount, time.time())
+
+    def get(self, key: str) -> int:
+        """
+        :param key: the key to get the counter value for
+        """
+        with self.lock:
+            return self._get(key, time.time())
+
+    def get_expiry(self, key: str) -> float:
+        """
+        :param key: the key to get the expiry for
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT expires_at FROM rate_limits WHERE key=?", (key,)
+            ).fetchone()
+        return row[0] if row else time.time()
+
+    def check(self) -> bool:
+        """
+        check if storage is healthy
+        """
+        try:
+            with self.lock:
+                self.conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self) -> int | None:
+        with self.lock:
+            cur = self.conn.execute("DELETE FROM rate_limits")
+        return cur.rowcount
+
+    def clear(self, key: str) -> None:
+        """
+        :param key: the key to clear rate limits for
+        """
+        with self.lock:
+            self.conn.execute("DELETE FROM rate_limits WHERE key=?", (key,))
+
+    def _sliding_window_info(self, previous_key: str, current_key: str, expiry: int, now: float):
+        previous_count = self._get(previous_key, now)
+        current_count = self._get(current_key, now)
+        if previous_count == 0:
+            previous_ttl = 0.0
+        else:
+            previous_ttl = (1 - (((now - expiry) / expiry) % 1)) * expiry
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return previous_count, previous_ttl, current_count, current_ttl
+
+    def acquire_sliding_window_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+        now = time.time()
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                previous_count, previous_ttl, current_count, _ = self._sliding_window_info(
+                    previous_key, current_key, expiry, now
+                )
+                weighted_count = previous_count * previous_ttl / expiry + current_count
+                if floor(weighted_count) + amount > limit:
+                    self.conn.execute("COMMIT")
+                    return False
+                # The current window is kept for two periods so it can serve as the previous one
+                self._incr(current_key, 2 * expiry, amount, now)
+                self.conn.execute("COMMIT")
+                return True
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def get_sliding_window(self, key: str, expiry: int):
+        now = time.time()
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        with self.lock:
+            return self._sliding_window_info(previous_key, current_key, expiry, now)
+
+    def clear_sliding_window(self, key: str, expiry: int) -> None:
+        now = time.time()
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        with self.lock:
+            self.conn.execute(
+                "DELETE FROM rate_limits WHERE key IN (?, ?)", (previous_key, current_key)
+            )
+
+
+# Strategies SQLiteStorage implements; moving-window would need per-hit timestamps
+SQLITE_STRATEGIES = ("fixed-window", "sliding-window-counter")
+
+
+def _default_storage_uri() -> str:
+    if settings.RATE_LIMIT_STORAGE_URI:
+        return settings.RATE_LIMIT_STORAGE_URI
+    db_dir = os.path.dirname(settings.SQLITE_PATH) or "."
+    return f"sqlite://{os.path.join(db_dir, 'ratelimit.db')}"
+
+
+def _checked_strategy(storage_uri: str, strategy: str) -> str:
+    """Reject a strategy the SQLite storage cannot serve at startup, not on the first request"""
+    if storage_uri.startswith("sqlite://") and strategy not in SQLITE_STRATEGIES:
+        raise ValueError(
+            f"RATE_LIMIT_STRATEGY={strategy!r} is not supported by the SQLite rate limit storage; "
+            f"use one of {', '.join(SQLITE_STRATEGIES)} or point RATE_LIMIT_STORAGE_URI at a storage that supports it"
+        )
+    return strategy
+
+
+# Single limiter shared by app.py and every router that declares limits
+limiter = Limiter(
+    key_func=get_remote_address,
+    storage_uri=_default_storage_uri(),
+    strategy=_checked_strategy(_default_storage_uri(), settings.RATE_LIMIT_STRATEGY),
+)
+
+
+def allow(key: str, scope: str, limit_value: str, cost: int = 1) -> bool:
+    """Take `cost` units of `limit_value` for `key` in `scope`; False once it is used up"""
+    if not limiter.enabled:
+        return True
+    return limiter.limiter.hit(parse(limit_value), key, scope, cost=cost)
+
+
+def charge(request: Request, scope: str, limit_value: str, cost: int) -> None:
+    """Take `cost` units of a per-client limit from inside an endpoint
+
+    For limits that depend on the parsed body (e.g. one unit per credential
+    of a batch), which the @limiter.limit decorator cannot see. Raises
+    RateLimitExceeded, so the response matches the decorator's.
+    """
+    item = parse(limit_value)
+    key = get_remote_address(request)
+    request.state.view_rate_limit = (item, [key, scope])
+    if not allow(key, scope, limit_value, cost):
+        raise RateLimitExceeded(Limit(item, get_remote_address, scope, False, None, None, None, cost, True))
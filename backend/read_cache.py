@@ -0,0 +1,135 @@
+"""
+Read Caches
+Short-TTL read-through caches with single-flight loading for the lookups
+that QR / NFC scans hammer: GET /status/{vc_id}, GET /recipient/{id} and
+GET /present/tmp/{pid}. Concurrent requests for a key that is not cached
+share one database load instead of each running the same query; the result
+is then served from memory for READ_CACHE_TTL_MS.
+
+Writers in this process invalidate the affected keys (revoke, issuance,
+DID rotation, payload deletion). Other worker processes only see a change
+once their entry expires, so READ_CACHE_TTL_MS bounds the staleness across
+workers and is kept at a couple of seconds.
+
+tmp_payload_cache does not cache misses: with write-behind (tmp_payloads.py)
+another worker's upload can reach the database moments after a scan looked
+for it, and a cached None would turn that into a 404 for the whole TTL.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from backend.settings import settings
+
+
+class SingleFlightCache:
+    """Bounded TTL cache that coalesces concurrent loads of the same key"""
+
+    def __init__(
+        self, name: str, ttl_ms: Optional[int] = None, max_entries: Optional[int] = None, cache_misses: bool = True
+    ):
+        self.name = name
+        self.cache_misses = cache_misses  # False: a None result is handed to waiters but not kept
+        self.ttl = (ttl_ms if ttl_ms is not None else settings.READ_CACHE_TTL_MS) / 1000
+        self.max_entries = max_entries if max_entries is not None else settings.READ_CACHE_MAX_ENTRIES
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (expires, value)
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.loads = 0
+        self.coalesced = 0
+        self.invalidations = 0
+
+    def _cached(self, key: Hashable, now: float):
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        if entry[0] <= now:
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, entry[1]
+
+    async def get(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        while True:
+            found, value = self._cached(key, time.monotonic())
+            if found:
+                self.hits += 1
+                return value
+
+            fut = self._inflight.get(key)
+            if fut is None:
+                return await self._load(key, loader)
+
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(fut)
+            except asyncio.CancelledError:
+                # The leading request was cancelled, not us: load again
+                if not fut.cancelled():
+                    raise
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        self.loads += 1
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except Exception as e:
+            fut.set_exception(e)
+            fut.exception()  # waiters re-raise it; nothing left to report
+            raise
+        finally:
+            # invalidate() drops the in-flight marker: a value read before the
+            # write that invalidated it is handed to the waiters but not cached
+            current = self._inflight.get(key) is fut
+            if current:
+                del self._inflight[key]
+        fut.set_result(value)
+        if current and self.ttl > 0 and (value is not None or self.cache_misses):
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, key: Hashable) -> None:
+        self.invalidations += 1
+        self._entries.pop(key, None)
+        self._inflight.pop(key, None)
+
+    def clear(self) -> None:
+        self.invalidations += 1
+        self._entries.clear()
+        self._inflight.clear()
+
+    def metrics(self) -> dict:
+        requests = self.hits + self.loads + self.coalesced
+        misses = self.loads + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_ms": int(self.ttl * 1000),
+            "requests": requests,
+            "hits": self.hits,
+            "loads": self.loads,
+            "coalesced": self.coalesced,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / requests, 4) if requests else 0.0,
+            # Share of cache misses that were served by another request's load
+            "coalescing_ratio": round(self.coalesced / misses, 4) if misses else 0.0,
+        }
+
+
+status_cache = SingleFlightCache("status")
+recipient_cache = SingleFlightCache("recipient")
+tmp_payload_cache = SingleFlightCache("tmp_payload", cache_misses=False)
+
+READ_CACHES = (status_cache, recipient_cache, tmp_payload_cache)
+
+
+def read_cache_metrics() -> dict:
+    return {cache.name: cache.metrics() for cache in READ_CACHES}
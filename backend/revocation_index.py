@@ -0,0 +1,109 @@
+"""
+Revocation Index
+In-memory map of every credential whose status is not 'valid', for the
+verify-only profile where request handlers only hold read-only database
+connections. Loaded once, then kept current by polling the trust_changes
+log for rows after the last applied sequence number, so a refresh costs an
+indexed range scan of just the new changes.
+
+Answers can lag the database by up to REVOCATION_INDEX_REFRESH_MS.
+"""
+import asyncio
+import time
+from typing import Dict, Iterable, Optional, Set
+
+import aiosqlite
+
+from backend.settings import settings
+
+
+class RevocationIndex:
+    """vc_id → non-valid status, following trust_changes"""
+
+    def __init__(self, refresh_ms: Optional[int] = None):
+        self.refresh_interval = (refresh_ms or settings.REVOCATION_INDEX_REFRESH_MS) / 1000
+        self._statuses: Dict[str, str] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.seq = 0
+        self.loaded_at: Optional[int] = None
+        self.refreshed_at: Optional[int] = None
+
+    @property
+    def active(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def load(self, db: aiosqlite.Connection) -> int:
+        # One snapshot, so no change can slip in between the seq and the statuses
+        await db.execute("BEGIN")
+        try:
+            cur = await db.execute("SELECT COALESCE(MAX(seq), 0) FROM trust_changes")
+            seq = (await cur.fetchone())[0]
+            cur = await db.execute("SELECT vc_id, status FROM vc_status WHERE status != 'valid'")
+            statuses = {r[0]: r[1] for r in await cur.fetchall()}
+        finally:
+            await db.rollback()
+        self._statuses, self.seq = statuses, seq
+        self.loaded_at = self.refreshed_at = int(time.time())
+        return len(statuses)
+
+    async def refresh(self, db: aiosqlite.Connection) -> int:
+        """Apply trust changes after the last seen sequence number"""
+        cur = await db.execute(
+            "SELECT seq, ref, status FROM trust_changes WHERE seq > ? AND kind='vc' ORDER BY seq",
+            (self.seq,),
+        )
+        rows = await cur.fetchall()
+        for seq, vc_id, status in rows:
+            if status == "valid":
+                self._statuses.pop(vc_id, None)
+            else:
+                self._statuses[vc_id] = status
+            self.seq = seq
+        self.refreshed_at = int(time.time())
+        return len(rows)
+
+    def status(self, vc_id: Optional[str]) -> Optional[str]:
+        return self._statuses.get(vc_id) if vc_id else None
+
+    def revoked(self, vc_ids: Iterable[Optional[str]]) -> Set[str]:
+        return {i for i in vc_ids if i and self._statuses.get(i) == "revoked"}
+
+    def expired(self, vc_ids: Iterable[Optional[str]]) -> Set[str]:
+        return {i for i in vc_ids if i and self._statuses.get(i) == "expired"}
+
+    async def _run(self):
+        async with aiosqlite.connect(f"file:{settings.SQLITE_PATH}?mode=ro", uri=True) as conn:
+            while True:
+                await asyncio.sleep(self.refresh_interval)
+                try:
+                    await self.refresh(conn)
+                except Exception as e:
+                    print(f"Revocation index: refresh failed: {e}")
+
+    async def start(self):
+        async with aiosqlite.connect(f"file:{settings.SQLITE_PATH}?mode=ro", uri=True) as conn:
+            await self.load(conn)
+        if not self.active:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def metrics(self) -> dict:
+        return {
+            "active": self.active,
+            "entries": len(self._statuses),
+            "seq": self.seq,
+            "loaded_at": self.loaded_at,
+            "refreshed_at": self.refreshed_at,
+            "refresh_interval_ms": int(self.refresh_interval * 1000),
+        }
+
+
+revocation_index = RevocationIndex()
@@ -18,12 +18,33 @@ class VerifyReq(BaseModel):
     challenge: Optional[str] = None
     presenter_did: Optional[str] = None
 
+class VerifyBatchItem(BaseModel):
+    index: int
+    vc_id: Optional[str] = None
+    valid: bool
+    reason: str
+    issuer: Optional[str] = None
+    subject: Optional[str] = None
+    revoked: Optional[bool] = None
+    issuer_trusted: Optional[bool] = None
+
 class VerifyResp(BaseModel):
     valid: bool
     reason: str
     issuer: Optional[str] = None
     subject: Optional[str] = None
     revoked: Optional[bool] = None
+    issuer_trusted: Optional[bool] = None
+    results: Optional[List[VerifyBatchItem]] = None  # multi-VC presentations only
+    receipt: Optional[str] = None  # signed receipt, present_verify?receipt=true only
+
+class VerifyBatchReq(BaseModel):
+    vcs: List[Dict[str, Any]] = Field(min_length=1)
+
+class VerifyBatchResp(BaseModel):
+    results: List[VerifyBatchItem]
+    total: int
+    valid_count: int
 
 class RevokeReq(BaseModel):
     vc_id: str
@@ -292,6 +313,17 @@ class IssuerStatsResp(BaseModel):
     revoked_count: int
     expired_count: int
 
+class IssuerTimeseriesPoint(BaseModel):
+    day: str  # UTC, YYYY-MM-DD
+    credential_type: str
+    action: str  # 'issued' | 'revoked' | 'verified' | 'verify_failed'
+    count: int
+
+class IssuerTimeseriesResp(BaseModel):
+    date_from: str
+    date_to: str
+    points: List[IssuerTimeseriesPoint]  # days without events are omitted
+
 class IssuerCredentialListReq(BaseModel):
     page: int = 1
     per_page: int = 20
@@ -313,9 +345,11 @@ class IssuerCredentialItem(BaseModel):
 
 class IssuerCredentialListResp(BaseModel):
     credentials: List[IssuerCredentialItem]
-    total: int
+    total: Optional[int] = None  # None when requested with total=none
+    total_exact: bool = True  # False when total=estimate hit the cap
     page: int
     per_page: int
+    next_cursor: Optional[str] = None  # keyset cursor for the next page
 
 class IssuerCredentialDetailResp(BaseModel):
     credential: Dict[str, Any]
@@ -327,6 +361,7 @@ class IssuerTemplateReq(BaseModel):
     description: Optional[str] = None
     vc_type: str
     schema_data: Dict[str, Any]
+    indexed_fields: Optional[List[str]] = None  # payload paths usable as credential list filters; None keeps them on update
     is_active: bool = True
 
 class IssuerTemplateItem(BaseModel):
@@ -335,6 +370,7 @@ class IssuerTemplateItem(BaseModel):
     description: Optional[str] = None
     vc_type: str
     schema_data: Dict[str, Any]
+    indexed_fields: List[str] = []
     is_active: bool
     created_at: int
     updated_at: int
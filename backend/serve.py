@@ -0,0 +1,77 @@
+"""
+Production Launcher
+Runs the API under gunicorn with uvicorn workers (uvloop + httptools).
+
+Schema work runs once in the master before the app is preloaded and the
+workers are forked, so workers skip init_db on startup. Send SIGHUP to the
+master to reload: new workers are started and old ones drain in-flight
+requests for up to GRACEFUL_TIMEOUT seconds before exiting.
+
+Run with:
+    python -m backend.serve
+"""
+import asyncio
+import multiprocessing
+
+from gunicorn.app.base import BaseApplication
+from uvicorn.workers import UvicornWorker
+
+from backend.settings import settings
+
+
+class WorldPassWorker(UvicornWorker):
+    """Uvicorn worker pinned to the uvloop event loop and httptools parser"""
+
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools", "lifespan": "on"}
+
+
+class WorldPassApplication(BaseApplication):
+    """Embedded gunicorn application with a preloaded FastAPI app"""
+
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key.lower(), value)
+
+    def load(self):
+        from backend.app import create_app
+        return create_app()
+
+
+def _worker_count() -> int:
+    if settings.WORKERS > 0:
+        return settings.WORKERS
+    return multiprocessing.cpu_count()
+
+
+def build_options() -> dict:
+    return {
+        "bind": f"{settings.HOST}:{settings.PORT}",
+        "workers": _worker_count(),
+        "worker_class": "backend.serve.WorldPassWorker",
+        "preload_app": True,
+        "graceful_timeout": settings.GRACEFUL_TIMEOUT,
+        "timeout": settings.WORKER_TIMEOUT,
+        "keepalive": 5,
+        "accesslog": "-",
+    }
+
+
+def main():
+    from backend.database import init_db
+
+    # Master runs schema work once; forked workers must not repeat it.
+    # Verify-only nodes never write the schema (create_app in app.py).
+    if settings.APP_PROFILE != "verify":
+        asyncio.run(init_db())
+    settings.SCHEMA_INIT_ON_STARTUP = False
+
+    WorldPassApplication(build_options()).run()
+
+
+if __name__ == "__main__":
+    main()
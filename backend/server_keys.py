@@ -0,0 +1,88 @@
+"""
+Server Signing Key
+Ed25519 key the API signs its own artifacts with (offline trust bundles,
+verification receipts). Taken from SERVER_SIGNING_KEY (base64url seed) if
+set, otherwise generated once into SERVER_SIGNING_KEY_PATH, which defaults
+to <SQLITE_PATH dir>/server_signing.key, so every worker shares it.
+
+The public half is published as a JWK set at /.well-known/worldpass-keys.json.
+"""
+import hashlib
+import os
+import tempfile
+from typing import NamedTuple, Optional
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
+
+from backend.core.crypto_ed25519 import b64u, b64u_d
+from backend.settings import settings
+
+
+class ServerKey(NamedTuple):
+    sk: bytes
+    pk: bytes
+    kid: str
+
+
+_key: Optional[ServerKey] = None
+
+
+def _key_path() -> str:
+    if settings.SERVER_SIGNING_KEY_PATH:
+        return settings.SERVER_SIGNING_KEY_PATH
+    return os.path.join(os.path.dirname(settings.SQLITE_PATH) or ".", "server_signing.key")
+
+
+def _load_or_create_seed() -> bytes:
+    if settings.SERVER_SIGNING_KEY:
+        return b64u_d(settings.SERVER_SIGNING_KEY)
+
+    path = _key_path()
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    if not os.path.exists(path):
+        seed = os.urandom(32)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".server_signing.")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(b64u(seed))
+                f.flush()
+                os.fsync(f.fileno())
+            # link() refuses to replace an existing file: when several workers start
+            # together exactly one key wins, and readers never see it half-written
+            os.link(tmp_path, path)
+            print(f"Server key: generated new signing key at {path}")
+            return seed
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(tmp_path)
+    with open(path, "r", encoding="utf-8") as f:
+        return b64u_d(f.read().strip())
+
+
+def server_key() -> ServerKey:
+    global _key
+    if _key is None:
+        sk = ed25519.Ed25519PrivateKey.from_private_bytes(_load_or_create_seed())
+        pk = sk.public_key().public_bytes(
+            encoding=serialization.Encoding.Raw,
+            format=serialization.PublicFormat.Raw,
+        )
+        sk_bytes = sk.private_bytes(
+            encoding=serialization.Encoding.Raw,
+            format=serialization.PrivateFormat.Raw,
+            encryption_algorithm=serialization.NoEncryption(),
+        )
+        _key = ServerKey(sk=sk_bytes, pk=pk, kid=b64u(hashlib.sha256(pk).digest()[:12]))
+    return _key
+
+
+def public_jwks() -> dict:
+    key = server_key()
+    return {
+        "keys": [
+            {"kty": "OKP", "crv": "Ed25519", "x": b64u(key.pk), "kid": key.kid, "alg": "EdDSA", "use": "sig"}
+        ]
+    }
@@ -50,6 +50,97 @@ class Settings(BaseSettings):
     # Payment Provider Settings
     PAYMENT_PROVIDER_BASE_URL: str = os.getenv("PAYMENT_PROVIDER_BASE_URL", "http://localhost:8000/mock-provider")
     PAYMENT_WEBHOOK_SECRET: str = os.getenv("PAYMENT_WEBHOOK_SECRET", "mock_webhook_secret_change_in_production")
+
+    # Production launcher (serve.py)
+    HOST: str = os.getenv("HOST", "0.0.0.0")
+    PORT: int = int(os.getenv("PORT", "8000"))
+    WORKERS: int = int(os.getenv("WORKERS", "0"))  # 0 = one worker per CPU
+    GRACEFUL_TIMEOUT: int = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+    WORKER_TIMEOUT: int = int(os.getenv("WORKER_TIMEOUT", "60"))
+    SCHEMA_INIT_ON_STARTUP: bool = True
+
+    # Expiry sweeper (sweeper.py)
+    SWEEPER_ENABLED: bool = os.getenv("SWEEPER_ENABLED", "1") not in ("0", "false", "False")
+    SWEEP_INTERVAL_SECONDS: int = int(os.getenv("SWEEP_INTERVAL_SECONDS", "60"))
+    SWEEP_BATCH_SIZE: int = int(os.getenv("SWEEP_BATCH_SIZE", "500"))
+    TRUST_CHANGES_RETENTION_DAYS: int = int(os.getenv("TRUST_CHANGES_RETENTION_DAYS", "90"))  # offline bundle delta history
+
+    # Credential expiry sweep (credential_expiry.py), runs when SWEEPER_ENABLED
+    CREDENTIAL_EXPIRY_INTERVAL_SECONDS: int = int(os.getenv("CREDENTIAL_EXPIRY_INTERVAL_SECONDS", "60"))
+    CREDENTIAL_EXPIRY_BATCH: int = int(os.getenv("CREDENTIAL_EXPIRY_BATCH", "500"))
+
+    # Batched audit log writer (audit.py)
+    AUDIT_QUEUE_MAX: int = int(os.getenv("AUDIT_QUEUE_MAX", "10000"))
+    AUDIT_FLUSH_INTERVAL_MS: int = int(os.getenv("AUDIT_FLUSH_INTERVAL_MS", "200"))
+    AUDIT_FLUSH_BATCH: int = int(os.getenv("AUDIT_FLUSH_BATCH", "500"))
+    AUDIT_OVERFLOW_POLICY: str = os.getenv("AUDIT_OVERFLOW_POLICY", "drop_oldest")  # 'drop_oldest' | 'drop_newest' | 'block'
+
+    # Audit log archive (audit_archive.py), opt-in; defaults to <SQLITE_PATH dir>/audit_archive
+    AUDIT_ARCHIVE_ENABLED: bool = os.getenv("AUDIT_ARCHIVE_ENABLED", "0") in ("1", "true", "True")
+    AUDIT_ARCHIVE_DIR: str = os.getenv("AUDIT_ARCHIVE_DIR", "")
+    AUDIT_ARCHIVE_INTERVAL_SECONDS: int = int(os.getenv("AUDIT_ARCHIVE_INTERVAL_SECONDS", "21600"))
+    AUDIT_HOT_MONTHS: int = int(os.getenv("AUDIT_HOT_MONTHS", "3"))  # closed months kept in the database
+    AUDIT_RETENTION_MONTHS: int = int(os.getenv("AUDIT_RETENTION_MONTHS", "0"))  # 0 = keep archives forever
+
+    # Credential verification (verification.py)
+    VERIFY_WORKERS: int = int(os.getenv("VERIFY_WORKERS", "0"))  # signature check threads, 0 = cpu count
+    VERIFY_BATCH_MAX: int = int(os.getenv("VERIFY_BATCH_MAX", "500"))
+    VERIFY_BATCH_RATE_LIMIT: str = os.getenv("VERIFY_BATCH_RATE_LIMIT", "1000/minute")  # credentials per client
+    VERIFY_CACHE_SIZE: int = int(os.getenv("VERIFY_CACHE_SIZE", "10000"))  # cached signature verdicts, 0 = off
+    VERIFY_REQUIRE_TRUSTED_ISSUER: bool = os.getenv("VERIFY_REQUIRE_TRUSTED_ISSUER", "0") in ("1", "true", "True")
+    ISSUER_REGISTRY_REFRESH_SECONDS: int = int(os.getenv("ISSUER_REGISTRY_REFRESH_SECONDS", "60"))
+
+    # Deployment profile: 'full' or 'verify' (verification routes only, see create_app in app.py)
+    APP_PROFILE: str = os.getenv("APP_PROFILE", "full")
+    CHALLENGE_STORE_URI: str = os.getenv("CHALLENGE_STORE_URI", "")  # see challenge_store.py
+    AUDIT_STORE_URI: str = os.getenv("AUDIT_STORE_URI", "")  # see audit.py
+    REVOCATION_INDEX_REFRESH_MS: int = int(os.getenv("REVOCATION_INDEX_REFRESH_MS", "1000"))
+
+    # Single-flight read caches for status / recipient / tmp payload lookups (read_cache.py)
+    READ_CACHE_TTL_MS: int = int(os.getenv("READ_CACHE_TTL_MS", "2000"))  # 0 = coalescing only
+    READ_CACHE_MAX_ENTRIES: int = int(os.getenv("READ_CACHE_MAX_ENTRIES", "10000"))
+
+    # Conditional GET caching of public lookups (http_cache.py)
+    HTTP_CACHE_MAX_AGE: int = int(os.getenv("HTTP_CACHE_MAX_AGE", "5"))
+    HTTP_CACHE_STALE_WHILE_REVALIDATE: int = int(os.getenv("HTTP_CACHE_STALE_WHILE_REVALIDATE", "30"))
+
+    # Temporary presentation payloads (tmp_payloads.py)
+    TMP_PAYLOAD_MEMORY_MAX_ITEMS: int = int(os.getenv("TMP_PAYLOAD_MEMORY_MAX_ITEMS", "5000"))
+    TMP_PAYLOAD_MEMORY_MAX_BYTES: int = int(os.getenv("TMP_PAYLOAD_MEMORY_MAX_BYTES", str(64 * 1024 * 1024)))
+    TMP_PAYLOAD_FLUSH_MS: int = int(os.getenv("TMP_PAYLOAD_FLUSH_MS", "100"))
+    TMP_PAYLOAD_FLUSH_RETRIES: int = int(os.getenv("TMP_PAYLOAD_FLUSH_RETRIES", "5"))  # attempts before a row is dropped
+    TMP_PAYLOAD_PENDING_MAX: int = int(os.getenv("TMP_PAYLOAD_PENDING_MAX", "10000"))  # queued rows before direct writes
+
+    # Issuer console credential list (issuer_endpoints.py)
+    ISSUER_LIST_COUNT_CAP: int = int(os.getenv("ISSUER_LIST_COUNT_CAP", "10000"))  # total=estimate stops here
+    EXPORT_FETCH_ROWS: int = int(os.getenv("EXPORT_FETCH_ROWS", "500"))  # rows per cursor fetch (credential_export.py)
+    EXPORT_FLUSH_BYTES: int = int(os.getenv("EXPORT_FLUSH_BYTES", str(64 * 1024)))
+
+    # Issuer dashboard counters (issuer_counters.py)
+    ISSUER_COUNTERS_RECONCILE_SECONDS: int = int(os.getenv("ISSUER_COUNTERS_RECONCILE_SECONDS", "3600"))
+
+    # Issuer analytics daily rollups (issuer_rollups.py)
+    ISSUER_ROLLUP_REBUILD_SECONDS: int = int(os.getenv("ISSUER_ROLLUP_REBUILD_SECONDS", "3600"))
+    ISSUER_ROLLUP_REBUILD_DAYS: int = int(os.getenv("ISSUER_ROLLUP_REBUILD_DAYS", "2"))  # trailing days recomputed per run
+    ISSUER_TIMESERIES_MAX_DAYS: int = int(os.getenv("ISSUER_TIMESERIES_MAX_DAYS", "366"))
+
+    # Kiosk verifier sessions (kiosk.py)
+    KIOSK_CHALLENGE_POOL: int = int(os.getenv("KIOSK_CHALLENGE_POOL", "16"))
+    KIOSK_BATCH_MAX: int = int(os.getenv("KIOSK_BATCH_MAX", "32"))
+    KIOSK_BATCH_WINDOW_MS: int = int(os.getenv("KIOSK_BATCH_WINDOW_MS", "20"))
+    KIOSK_QUEUE_MAX: int = int(os.getenv("KIOSK_QUEUE_MAX", "256"))
+    KIOSK_MAX_SESSIONS_PER_CLIENT: int = int(os.getenv("KIOSK_MAX_SESSIONS_PER_CLIENT", "4"))  # per worker
+    KIOSK_CONNECT_RATE_LIMIT: str = os.getenv("KIOSK_CONNECT_RATE_LIMIT", "10/minute")  # new sessions per client
+
+    # Server signing key (server_keys.py); defaults to <SQLITE_PATH dir>/server_signing.key
+    SERVER_SIGNING_KEY: str = os.getenv("SERVER_SIGNING_KEY", "")  # base64url Ed25519 seed
+    SERVER_SIGNING_KEY_PATH: str = os.getenv("SERVER_SIGNING_KEY_PATH", "")
+    RECEIPT_ISSUER: str = os.getenv("RECEIPT_ISSUER", "worldpass")  # 'iss' of verification receipts
+    RECEIPT_TTL_SECONDS: int = int(os.getenv("RECEIPT_TTL_SECONDS", "300"))
+
+    # Rate Limiting - shared across workers; defaults to sqlite://<SQLITE_PATH dir>/ratelimit.db
+    RATE_LIMIT_STORAGE_URI: str = os.getenv("RATE_LIMIT_STORAGE_URI", "")
+    RATE_LIMIT_STRATEGY: str = os.getenv("RATE_LIMIT_STRATEGY", "sliding-window-counter")
     
     def validate_production_security(self):
         """Validate security settings for production deployment"""
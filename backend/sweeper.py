@@ -0,0 +1,123 @@
+"""
+Expiry Sweeper
+Background task that deletes expired nonces, temporary payloads, OAuth
+artifacts and trust_changes older than TRUST_CHANGES_RETENTION_DAYS in
+small indexed batches, so rows nobody touches again do not accumulate and
+a sweep never holds the SQLite write lock for long. It runs on one worker
+per node (LeaderLease).
+"""
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+import aiosqlite
+
+from backend.database import LeaderLease
+from backend.settings import settings
+
+# (metric name, table, predicate). Every predicate is served by an index.
+SWEEP_TARGETS: List[Tuple[str, str, str]] = [
+    ("used_nonces", "used_nonces", "expires_at < :now"),
+    ("tmp_payloads", "tmp_payloads", "expires_at < :now"),
+    ("oauth_auth_codes", "oauth_auth_codes", "expires_at < :now"),
+    ("oauth_auth_codes_used", "oauth_auth_codes", "used = 1"),
+    ("oauth_access_tokens", "oauth_access_tokens", "expires_at < :now"),
+    # The newest change is kept so MAX(seq) never goes back
+    ("trust_changes", "trust_changes",
+     f"ts < :now - {settings.TRUST_CHANGES_RETENTION_DAYS * 86400} AND seq < (SELECT MAX(seq) FROM trust_changes)"),
+]
+
+
+class ExpirySweeper:
+    """Periodically purges expired rows and keeps per-table sweep metrics"""
+
+    def __init__(self, interval: Optional[int] = None, batch_size: Optional[int] = None):
+        self.interval = interval or settings.SWEEP_INTERVAL_SECONDS
+        self.batch_size = batch_size or settings.SWEEP_BATCH_SIZE
+        self.lease = LeaderLease("sweeper")
+        self._task: Optional[asyncio.Task] = None
+        self._metrics: Dict[str, dict] = {
+            name: {
+                "table": table,
+                "deleted_total": 0,
+                "last_deleted": 0,
+                "last_duration_ms": 0.0,
+                "last_run_at": None,
+                "errors": 0,
+            }
+            for name, table, _ in SWEEP_TARGETS
+        }
+        self.runs = 0
+
+    async def _sweep_target(self, conn: aiosqlite.Connection, table: str, predicate: str, now: int) -> int:
+        deleted = 0
+        while True:
+            cur = await conn.execute(
+                f"DELETE FROM {table} WHERE rowid IN "
+                f"(SELECT rowid FROM {table} WHERE {predicate} LIMIT :limit)",
+                {"now": now, "limit": self.batch_size},
+            )
+            await conn.commit()
+            deleted += cur.rowcount
+            if cur.rowcount < self.batch_size:
+                return deleted
+            # Let request handlers get at the write lock between batches
+            await asyncio.sleep(0)
+
+    async def sweep_once(self) -> Dict[str, int]:
+        """Run one sweep over every target and return rows deleted per target"""
+        now = int(time.time())
+        results = {}
+        async with aiosqlite.connect(settings.SQLITE_PATH) as conn:
+            for name, table, predicate in SWEEP_TARGETS:
+                metric = self._metrics[name]
+                started = time.perf_counter()
+                try:
+                    deleted = await self._sweep_target(conn, table, predicate, now)
+                except Exception as e:
+                    metric["errors"] += 1
+                    print(f"Sweeper: failed to sweep {name}: {e}")
+                    continue
+                metric["deleted_total"] += deleted
+                metric["last_deleted"] = deleted
+                metric["last_duration_ms"] = round((time.perf_counter() - started) * 1000, 3)
+                metric["last_run_at"] = now
+                results[name] = deleted
+        self.runs += 1
+        return results
+
+    async def _run(self):
+        while True:
+            if self.lease.acquire():
+                try:
+                    await self.sweep_once()
+                except Exception as e:
+                    print(f"Sweeper: run failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.lease.release()
+
+    def metrics(self) -> dict:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "leader": self.lease.held,
+            "interval_seconds": self.interval,
+            "batch_size": self.batch_size,
+            "runs": self.runs,
+            "targets": {name: dict(metric) for name, metric in self._metrics.items()},
+        }
+
+
+sweeper = ExpirySweeper()
@@ -0,0 +1,118 @@
+import json
+
+import aiosqlite
+
+from backend.audit import AuditSink, audit_row, audit_sink, backfill_structured_columns, log_audit
+from backend.settings import settings
+from conftest import TEST_AUDIT_PATH
+
+
+async def test_log_audit_writes_structured_columns():
+    await audit_sink.start()
+    try:
+        async with aiosqlite.connect(settings.SQLITE_PATH) as conn:
+            await log_audit(conn, "revoke", "ok", vc_id="vc-audit-1", meta={"vc_id": "vc-audit-1"})
+    finally:
+        await audit_sink.stop()
+    async with aiosqlite.connect(settings.SQLITE_PATH) as conn:
+        cur = await conn.execute(
+            "SELECT action, result, vc_id, meta FROM audit_logs WHERE vc_id=?", ("vc-audit-1",)
+        )
+        row = await cur.fetchone()
+    assert row[0] == "revoke"
+    assert row[1] == "ok"
+    assert json.loads(row[3]) == {"vc_id": "vc-audit-1"}
+
+
+async def test_log_audit_falls_back_to_the_request_connection():
+    async with aiosqlite.connect(settings.SQLITE_PATH) as conn:
+        await log_audit(conn, "revoke", "ok", vc_id="vc-audit-direct")
+        await conn.commit()
+        cur = await conn.execute("SELECT COUNT(*) FROM audit_logs WHERE vc_id='vc-audit-direct'")
+        assert (await cur.fetchone())[0] == 1
+
+
+async def test_separate_store_never_writes_on_the_request_connection():
+    previous_uri = audit_sink.uri
+    audit_sink.configure(f"sqlite://{TEST_AUDIT_PATH}")
+    try:
+        dropped = audit_sink.metrics()["dropped"]
+        async with aiosqlite.connect(f"file:{settings.SQLITE_PATH}?mode=ro", uri=True) as conn:
+            # Would raise "attempt to write a readonly database" if it inserted on conn
+            await log_audit(conn, "revoke", "ok", vc_id="vc-audit-stopped")
+        assert audit_sink.metrics()["dropped"] == dropped + 1
+
+        await audit_sink.start()
+        async with aiosqlite.connect(f"file:{settings.SQLITE_PATH}?mode=ro", uri=True) as conn:
+            await log_audit(conn, "revoke", "ok", vc_id="vc-audit-separate")
+        await audit_sink.stop()
+    finally:
+        audit_sink.configure(previous_uri)
+    async with aiosqlite.connect(TEST_AUDIT_PATH) as conn:
+        cur = await conn.execute("SELECT vc_id FROM audit_logs WHERE vc_id LIKE 'vc-audit-%'")
+        assert "vc-audit-separate" in [r[0] for r in await cur.fetchall()]
+
+
+async def test_backfill_parses_legacy_meta():
+    async with aiosqlite.connect(settings.SQLITE_PATH) as conn:
+        await conn.executemany(
+            "INSERT INTO audit_logs(ts, action, result, meta) VALUES(?,?,?,?)",
+            [
+                (1, "revoke", "ok", json.dumps({"vc_id": "vc-legacy-1"})),
+                (2, "user_login", "ok", json.dumps({"email": "a@b.c", "user_id": 42})),
+                (3, "issuer_login", "ok", json.dumps({"email": "i@b.c", "issuer_id": "7"})),
+                (4, "challenge", "ok", "not json"),
+            ],
+        )
+        await conn.commit()
+
+        result = await backfill_structured_columns(conn, chunk_size=2)
+        assert result["updated"] >= 3
+
+        cur = await conn.execute(
+            "SELECT ts, vc_id, issuer_id, user_id FROM audit_logs WHERE ts IN (1,2,3,4) ORDER BY ts"
+        )
+        rows = [tuple(r) for r in await cur.fetchall()]
+    assert rows == [
+        (1, "vc-legacy-1", None, None),
+        (2, None, None, 42),
+        (3, None, 7, None),
+        (4, None, None, None),
+    ]
+
+
+async def test_audit_sink_batches_and_flushes_on_stop():
+    sink = AuditSink(max_queue=3, flush_interval_ms=60000, flush_batch=100, overflow_policy="drop_oldest")
+    await sink.start()
+    for i in range(5):
+        await sink.submit(audit_row("vc_verify_simple", "ok", vc_id=f"vc-sink-{i}"))
+    assert sink.metrics()["queued"] == 3
+    assert sink.metrics()["dropped"] == 2
+    await sink.stop()
+
+    async with aiosqlite.connect(settings.SQLITE_PATH) as conn:
+        cur = await conn.execute(
+            "SELECT vc_id FROM audit_logs WHERE vc_id LIKE 'vc-sink-%' ORDER BY vc_id"
+        )
+        rows = [r[0] for r in await cur.fetchall()]
+    assert rows == ["vc-sink-2", "vc-sink-3", "vc-sink-4"]
+    assert sink.metrics()["written"] == 3
+
+
+async def test_audit_sink_rolls_back_a_failed_batch():
+    sink = AuditSink(max_queue=10, flush_interval_ms=60000, flush_batch=100)
+    await sink.start()
+    try:
+        await sink.submit(audit_row("vc_verify_simple", "ok", vc_id="vc-sink-partial"))
+        await sink.submit(audit_row("vc_verify_simple", None, vc_id="vc-sink-bad"))  # result is NOT NULL
+        assert await sink.flush() is False
+        assert not sink._conn.in_transaction
+        assert sink.metrics()["queued"] == 2
+        sink._buffer.pop()  # drop the bad row, the retry then goes through
+        assert await sink.flush() is True
+    finally:
+        await sink.stop()
+
+    async with aiosqlite.connect(settings.SQLITE_PATH) as conn:
+        cur = await conn.execute("SELECT COUNT(*) FROM audit_logs WHERE vc_id='vc-sink-partial'")
+        assert (await cur.fetchone())[0] == 1
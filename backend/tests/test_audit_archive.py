@@ -0,0 +1,100 @@
+import os
+import tempfile
+from datetime import datetime, timezone
+
+import aiosqlite
+
+from backend.audit import audit_row, AUDIT_INSERT_SQL
+from backend.audit_archive import AuditArchiver, VcIdFilter, list_segments, query_audit, segment_index
+from backend.settings import settings
+
+
+def _ts(year, month, day=15):
+    return int(datetime(year, month, day, tzinfo=timezone.utc).timestamp())
+
+
+async def test_closed_months_are_archived_and_still_queryable(monkeypatch):
+    monkeypatch.setattr(settings, "AUDIT_ARCHIVE_DIR", tempfile.mkdtemp())
+    monkeypatch.setattr(settings, "AUDIT_HOT_MONTHS", 1)
+    monkeypatch.setattr(settings, "AUDIT_RETENTION_MONTHS", 0)
+
+    async with aiosqlite.connect(settings.SQLITE_PATH) as conn:
+        await conn.executemany(AUDIT_INSERT_SQL, [
+            audit_row("present_verify", "ok", vc_id="vc-archive-1", ts=_ts(2021, 1)),
+            audit_row("revoke", "ok", vc_id="vc-archive-1", ts=_ts(2021, 2)),
+            audit_row("present_verify", "ok", vc_id="vc-archive-2", ts=_ts(2021, 2, 20)),
+            audit_row("present_verify", "ok", vc_id="vc-archive-1", ts=_ts(2021, 5)),
+        ])
+        await conn.commit()
+
+    result = await AuditArchiver().run_once(now=_ts(2021, 5, 20))
+    periods = sorted(e["period"] for e in result["exported"])
+    assert "2021-01" in periods and "2021-02" in periods
+    assert "2021-05" not in periods
+
+    segments = {s["period"]: s for s in list_segments()}
+    assert segments["2021-02"]["rows"] == 2
+    assert "vc_id_filter" not in segments["2021-02"]
+    assert os.path.exists(os.path.join(settings.AUDIT_ARCHIVE_DIR, segments["2021-02"]["file"]))
+
+    async with aiosqlite.connect(settings.SQLITE_PATH) as conn:
+        cur = await conn.execute("SELECT COUNT(*) FROM audit_logs WHERE vc_id='vc-archive-1'")
+        assert (await cur.fetchone())[0] == 1
+
+        history = await query_audit(conn, vc_id="vc-archive-1")
+    assert [h["timestamp"] for h in history] == [_ts(2021, 5), _ts(2021, 2), _ts(2021, 1)]
+    assert [h["action"] for h in history] == ["present_verify", "revoke", "present_verify"]
+
+
+async def test_retention_removes_old_segments(monkeypatch):
+    monkeypatch.setattr(settings, "AUDIT_ARCHIVE_DIR", tempfile.mkdtemp())
+    monkeypatch.setattr(settings, "AUDIT_HOT_MONTHS", 0)
+    monkeypatch.setattr(settings, "AUDIT_RETENTION_MONTHS", 2)
+
+    async with aiosqlite.connect(settings.SQLITE_PATH) as conn:
+        await conn.executemany(AUDIT_INSERT_SQL, [
+            audit_row("challenge", "ok", ts=_ts(2022, 1)),
+            audit_row("challenge", "ok", ts=_ts(2022, 6)),
+        ])
+        await conn.commit()
+
+    archiver = AuditArchiver()
+    await archiver.run_once(now=_ts(2022, 7))
+    periods = [s["period"] for s in list_segments()]
+    assert "2022-06" in periods
+    assert "2022-01" not in periods
+
+
+async def test_segment_index_follows_new_segments(monkeypatch):
+    monkeypatch.setattr(settings, "AUDIT_ARCHIVE_DIR", tempfile.mkdtemp())
+    monkeypatch.setattr(settings, "AUDIT_HOT_MONTHS", 0)
+    monkeypatch.setattr(settings, "AUDIT_RETENTION_MONTHS", 0)
+
+    async with aiosqlite.connect(settings.SQLITE_PATH) as conn:
+        await conn.execute(AUDIT_INSERT_SQL, audit_row("present_verify", "ok", vc_id="vc-index-1", ts=_ts(2023, 1)))
+        await conn.commit()
+    await AuditArchiver().run_once(now=_ts(2023, 2))
+    segments, filters = segment_index.load()
+    assert [seg["period"] for seg, f in zip(segments, filters) if "vc-index-1" in f] == ["2023-01"]
+    assert not any("vc-index-2" in f for f in filters)
+
+    # A half-written index is never picked up
+    with open(os.path.join(settings.AUDIT_ARCHIVE_DIR, "audit-2023-09-1.idx.json.tmp"), "w") as f:
+        f.write("{")
+
+    async with aiosqlite.connect(settings.SQLITE_PATH) as conn:
+        await conn.execute(AUDIT_INSERT_SQL, audit_row("present_verify", "ok", vc_id="vc-index-2", ts=_ts(2023, 2)))
+        await conn.commit()
+        await AuditArchiver().run_once(now=_ts(2023, 3))
+        history = await query_audit(conn, vc_id="vc-index-2")
+    assert [h["timestamp"] for h in history] == [_ts(2023, 2)]
+    assert [s["period"] for s in list_segments() if s["period"] >= "2023"] == ["2023-01", "2023-02"]
+
+
+def test_vc_id_filter_has_no_false_negatives():
+    vc_ids = [f"vc-bloom-{i}" for i in range(2000)]
+    vc_filter = VcIdFilter.from_json(VcIdFilter.build(vc_ids).to_json())
+    assert all(vc_id in vc_filter for vc_id in vc_ids)
+    false_positives = sum(f"vc-other-{i}" in vc_filter for i in range(2000))
+    assert false_positives < 100
+    assert len(vc_filter.data) <= 2000 * VcIdFilter.BITS_PER_ITEM // 8 + 1
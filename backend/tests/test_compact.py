@@ -0,0 +1,59 @@
+import json
+import zlib
+
+import pytest
+
+from backend.core import compact
+from backend.core.crypto_ed25519 import Ed25519Signer, b64u
+from backend.core.vc import sign_vc, verify_vc
+
+signer = Ed25519Signer()
+
+
+def _vc():
+    sk, pk = signer.generate_keypair()
+    did = f"did:key:z{b64u(pk)}"
+    body = {
+        "@context": ["https://www.w3.org/2018/credentials/v1"],
+        "type": ["VerifiableCredential", "StudentCard"],
+        "jti": "vc-compact-1",
+        "issuer": did,
+        "issuanceDate": "2025-09-01T00:00:00Z",
+        "credentialSubject": {"id": "did:key:zholder", "name": "Ayşe Yılmaz", "studentNumber": 2021123, "gpa": 3.5,
+                              "active": True, "minor": None},
+    }
+    return sign_vc(body, signer, sk, b64u(pk), f"{did}#key-1")
+
+
+def test_round_trip_keeps_signature_valid_and_is_smaller():
+    vc = _vc()
+    encoded = compact.encode({"type": "presentation", "vcs": [vc]})
+    decoded = compact.decode(encoded)
+    assert json.dumps(decoded) == json.dumps({"type": "presentation", "vcs": [vc]})
+    assert verify_vc(decoded["vcs"][0], signer)[0]
+
+    as_json = json.dumps(vc, separators=(",", ":")).encode()
+    assert len(compact.encode(vc)) < len(zlib.compress(as_json, 9)) < len(as_json)
+
+
+def test_decode_rejects_malformed_input():
+    with pytest.raises(compact.CodecError):
+        compact.decode(b"{}")
+    with pytest.raises(compact.CodecError):
+        compact.decode(compact.encode({"a": "b"})[:-2])
+    bomb = compact.encode({"x": "a" * 200_000})
+    with pytest.raises(compact.CodecError, match="too_large"):
+        compact.decode(bomb, max_size=10_000)
+
+
+def test_endpoints_accept_compact_bodies(client):
+    headers = {"Content-Type": compact.MEDIA_TYPE}
+    up = client.post("/api/present/upload", content=compact.encode({"type": "presentation", "challenge": "c"}),
+                     headers=headers)
+    assert up.status_code == 200, up.text
+    assert client.get(up.json()["path"]).json() == {"type": "presentation", "challenge": "c"}
+
+    resp = client.post("/api/present/verify", content=compact.encode({"type": "nope"}), headers=headers)
+    assert (resp.status_code, resp.json()["detail"]) == (400, "bad_type")
+    resp = client.post("/api/present/verify", content=b"WPC\x01garbage", headers=headers)
+    assert (resp.status_code, resp.json()["detail"]) == (400, "bad_body")
@@ -0,0 +1,87 @@
+import asyncio
+import sqlite3
+import time
+
+import pytest
+from jose import jwt
+
+from backend.core.crypto_ed25519 import Ed25519Signer, b64u
+from backend.core.vc import sign_vc
+from backend.credential_expiry import CredentialExpirer, credential_expirer, credential_expires_at
+from backend.settings import settings
+
+signer = Ed25519Signer()
+sk, pk = signer.generate_keypair()
+
+
+def _vc(jti: str) -> dict:
+    body = {"jti": jti, "issuer": "did:key:zexpiry", "credentialSubject": {"id": "did:key:zexpiry-holder"}}
+    return sign_vc(body, signer, sk, b64u(pk), "did:key:zexpiry#key-1")
+
+
+@pytest.fixture
+def app_expirer_stopped(client):
+    """Keep the app's own expirer from moving the shared watermark under a test"""
+    client.portal.call(credential_expirer.stop)
+
+
+def test_credential_expires_at_parses_vc_dates():
+    assert credential_expires_at({"expirationDate": "2030-01-01T00:00:00Z"}) == 1893456000
+    assert credential_expires_at({"validUntil": "2030-01-01T03:00:00+03:00"}) == 1893456000
+    assert credential_expires_at({"expirationDate": "2030-01-01T00:00:00"}) == 1893456000
+    assert credential_expires_at({"expirationDate": "next year"}) is None
+    assert credential_expires_at({}) is None
+
+
+def test_expired_credentials_are_rejected_and_swept(client, app_expirer_stopped, issuer_with_credentials):
+    _, headers = issuer_with_credentials(3, "expiry")
+    now = int(time.time())
+    with sqlite3.connect(settings.SQLITE_PATH) as conn:
+        conn.execute("UPDATE issued_vcs SET expires_at=? WHERE vc_id='vc-expiry-1'", (now - 10,))
+        conn.execute("UPDATE issued_vcs SET expires_at=? WHERE vc_id='vc-expiry-2'", (now + 3600,))
+        conn.execute("DELETE FROM job_state WHERE name='credential_expiry'")
+
+    # Rejected from the extracted expires_at before the sweep has run
+    resp = client.post("/api/vc/verify", json={"vc": _vc("vc-expiry-1")}).json()
+    assert (resp["valid"], resp["reason"]) == (False, "expired")
+    results = client.post("/api/vc/verify/batch", json={"vcs": [_vc(f"vc-expiry-{n}") for n in (1, 2)]}).json()
+    assert [r["reason"] for r in results["results"]] == ["expired", "ok"]
+
+    assert asyncio.run(CredentialExpirer(batch_size=1).expire_once()) == 1
+    assert client.get("/api/status/vc-expiry-1").json()["status"] == "expired"
+    assert client.get("/api/status/vc-expiry-2").json()["status"] == "valid"
+    assert client.get("/api/issuer/stats", headers=headers).json()["expired_count"] == 1
+
+
+def test_swept_watermark_survives_restarts(client, app_expirer_stopped, issuer_with_credentials):
+    issuer_with_credentials(3, "watermark")
+    now = int(time.time())
+    with sqlite3.connect(settings.SQLITE_PATH) as conn:
+        conn.execute("UPDATE issued_vcs SET expires_at=? WHERE vc_id='vc-watermark-1'", (now - 10,))
+        conn.execute("DELETE FROM job_state WHERE name='credential_expiry'")
+    assert asyncio.run(CredentialExpirer().expire_once(now)) >= 1
+
+    # Behind the stored watermark: a restarted expirer does not rescan it ...
+    with sqlite3.connect(settings.SQLITE_PATH) as conn:
+        conn.execute("UPDATE issued_vcs SET expires_at=? WHERE vc_id='vc-watermark-2'", (now - 20,))
+    assert asyncio.run(CredentialExpirer().expire_once(now + 1)) == 0
+    assert client.get("/api/status/vc-watermark-2").json()["status"] == "valid"
+
+    # ... until a backfill asks for a rescan
+    admin = jwt.encode({"sub": settings.ADMIN_USER}, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
+    assert client.post("/api/admin/migrations/backfill-expires-at", headers={"X-Token": admin}).status_code == 200
+    assert asyncio.run(CredentialExpirer().expire_once(now + 2)) == 1
+    assert client.get("/api/status/vc-watermark-2").json()["status"] == "expired"
+
+
+async def test_only_the_lease_holder_expires():
+    expirers = [CredentialExpirer(interval=3600), CredentialExpirer(interval=3600)]
+    for expirer in expirers:
+        expirer.start()
+    await asyncio.sleep(0.2)
+    try:
+        assert sum(e.lease.held for e in expirers) <= 1
+        assert [e.runs for e in expirers] == [int(e.lease.held) for e in expirers]
+    finally:
+        for expirer in expirers:
+            await expirer.stop()
@@ -0,0 +1,44 @@
+import csv
+import gzip
+import io
+import json
+
+from backend.settings import settings
+
+
+def test_ndjson_export_resumes_after_last_id(client, monkeypatch, issuer_with_credentials):
+    _, headers = issuer_with_credentials(7, "export")
+    monkeypatch.setattr(settings, "EXPORT_FLUSH_BYTES", 200)  # several chunks
+
+    resp = client.get("/api/issuer/credentials/export", headers=headers)
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    records = [json.loads(line) for line in resp.text.splitlines()]
+    assert sorted(r["vc_id"] for r in records) == sorted(f"vc-export-{n}" for n in range(7))
+    assert [r["id"] for r in records] == sorted(r["id"] for r in records)
+
+    resumed = client.get("/api/issuer/credentials/export", params={"after_id": records[3]["id"]}, headers=headers)
+    assert [json.loads(line)["vc_id"] for line in resumed.text.splitlines()] == [r["vc_id"] for r in records[4:]]
+
+    revoked = client.get("/api/issuer/credentials/export", params={"status": "revoked", "include_payload": True},
+                         headers=headers).text.splitlines()
+    assert [(json.loads(line)["vc_id"], json.loads(line)["payload"]) for line in revoked] == [
+        ("vc-export-0", {}), ("vc-export-5", {}),
+    ]
+
+
+def test_gzipped_csv_export_and_legacy_list(client, issuer_with_credentials):
+    _, headers = issuer_with_credentials(3, "export-csv")
+    resp = client.get("/api/issuer/credentials/export", params={"format": "csv", "gzip": True}, headers=headers)
+    assert resp.headers["content-type"] == "application/gzip"
+    assert 'filename="credentials-' in resp.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(gzip.decompress(resp.content).decode())))
+    assert sorted(r["vc_id"] for r in rows) == ["vc-export-csv-0", "vc-export-csv-1", "vc-export-csv-2"]
+    assert {r["status"] for r in rows} == {"revoked", "valid"}
+
+    legacy = client.get("/api/issuer/credentials", headers=headers).json()
+    assert legacy["ok"] is True
+    assert [c["vc_id"] for c in legacy["credentials"]] == ["vc-export-csv-2", "vc-export-csv-1", "vc-export-csv-0"]
+    assert set(legacy["credentials"][0]) == {
+        "vc_id", "subject_did", "recipient_id", "credential_type", "payload_hash", "template_id", "created_at", "updated_at",
+    }
@@ -0,0 +1,111 @@
+import asyncio
+import json
+import sqlite3
+import time
+
+import aiosqlite
+
+from backend.credential_fields import field_reindexer, reindex_issuer_fields
+from backend.settings import settings
+
+
+def _issue(issuer_id: int, vc_id: str, department: str, issued: str):
+    payload = {"issuanceDate": issued, "credentialSubject": {"id": f"did:key:z{vc_id}", "department": department}}
+    now = int(time.time())
+    with sqlite3.connect(settings.SQLITE_PATH) as conn:
+        conn.execute(
+            "INSERT INTO issued_vcs(vc_id, issuer_id, subject_did, payload, credential_type, created_at) VALUES(?,?,?,?,?,?)",
+            (vc_id, issuer_id, f"did:key:z{vc_id}", json.dumps(payload), "StudentCard", now),
+        )
+
+
+def test_filter_on_template_indexed_fields(client, issuer_with_credentials):
+    issuer_id, headers = issuer_with_credentials(0, "fields")
+    _issue(issuer_id, "vc-fields-1", "Physics", "2024-09-01T00:00:00Z")
+
+    def listing(*filters):
+        resp = client.get("/api/issuer/credentials", params={"field": list(filters)}, headers=headers)
+        return resp.json()["credentials"] if resp.status_code == 200 else resp.json()["detail"]
+
+    assert listing("credentialSubject.department=Physics") == "field_not_indexed"
+
+    template = {
+        "name": "Student", "vc_type": "StudentCard", "schema_data": {},
+        "indexed_fields": ["credentialSubject.department", "issuanceDate"],
+    }
+    resp = client.post("/api/issuer/templates", json=template, headers=headers)
+    assert resp.status_code == 200, resp.text
+    client.portal.call(field_reindexer.wait)
+    _issue(issuer_id, "vc-fields-2", "Chemistry", "2025-02-01T00:00:00Z")
+    _issue(issuer_id, "vc-fields-3", "Physics", "2025-03-01T00:00:00Z")
+
+    ids = lambda *f: sorted(c["vc_id"] for c in listing(*f))
+    # Existing credentials were reindexed in the background, new ones are indexed by trigger
+    assert ids("credentialSubject.department=Physics") == ["vc-fields-1", "vc-fields-3"]
+    assert ids("credentialSubject.department=Physics", "issuanceDate>=2025-01-01") == ["vc-fields-3"]
+    assert ids("issuanceDate<=2025-02-28") == ["vc-fields-1", "vc-fields-2"]
+    assert listing("credentialSubject.department") == "bad_field_filter"
+
+    bad = {**template, "indexed_fields": ["credentialSubject['x']"]}
+    assert client.post("/api/issuer/templates", json=bad, headers=headers).json()["detail"] == "bad_indexed_field"
+
+
+def test_template_edit_keeps_fields_and_reindex_runs_in_chunks(client, issuer_with_credentials):
+    issuer_id, headers = issuer_with_credentials(0, "fields-edit")
+    for n in range(5):
+        _issue(issuer_id, f"vc-fields-edit-{n}", "Physics" if n % 2 else "Biology", "2025-01-01T00:00:00Z")
+    template = {"name": "Student", "vc_type": "StudentCard", "schema_data": {}, "indexed_fields": ["credentialSubject.department"]}
+    template_id = client.post("/api/issuer/templates", json=template, headers=headers).json()["template_id"]
+
+    def indexed():
+        with sqlite3.connect(settings.SQLITE_PATH) as conn:
+            return conn.execute("SELECT COUNT(*) FROM credential_fields WHERE issuer_id=?", (issuer_id,)).fetchone()[0]
+
+    # The console's edit / is_active toggle does not send indexed_fields
+    edit = {"name": "Student", "vc_type": "StudentCard", "schema_data": {}, "is_active": False}
+    assert client.patch(f"/api/issuer/templates/{template_id}", json=edit, headers=headers).status_code == 200
+    client.portal.call(field_reindexer.wait)
+    templates = client.get("/api/issuer/templates", headers=headers).json()["templates"]
+    assert templates[0]["indexed_fields"] == ["credentialSubject.department"]
+    assert indexed() == 5
+
+    with sqlite3.connect(settings.SQLITE_PATH) as conn:
+        conn.execute("DELETE FROM credential_fields WHERE issuer_id=?", (issuer_id,))
+        conn.execute(
+            "INSERT INTO credential_fields(credential_id, issuer_id, key, value) VALUES(?,?,?,?)",
+            (10 ** 9, issuer_id, "credentialSubject.department", "stale"),
+        )
+
+    async def reindex():
+        async with aiosqlite.connect(settings.SQLITE_PATH) as db:
+            return await reindex_issuer_fields(db, issuer_id, chunk_size=2)
+
+    assert asyncio.run(reindex()) == 5
+    assert indexed() == 5
+
+
+def test_reindex_requests_during_a_rebuild_coalesce(client, issuer_with_credentials):
+    issuer_id, headers = issuer_with_credentials(0, "fields-burst")
+    for n in range(3):
+        _issue(issuer_id, f"vc-fields-burst-{n}", "Physics", "2025-01-01T00:00:00Z")
+    with sqlite3.connect(settings.SQLITE_PATH) as conn:
+        conn.execute(
+            "INSERT INTO issuer_templates(issuer_id, name, vc_type, schema_json, indexed_fields, created_at, updated_at)"
+            " VALUES(?,?,?,?,?,?,?)",
+            (issuer_id, "Student", "StudentCard", "{}", '["credentialSubject.department"]', 0, 0),
+        )
+
+    async def burst():
+        runs = field_reindexer.runs
+        field_reindexer.schedule(issuer_id)
+        field_reindexer.schedule(issuer_id)  # before the rebuild started: covered by it
+        await asyncio.sleep(0)
+        for _ in range(4):
+            field_reindexer.schedule(issuer_id)  # during the rebuild: one rerun
+        assert field_reindexer.metrics()["pending"] == [issuer_id]
+        await field_reindexer.wait()
+        return field_reindexer.runs - runs
+
+    assert client.portal.call(burst) == 2
+    with sqlite3.connect(settings.SQLITE_PATH) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM credential_fields WHERE issuer_id=?", (issuer_id,)).fetchone()[0] == 3
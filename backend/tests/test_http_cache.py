@@ -0,0 +1,47 @@
+import time
+from email.utils import formatdate
+
+import aiosqlite
+
+from backend.http_cache import collection_validators
+from backend.settings import settings
+
+
+def test_status_conditional_get(client):
+    client.post("/api/status/revoke", json={"vc_id": "vc-etag-1"})
+    first = client.get("/api/status/vc-etag-1")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    # Shared caches must revalidate revocation status on every request
+    assert first.headers["cache-control"] == "no-cache"
+
+    again = client.get("/api/status/vc-etag-1", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["etag"] == etag
+
+    last_modified = first.headers["last-modified"]
+    assert client.get("/api/status/vc-etag-1", headers={"If-Modified-Since": last_modified}).status_code == 304
+    assert client.get("/api/status/vc-etag-1", headers={"If-Modified-Since": formatdate(0, usegmt=True)}).status_code == 200
+
+    # A different validator, e.g. after a status change, gets the full body
+    assert client.get("/api/status/vc-etag-1", headers={"If-None-Match": '"stale"'}).status_code == 200
+
+
+async def test_collection_etag_changes_on_same_second_updates():
+    now = int(time.time())
+    async with aiosqlite.connect(settings.SQLITE_PATH) as conn:
+        cur = await conn.execute(
+            "INSERT INTO vc_templates(user_id, name, description, vc_type, fields, created_at, updated_at) "
+            "VALUES(?,?,?,?,?,?,?)",
+            (987654, "Etag", "", "StudentCard", "{}", now, now),
+        )
+        template_id = cur.lastrowid
+        await conn.commit()
+
+        etags = []
+        for name in ("first", "second"):
+            await conn.execute("UPDATE vc_templates SET name=?, updated_at=? WHERE id=?", (name, now, template_id))
+            await conn.commit()
+            etags.append((await collection_validators(conn, "vc_templates", "user_id=?", (987654,), 987654))[0])
+    assert etags[0] != etags[1]
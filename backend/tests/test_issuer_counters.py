@@ -0,0 +1,53 @@
+import sqlite3
+
+from jose import jwt
+
+from backend.database import LeaderLease
+from backend.issuer_counters import counter_reconciler
+from backend.settings import settings
+
+
+def _stats(client, headers):
+    return client.get("/api/issuer/stats", headers=headers).json()
+
+
+def test_stats_follow_issue_and_revoke(client, issuer_with_credentials):
+    _, headers = issuer_with_credentials(10, "counters")  # n = 0, 5 revoked
+    assert _stats(client, headers) == {
+        "total_issued": 10, "active_count": 8, "revoked_count": 2, "expired_count": 0,
+    }
+
+    client.post("/api/status/revoke", json={"vc_id": "vc-counters-1"})
+    with sqlite3.connect(settings.SQLITE_PATH) as conn:
+        conn.execute("UPDATE vc_status SET status='expired' WHERE vc_id='vc-counters-2'")
+    assert _stats(client, headers) == {
+        "total_issued": 10, "active_count": 6, "revoked_count": 3, "expired_count": 1,
+    }
+
+    data = client.get("/api/issuer/credentials", params={"status": "revoked"}, headers=headers).json()
+    assert data["total"] == len(data["credentials"]) == 3
+
+
+def test_reconcile_repairs_drifted_counters(client, issuer_with_credentials):
+    issuer_id, headers = issuer_with_credentials(4, "drift")
+    with sqlite3.connect(settings.SQLITE_PATH) as conn:
+        conn.execute("UPDATE issuer_counters SET total=99, active=0 WHERE issuer_id=?", (issuer_id,))
+    assert _stats(client, headers)["total_issued"] == 99
+
+    admin = jwt.encode({"sub": settings.ADMIN_USER}, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
+    result = client.post("/api/admin/issuers/counters/reconcile", headers={"X-Token": admin}).json()
+    assert result["corrected"] >= 1
+    assert _stats(client, headers) == {
+        "total_issued": 4, "active_count": 3, "revoked_count": 1, "expired_count": 0,
+    }
+    assert counter_reconciler.metrics()["last_run"] == result
+
+
+def test_only_one_worker_leads_the_reconciler():
+    leader, follower = LeaderLease("counters-test"), LeaderLease("counters-test")
+    assert leader.acquire()
+    assert not follower.acquire()
+    leader.release()
+    # The next worker to tick takes over
+    assert follower.acquire()
+    follower.release()
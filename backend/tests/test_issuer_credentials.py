@@ -0,0 +1,67 @@
+import sqlite3
+import time
+
+from backend.settings import settings
+
+
+def test_keyset_pagination_walks_every_credential_once(client, issuer_with_credentials):
+    _, headers = issuer_with_credentials(25, "keyset")
+    seen = []
+    cursor = None
+    while True:
+        params = {"per_page": 7, "total": "none"}
+        if cursor:
+            params["cursor"] = cursor
+        data = client.get("/api/issuer/credentials", params=params, headers=headers).json()
+        assert data["total"] is None
+        seen.extend(c["vc_id"] for c in data["credentials"])
+        cursor = data["next_cursor"]
+        if not cursor:
+            break
+    assert sorted(seen) == sorted(f"vc-keyset-{n}" for n in range(25))
+    assert len(seen) == len(set(seen))
+
+    filtered = client.get("/api/issuer/credentials", params={"status": "revoked", "template_type": "Membership"},
+                          headers=headers).json()
+    assert filtered["total"] == len(filtered["credentials"]) == 3  # n = 0, 10, 20
+
+
+def test_estimated_total_is_capped(client, monkeypatch, issuer_with_credentials):
+    _, headers = issuer_with_credentials(12, "capped")
+    monkeypatch.setattr(settings, "ISSUER_LIST_COUNT_CAP", 5)
+    # Unfiltered totals come from issuer_counters and are always exact
+    data = client.get("/api/issuer/credentials", params={"total": "estimate"}, headers=headers).json()
+    assert (data["total"], data["total_exact"]) == (12, True)
+    data = client.get("/api/issuer/credentials", params={"total": "estimate", "template_type": "Membership"},
+                      headers=headers).json()
+    assert (data["total"], data["total_exact"]) == (5, False)
+    assert client.get("/api/issuer/credentials", params={"cursor": "@@"}, headers=headers).status_code == 400
+
+
+def test_search_uses_trigram_index_over_subject_fields(client, issuer_with_credentials):
+    issuer_id, headers = issuer_with_credentials(0, "fts")
+    now = int(time.time())
+    payload = '{"credentialSubject":{"id":"did:key:zfts-holder","name":"Ada Yilmaz","studentId":"2021-4711"}}'
+    with sqlite3.connect(settings.SQLITE_PATH) as conn:
+        conn.execute(
+            "INSERT INTO issued_vcs(vc_id, issuer_id, subject_did, payload, credential_type, created_at) VALUES(?,?,?,?,?,?)",
+            ("vc-fts-1", issuer_id, "did:key:zfts-holder", payload, "StudentCard", now),
+        )
+
+    def search(term):
+        data = client.get("/api/issuer/credentials", params={"search": term}, headers=headers).json()
+        return [c["vc_id"] for c in data["credentials"]]
+
+    assert search("yilm") == ["vc-fts-1"]  # case-insensitive substring of the subject name
+    assert search("4711") == ["vc-fts-1"]
+    assert search("fts-hol") == ["vc-fts-1"]
+    assert search("nobody") == []
+    # Another issuer's credentials never match, even on the same term
+    _, other_headers = issuer_with_credentials(0, "fts-other")
+    data = client.get("/api/issuer/credentials", params={"search": "yilm"}, headers=other_headers).json()
+    assert data["credentials"] == []
+
+    with sqlite3.connect(settings.SQLITE_PATH) as conn:
+        conn.execute("UPDATE issued_vcs SET payload=? WHERE vc_id='vc-fts-1'", (payload.replace("Ada Yilmaz", "Ada Kaya"),))
+    assert search("yilm") == []
+    assert search("kaya") == ["vc-fts-1"]
@@ -0,0 +1,49 @@
+import time
+
+import aiosqlite
+
+from backend.core.crypto_ed25519 import Ed25519Signer, b64u
+from backend.core.vc import sign_vc
+from backend.issuer_registry import IssuerRegistry
+from backend.settings import settings
+from backend.verification import issuer_registry, issuer_trusted
+
+signer = Ed25519Signer()
+
+
+async def test_registry_indexes_by_did_and_key_and_tracks_status():
+    sk, pk = signer.generate_keypair()
+    did = f"did:key:z{b64u(pk)}"
+    now = int(time.time())
+    async with aiosqlite.connect(settings.SQLITE_PATH) as conn:
+        cur = await conn.execute(
+            "INSERT INTO issuers(name, email, did, status, created_at, updated_at, meta) VALUES(?,?,?,?,?,?,?)",
+            ("Registry Univ", "registry@univ.edu", did, "pending", now, now, '{"domain_verified": true}'),
+        )
+        issuer_id = cur.lastrowid
+        await conn.commit()
+
+        registry = IssuerRegistry(refresh_interval=60)
+        await registry.load(conn)
+        entry = registry.get_by_pk(b64u(pk))
+        assert entry["did"] == did
+        assert entry["domain_verified"] is True
+        assert registry.is_trusted(did, b64u(pk)) is False
+
+        await conn.execute("UPDATE issuers SET status='approved' WHERE id=?", (issuer_id,))
+        await conn.commit()
+        await registry.refresh_issuer(conn, issuer_id)
+        assert registry.is_trusted(did, b64u(pk)) is True
+        # A credential signed with some other key is not trusted even with the right DID
+        assert registry.is_trusted(did, b64u(signer.generate_keypair()[1])) is False
+
+        # Module registry used by the verify paths
+        await issuer_registry.refresh_issuer(conn, issuer_id)
+        vc = sign_vc({"jti": "vc-registry-1", "issuer": did, "credentialSubject": {"id": "did:key:h"}},
+                     signer, sk, b64u(pk), f"{did}#key-1")
+        assert issuer_trusted(vc) is True
+
+        await conn.execute("UPDATE issuers SET status='revoked' WHERE id=?", (issuer_id,))
+        await conn.commit()
+        await issuer_registry.refresh_issuer(conn, issuer_id)
+        assert issuer_trusted(vc) is False
@@ -0,0 +1,75 @@
+import sqlite3
+import time
+
+from jose import jwt
+
+from backend.issuer_rollups import day_label
+from backend.settings import settings
+
+
+def _series(client, headers, **params):
+    resp = client.get("/api/issuer/analytics/timeseries", params=params, headers=headers)
+    assert resp.status_code == 200
+    return {(p["credential_type"], p["action"]): p["count"] for p in resp.json()["points"]}
+
+
+def test_rollups_follow_issue_revoke_and_verify(client, issuer_with_credentials):
+    _, headers = issuer_with_credentials(6, "rollup")  # odd n StudentCard, n = 0, 5 revoked
+    client.post("/api/status/revoke", json={"vc_id": "vc-rollup-2"})
+    now = int(time.time())
+    with sqlite3.connect(settings.SQLITE_PATH) as conn:
+        conn.executemany(
+            "INSERT INTO audit_logs(ts, action, result, vc_id) VALUES(?,?,?,?)",
+            [(now, "vc_verify_simple", "ok", "vc-rollup-1"),
+             (now, "present_verify", "ok", "vc-rollup-1"),
+             (now, "kiosk_verify", "fail", "vc-rollup-4"),
+             (now, "user_login", "ok", "vc-rollup-4")],
+        )
+
+    expected = {
+        ("Membership", "issued"): 3, ("StudentCard", "issued"): 3,
+        ("Membership", "revoked"): 2, ("StudentCard", "revoked"): 1,
+        ("StudentCard", "verified"): 2, ("Membership", "verify_failed"): 1,
+    }
+    assert _series(client, headers) == expected
+    assert _series(client, headers, action="issued", credential_type="StudentCard") == {("StudentCard", "issued"): 3}
+
+    # A rebuild from the source tables lands on the same counts
+    with sqlite3.connect(settings.SQLITE_PATH) as conn:
+        conn.execute("UPDATE issuer_daily_rollups SET count = count + 10")
+    admin = jwt.encode({"sub": settings.ADMIN_USER}, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
+    result = client.post("/api/admin/issuers/rollups/rebuild", params={"days": 1}, headers={"X-Token": admin}).json()
+    assert result["since"] == day_label(now)
+    assert _series(client, headers) == expected
+
+
+def test_timeseries_rejects_bad_ranges(client, issuer_with_credentials):
+    _, headers = issuer_with_credentials(0, "rollup-range")
+    assert _series(client, headers, date_from="2025-01-01", date_to="2025-01-31") == {}
+    get = lambda **p: client.get("/api/issuer/analytics/timeseries", params=p, headers=headers)
+    assert get(date_from="01/02/2025").json()["detail"] == "bad_date"
+    assert get(date_from="2025-02-01", date_to="2025-01-01").json()["detail"] == "bad_date_range"
+    assert get(date_from="2020-01-01", date_to="2025-01-01").json()["detail"] == "date_range_too_large"
+    assert get(action="viewed").json()["detail"] == "bad_action"
+
+
+
+def test_rebuild_keeps_verification_counts_older_than_hot_audit(client, issuer_with_credentials):
+    issuer_id, _ = issuer_with_credentials(1, "rollup-old")
+    old_day = day_label(int(time.time()) - 400 * 86400)
+    with sqlite3.connect(settings.SQLITE_PATH) as conn:
+        conn.executemany(
+            "INSERT INTO issuer_daily_rollups(issuer_id, day, credential_type, action, count) VALUES(?,?,?,?,?)",
+            [(issuer_id, old_day, "Membership", "issued", 7), (issuer_id, old_day, "Membership", "verified", 5)],
+        )
+
+    # Audit rows that old may only be in the archive: issued is recomputed, verified is kept
+    admin = jwt.encode({"sub": settings.ADMIN_USER}, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
+    result = client.post("/api/admin/issuers/rollups/rebuild", params={"days": 500}, headers={"X-Token": admin}).json()
+    assert result["verify_since"] > old_day
+    with sqlite3.connect(settings.SQLITE_PATH) as conn:
+        rows = conn.execute(
+            "SELECT action, count FROM issuer_daily_rollups WHERE issuer_id=? AND day=?", (issuer_id, old_day)
+        ).fetchall()
+    assert rows == [("verified", 5)]
+    assert "leader" in client.get("/api/admin/issuers/rollups", headers={"X-Token": admin}).json()
@@ -0,0 +1,84 @@
+import time
+
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from backend.core.crypto_ed25519 import Ed25519Signer, b64u
+from backend.core.vc import sign_vc
+from backend.kiosk import _open_sessions
+from backend.settings import settings
+
+signer = Ed25519Signer()
+
+
+def _presentation(challenge, vc, holder_sk, holder_pk, aud="gate-7"):
+    msg = "|".join([challenge["challenge"], aud, str(challenge["expires_at"])]).encode()
+    return {
+        "type": "presentation",
+        "challenge": challenge["challenge"],
+        "aud": aud,
+        "exp": challenge["expires_at"],
+        "holder": {
+            "did": f"did:key:z{b64u(holder_pk)}",
+            "pk_b64u": b64u(holder_pk),
+            "sig_b64u": b64u(signer.sign(holder_sk, msg)),
+        },
+        "vc": vc,
+    }
+
+
+def test_kiosk_session_streams_results(client):
+    issuer_sk, issuer_pk = signer.generate_keypair()
+
+    with client.websocket_connect("/api/kiosk/ws?audience=gate-7") as ws:
+        pool = ws.receive_json()
+        assert pool["type"] == "challenges"
+        assert len(pool["items"]) >= 2
+        first, second = pool["items"][:2]
+
+        payloads = []
+        for n, challenge in enumerate((first, second)):
+            sk, pk = signer.generate_keypair()
+            vc = sign_vc({"jti": f"vc-kiosk-{n}", "issuer": "did:key:kiosk-issuer",
+                          "credentialSubject": {"id": f"did:key:z{b64u(pk)}"}},
+                         signer, issuer_sk, b64u(issuer_pk), "did:key:kiosk-issuer#key-1")
+            payloads.append(_presentation(challenge, vc, sk, pk))
+
+        ws.send_json({"type": "presentation", "ref": "a", "payload": payloads[0]})
+        ws.send_json({"type": "presentation", "ref": "b", "payload": payloads[1]})
+        ws.send_json({"type": "presentation", "ref": "replay", "payload": payloads[0]})
+
+        messages = {}
+        while len(messages) < 3:
+            message = ws.receive_json()
+            if message["type"] != "challenges":
+                messages[message["ref"]] = message
+
+    assert messages["a"]["type"] == "result" and messages["a"]["valid"] is True
+    assert messages["b"]["type"] == "result" and messages["b"]["valid"] is True
+    assert messages["replay"] == {"type": "error", "ref": "replay", "detail": "replay_or_invalid_nonce"}
+
+
+def _wait_for_sessions_closed(timeout=5.0):
+    # Server-side cleanup finishes after the client side of the socket is gone
+    deadline = time.monotonic() + timeout
+    while _open_sessions and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not _open_sessions
+
+
+def test_kiosk_sessions_are_capped_per_client(client, monkeypatch):
+    monkeypatch.setattr(settings, "KIOSK_MAX_SESSIONS_PER_CLIENT", 1)
+    _wait_for_sessions_closed()
+
+    with client.websocket_connect("/api/kiosk/ws?audience=gate-cap") as ws:
+        assert ws.receive_json()["type"] == "challenges"
+        with pytest.raises(WebSocketDisconnect) as exc:
+            with client.websocket_connect("/api/kiosk/ws?audience=gate-cap") as second:
+                second.receive_json()
+        assert exc.value.code == 1008
+
+    # The slot is released once the first session ends
+    _wait_for_sessions_closed()
+    with client.websocket_connect("/api/kiosk/ws?audience=gate-cap") as ws:
+        assert ws.receive_json()["type"] == "challenges"
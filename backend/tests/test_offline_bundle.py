@@ -0,0 +1,139 @@
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import aiosqlite
+import pytest
+
+from backend.core.crypto_ed25519 import Ed25519Signer, b64u
+from backend.core.offline import OfflineVerifier
+from backend.core.vc import sign_vc
+from backend.offline_bundle import export_bundle
+from backend.server_keys import _load_or_create_seed, server_key
+from backend.settings import settings
+from backend.sweeper import ExpirySweeper
+
+signer = Ed25519Signer()
+
+
+async def test_offline_verifier_follows_full_bundle_and_deltas():
+    sk, pk = signer.generate_keypair()
+    did = f"did:key:z{b64u(pk)}"
+    now = int(time.time())
+
+    def vc(jti):
+        body = {"jti": jti, "issuer": did, "credentialSubject": {"id": "did:key:offline-holder"}}
+        return sign_vc(body, signer, sk, b64u(pk), f"{did}#key-1")
+
+    async with aiosqlite.connect(settings.SQLITE_PATH) as conn:
+        cur = await conn.execute(
+            "INSERT INTO issuers(name, email, did, status, created_at, updated_at) VALUES(?,?,?,?,?,?)",
+            ("Offline Univ", "offline@univ.edu", did, "approved", now, now),
+        )
+        issuer_id = cur.lastrowid
+        await conn.executemany(
+            "INSERT INTO vc_status(vc_id, issuer_did, subject_did, status, created_at, updated_at) VALUES(?,?,?,?,?,?)",
+            [("vc-offline-1", did, "s", "valid", now, now), ("vc-offline-2", did, "s", "revoked", now, now)],
+        )
+        await conn.commit()
+
+        verifier = OfflineVerifier(server_key().pk)
+        verifier.load(await export_bundle(conn))
+        assert verifier.verify(vc("vc-offline-1"))[:2] == (True, "ok")
+        assert verifier.verify(vc("vc-offline-2"))[:2] == (False, "revoked")
+
+        await conn.execute("UPDATE vc_status SET status='revoked', updated_at=? WHERE vc_id=?", (now, "vc-offline-1"))
+        await conn.execute("UPDATE vc_status SET status='valid', updated_at=? WHERE vc_id=?", (now, "vc-offline-2"))
+        await conn.commit()
+        verifier.apply_delta(await export_bundle(conn, since=verifier.seq))
+        assert verifier.verify(vc("vc-offline-1"))[:2] == (False, "revoked")
+        assert verifier.verify(vc("vc-offline-2"))[:2] == (True, "ok")
+
+        await conn.execute("UPDATE issuers SET status='revoked', updated_at=? WHERE id=?", (now, issuer_id))
+        await conn.commit()
+        verifier.apply_delta(await export_bundle(conn, since=verifier.seq))
+        assert verifier.verify(vc("vc-offline-2"))[:2] == (False, "untrusted_issuer")
+
+
+async def test_tampered_bundle_is_rejected():
+    async with aiosqlite.connect(settings.SQLITE_PATH) as conn:
+        envelope = dict(await export_bundle(conn))
+    envelope["payload"] = envelope["payload"][:-4] + "AAAA"
+    with pytest.raises(ValueError, match="bad_bundle_signature"):
+        OfflineVerifier(server_key().pk).load(envelope)
+
+
+def test_concurrent_workers_share_one_generated_seed(monkeypatch):
+    path = os.path.join(tempfile.mkdtemp(), "server_signing.key")
+    monkeypatch.setattr(settings, "SERVER_SIGNING_KEY", "")
+    monkeypatch.setattr(settings, "SERVER_SIGNING_KEY_PATH", path)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        seeds = list(pool.map(lambda _: _load_or_create_seed(), range(16)))
+    assert len(set(seeds)) == 1 and len(seeds[0]) == 32
+    assert os.listdir(os.path.dirname(path)) == ["server_signing.key"]
+
+
+async def test_delta_before_pruned_history_is_refused():
+    old = int(time.time()) - (settings.TRUST_CHANGES_RETENTION_DAYS + 1) * 86400
+    async with aiosqlite.connect(settings.SQLITE_PATH) as conn:
+        await conn.executemany(
+            "INSERT INTO vc_status(vc_id, issuer_did, subject_did, status, created_at, updated_at) VALUES(?,?,?,?,?,?)",
+            [(f"vc-pruned-{i}", "did:i", "s", "revoked", old, old) for i in range(3)],
+        )
+        await conn.commit()
+        cur = await conn.execute("SELECT MAX(seq) FROM trust_changes")
+        seq = (await cur.fetchone())[0]
+        # Age the whole log past retention
+        await conn.execute("UPDATE trust_changes SET ts=?", (old,))
+        await conn.commit()
+
+        results = await ExpirySweeper().sweep_once()
+        assert results["trust_changes"] >= 2
+        # The newest change survives so the sequence keeps counting from it
+        cur = await conn.execute("SELECT MAX(seq) FROM trust_changes")
+        assert (await cur.fetchone())[0] == seq
+
+        with pytest.raises(ValueError, match="delta_expired"):
+            await export_bundle(conn, since=seq - 3)
+        assert (await export_bundle(conn, since=seq))["payload"]
+
+
+async def test_offline_verifier_checks_presentations():
+    issuer_sk, issuer_pk = signer.generate_keypair()
+    holder_sk, holder_pk = signer.generate_keypair()
+    did, holder_did = f"did:key:z{b64u(issuer_pk)}", f"did:key:z{b64u(holder_pk)}"
+    now = int(time.time())
+    async with aiosqlite.connect(settings.SQLITE_PATH) as conn:
+        await conn.execute(
+            "INSERT INTO issuers(name, email, did, status, created_at, updated_at) VALUES(?,?,?,?,?,?)",
+            ("Offline VP Univ", "offline-vp@univ.edu", did, "approved", now, now),
+        )
+        await conn.execute(
+            "INSERT INTO vc_status(vc_id, issuer_did, subject_did, status, created_at, updated_at) VALUES(?,?,?,?,?,?)",
+            ("vc-offline-vp-revoked", did, holder_did, "revoked", now, now),
+        )
+        await conn.commit()
+        verifier = OfflineVerifier(server_key().pk)
+        verifier.load(await export_bundle(conn))
+
+    def presentation(jti, challenge="gate-nonce", exp=now + 60, subject=holder_did):
+        body = {"jti": jti, "issuer": did, "credentialSubject": {"id": subject}}
+        msg = "|".join([challenge, "gate-7", str(exp)]).encode()
+        return {
+            "type": "presentation", "challenge": challenge, "aud": "gate-7", "exp": exp,
+            "holder": {"did": holder_did, "pk_b64u": b64u(holder_pk), "sig_b64u": b64u(signer.sign(holder_sk, msg))},
+            "vc": sign_vc(body, signer, issuer_sk, b64u(issuer_pk), f"{did}#key-1"),
+        }
+
+    check = lambda payload, aud="gate-7": verifier.verify_presentation(payload, "gate-nonce", aud, now=now)[:2]
+    assert check(presentation("vc-offline-vp-1")) == (True, "ok")
+    assert check(presentation("vc-offline-vp-1"), aud="gate-8") == (False, "aud_mismatch")
+    assert check(presentation("vc-offline-vp-1", challenge="other")) == (False, "challenge_mismatch")
+    assert check(presentation("vc-offline-vp-1", exp=now - 1)) == (False, "presentation_expired")
+    assert check(presentation("vc-offline-vp-1", subject="did:key:zsomeone")) == (False, "subject_holder_mismatch")
+    assert check(presentation("vc-offline-vp-revoked")) == (False, "revoked")
+    forged = presentation("vc-offline-vp-1")
+    forged["exp"] = now + 3600
+    assert check(forged) == (False, "bad_holder_signature")
@@ -0,0 +1,74 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import pytest
+from limits import parse
+from limits.strategies import FixedWindowRateLimiter, SlidingWindowCounterRateLimiter
+from limits.storage import storage_from_string
+
+from backend.rate_limit import SQLiteStorage, _checked_strategy
+
+
+def _storage_uri(name):
+    path = os.path.join(tempfile.mkdtemp(), name)
+    return f"sqlite://{path}"
+
+
+def test_scheme_is_registered():
+    storage = storage_from_string(_storage_uri("scheme.db"))
+    assert isinstance(storage, SQLiteStorage)
+    assert storage.check()
+
+
+def test_counters_are_shared_between_workers():
+    uri = _storage_uri("shared.db")
+    worker_a = SQLiteStorage(uri)
+    worker_b = SQLiteStorage(uri)
+    limit = parse("3/minute")
+
+    limiter_a = FixedWindowRateLimiter(worker_a)
+    limiter_b = FixedWindowRateLimiter(worker_b)
+
+    assert limiter_a.hit(limit, "user_login", "127.0.0.1")
+    assert limiter_b.hit(limit, "user_login", "127.0.0.1")
+    assert limiter_a.hit(limit, "user_login", "127.0.0.1")
+    assert not limiter_b.hit(limit, "user_login", "127.0.0.1")
+    assert not limiter_a.hit(limit, "user_login", "127.0.0.1")
+
+
+def test_sliding_window_counter():
+    uri = _storage_uri("sliding.db")
+    worker_a = SlidingWindowCounterRateLimiter(SQLiteStorage(uri))
+    worker_b = SlidingWindowCounterRateLimiter(SQLiteStorage(uri))
+    limit = parse("2/minute")
+
+    assert worker_a.hit(limit, "user_register", "10.0.0.1")
+    assert worker_b.hit(limit, "user_register", "10.0.0.1")
+    assert not worker_a.hit(limit, "user_register", "10.0.0.1")
+    # Other keys are unaffected
+    assert worker_b.hit(limit, "user_register", "10.0.0.2")
+
+    worker_a.clear(limit, "user_register", "10.0.0.1")
+    assert worker_b.hit(limit, "user_register", "10.0.0.1")
+
+
+def test_expired_counters_restart():
+    storage = SQLiteStorage(_storage_uri("expiry.db"))
+    assert storage.incr("k", expiry=-1) == 1
+    # Previous window already expired, so the counter starts over
+    assert storage.incr("k", expiry=60) == 1
+    assert storage.incr("k", expiry=60) == 2
+    assert storage.get("k") == 2
+    storage.clear("k")
+    assert storage.get("k") == 0
+
+
+def test_unsupported_strategy_fails_at_startup():
+    with pytest.raises(ValueError, match="moving-window"):
+        _checked_strategy(_storage_uri("strategy.db"), "moving-window")
+    assert _checked_strategy(_storage_uri("strategy.db"), "fixed-window") == "fixed-window"
+    # Other storages decide for themselves
+    assert _checked_strategy("redis://localhost:6379", "moving-window") == "moving-window"
@@ -0,0 +1,81 @@
+import asyncio
+
+from backend.read_cache import SingleFlightCache
+
+
+async def test_concurrent_misses_share_one_load():
+    cache = SingleFlightCache("test", ttl_ms=60_000, max_entries=10)
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"status": "valid"}
+
+    results = await asyncio.gather(*(cache.get("vc-1", load) for _ in range(20)))
+    assert calls == 1
+    assert all(r == {"status": "valid"} for r in results)
+    assert await cache.get("vc-1", load) == {"status": "valid"}
+
+    m = cache.metrics()
+    assert (m["loads"], m["coalesced"], m["hits"]) == (1, 19, 1)
+    assert m["coalescing_ratio"] == 0.95
+
+
+async def test_invalidate_during_load_is_not_cached():
+    cache = SingleFlightCache("test", ttl_ms=60_000, max_entries=10)
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def stale():
+        started.set()
+        await release.wait()
+        return "valid"
+
+    leader = asyncio.create_task(cache.get("vc-1", stale))
+    await started.wait()
+    cache.invalidate("vc-1")  # e.g. revoked while the read was in flight
+    release.set()
+    assert await leader == "valid"
+
+    async def fresh():
+        return "revoked"
+
+    assert await cache.get("vc-1", fresh) == "revoked"
+
+
+async def test_loader_errors_reach_waiters_and_are_not_cached():
+    cache = SingleFlightCache("test", ttl_ms=60_000, max_entries=10)
+
+    async def boom():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("db down")
+
+    results = await asyncio.gather(cache.get("k", boom), cache.get("k", boom), return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+    async def ok():
+        return 1
+
+    assert await cache.get("k", ok) == 1
+
+
+def test_status_endpoint_sees_revocation(client):
+    assert client.get("/api/status/vc-cache-1").json()["status"] == "unknown"
+    client.post("/api/status/revoke", json={"vc_id": "vc-cache-1"})
+    assert client.get("/api/status/vc-cache-1").json()["status"] == "revoked"
+
+
+async def test_misses_can_be_left_uncached():
+    cache = SingleFlightCache("test", ttl_ms=60_000, max_entries=10, cache_misses=False)
+    rows = [None, {"payload": "{}"}]
+
+    async def load():
+        return rows.pop(0)
+
+    # A row written by another worker right after the miss is found on the next scan
+    assert await cache.get("pid-1", load) is None
+    assert await cache.get("pid-1", load) == {"payload": "{}"}
+    assert await cache.get("pid-1", load) == {"payload": "{}"}
+    assert cache.metrics()["loads"] == 2
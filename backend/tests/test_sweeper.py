@@ -0,0 +1,52 @@
+import asyncio
+import time
+
+import aiosqlite
+
+from backend.settings import settings
+from backend.sweeper import ExpirySweeper
+
+
+async def test_sweep_deletes_only_expired_rows():
+    now = int(time.time())
+    async with aiosqlite.connect(settings.SQLITE_PATH) as conn:
+        await conn.executemany(
+            "INSERT INTO used_nonces(nonce, created_at, expires_at) VALUES(?,?,?)",
+            [(f"sweep-old-{i}", now - 600, now - 300) for i in range(5)]
+            + [("sweep-live", now, now + 300)],
+        )
+        await conn.executemany(
+            "INSERT INTO tmp_payloads(id, payload, created_at, expires_at) VALUES(?,?,?,?)",
+            [("sweep-tmp-old", "{}", now - 600, now - 300), ("sweep-tmp-live", "{}", now, now + 300)],
+        )
+        await conn.commit()
+
+    sweeper = ExpirySweeper(interval=60, batch_size=2)
+    results = await sweeper.sweep_once()
+
+    assert results["used_nonces"] >= 5
+    assert results["tmp_payloads"] >= 1
+
+    async with aiosqlite.connect(settings.SQLITE_PATH) as conn:
+        cur = await conn.execute("SELECT nonce FROM used_nonces WHERE nonce LIKE 'sweep-%'")
+        assert [r[0] for r in await cur.fetchall()] == ["sweep-live"]
+        cur = await conn.execute("SELECT id FROM tmp_payloads WHERE id LIKE 'sweep-tmp-%'")
+        assert [r[0] for r in await cur.fetchall()] == ["sweep-tmp-live"]
+
+    metrics = sweeper.metrics()
+    assert metrics["runs"] == 1
+    assert metrics["targets"]["used_nonces"]["deleted_total"] >= 5
+    assert metrics["targets"]["used_nonces"]["last_run_at"] is not None
+
+
+async def test_only_the_lease_holder_sweeps():
+    sweepers = [ExpirySweeper(interval=3600), ExpirySweeper(interval=3600)]
+    for sweeper in sweepers:
+        sweeper.start()
+    await asyncio.sleep(0.2)
+    try:
+        assert sum(s.lease.held for s in sweepers) <= 1
+        assert [s.runs for s in sweepers] == [int(s.lease.held) for s in sweepers]
+    finally:
+        for sweeper in sweepers:
+            await sweeper.stop()
@@ -0,0 +1,73 @@
+import asyncio
+import sqlite3
+import time
+
+from backend.tmp_payloads import TmpPayloadStore
+
+
+def test_upload_returns_original_bytes(client):
+    raw = b'{"type": "presentation",  "challenge": "c-1"}'
+    up = client.post("/api/present/upload", content=raw, headers={"Content-Type": "application/json"})
+    assert up.status_code == 200, up.text
+    got = client.get(up.json()["path"])
+    assert got.status_code == 200
+    assert got.content == raw
+    assert client.get("/api/present/tmp/missing").status_code == 404
+
+
+async def test_memory_tier_evicts_expired_then_lru():
+    store = TmpPayloadStore(max_items=3, max_bytes=1000, flush_interval_ms=100)
+    now = int(time.time())
+
+    class NoDb:
+        async def execute(self, *args):
+            pass
+
+    db = NoDb()
+    await store.put(db, "old", b"x" * 10, now - 400, now - 100)
+    await store.put(db, "a", b"a" * 10, now, now + 300)
+    await store.put(db, "b", b"b" * 10, now, now + 300)
+    assert store.get("old") is None  # expired entries go first
+    assert store.get("a") is not None  # touch: "b" is now least recently used
+
+    await store.put(db, "c", b"c" * 10, now, now + 300)
+    await store.put(db, "d", b"d" * 10, now, now + 300)
+    assert store.get("b") is None
+    assert store.metrics()["items"] == 3
+
+    await store.put(db, "big", b"z" * 990, now, now + 300)  # byte cap
+    assert store.metrics()["bytes"] <= 1000
+    assert store.get("big") is not None
+
+
+async def test_failing_flushes_are_bounded():
+    store = TmpPayloadStore(max_pending=2, max_retries=2)
+    now = int(time.time())
+    direct = []
+
+    class Db:
+        async def execute(self, sql, row):
+            direct.append(row[0])
+
+    class FailingConn:
+        async def executemany(self, *args):
+            raise sqlite3.OperationalError("disk I/O error")
+
+        async def rollback(self):
+            pass
+
+    # Writer "running" on a database that rejects every write
+    store._task = asyncio.get_running_loop().create_future()
+    store._conn = FailingConn()
+    for pid in ("p1", "p2", "p3"):
+        await store.put(Db(), pid, b"{}", now, now + 300)
+    # The queue is full, so the third upload is written (and would fail) on the request connection
+    assert direct == ["p3"]
+    assert store.metrics()["pending_writes"] == 2
+
+    assert not await store.flush()
+    assert store.metrics()["pending_writes"] == 2
+    assert not await store.flush()
+    assert store.metrics()["pending_writes"] == 0
+    assert store.metrics()["dropped"] == 2
+    store._task.cancel()
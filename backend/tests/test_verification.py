@@ -0,0 +1,171 @@
+import time
+
+import aiosqlite
+import pytest
+
+from backend.core.crypto_ed25519 import Ed25519Signer, b64u
+from backend.core.receipt import verify_receipt
+from backend.core.vc import sign_vc
+from backend.rate_limit import limiter
+from backend.server_keys import server_key
+from backend.settings import settings
+from backend.verification import revoked_ids, verify_vcs
+
+signer = Ed25519Signer()
+sk, pk = signer.generate_keypair()
+
+
+def _vc(jti: str) -> dict:
+    body = {
+        "jti": jti,
+        "issuer": "did:key:batch-issuer",
+        "credentialSubject": {"id": "did:key:batch-holder", "name": jti},
+    }
+    return sign_vc(body, signer, sk, b64u(pk), "did:key:batch-issuer#key-1")
+
+
+async def test_verify_vcs_keeps_order_and_flags_bad_signatures():
+    vcs = [_vc(f"vc-batch-{i}") for i in range(20)]
+    vcs[3]["credentialSubject"]["name"] = "tampered"
+    vcs[7] = {"jti": "vc-batch-noproof"}
+
+    results = await verify_vcs(vcs, signer)
+
+    assert len(results) == 20
+    assert results[3][:2] == (False, "invalid_signature")
+    assert results[7][:2] == (False, "missing_proof")
+    assert all(r[0] for i, r in enumerate(results) if i not in (3, 7))
+    assert results[0][2:] == ("did:key:batch-issuer", "did:key:batch-holder")
+
+
+async def test_revoked_ids_single_lookup():
+    now = int(time.time())
+    async with aiosqlite.connect(settings.SQLITE_PATH) as conn:
+        await conn.executemany(
+            "INSERT INTO vc_status(vc_id, issuer_did, subject_did, status, created_at, updated_at) VALUES(?,?,?,?,?,?)",
+            [
+                ("vc-batch-rev", "did:i", "did:s", "revoked", now, now),
+                ("vc-batch-ok", "did:i", "did:s", "valid", now, now),
+            ],
+        )
+        await conn.commit()
+        revoked = await revoked_ids(conn, ["vc-batch-rev", "vc-batch-ok", "vc-batch-unknown", None])
+    assert revoked == {"vc-batch-rev"}
+
+
+def test_batch_endpoint(client):
+    vcs = [_vc("vc-batch-endpoint-1"), _vc("vc-batch-rev")]
+    vcs.append({**vcs[0], "jti": "vc-batch-endpoint-forged"})
+
+    resp = client.post("/api/vc/verify/batch", json={"vcs": vcs})
+    assert resp.status_code == 200, resp.text
+    data = resp.json()
+    assert data["total"] == 3
+    assert data["valid_count"] == 1
+    assert [(r["index"], r["valid"], r["reason"]) for r in data["results"]] == [
+        (0, True, "ok"),
+        (1, False, "revoked"),
+        (2, False, "invalid_signature"),
+    ]
+
+
+
+def test_batch_endpoint_charges_per_credential(client, monkeypatch):
+    monkeypatch.setattr(settings, "VERIFY_BATCH_RATE_LIMIT", "3/minute")
+    vcs = [_vc("vc-batch-budget-1"), _vc("vc-batch-budget-2")]
+    limiter.reset()
+
+    assert client.post("/api/vc/verify/batch", json={"vcs": vcs}).status_code == 200
+    # Two of three credentials are used up, so a second batch of two is refused
+    assert client.post("/api/vc/verify/batch", json={"vcs": vcs}).status_code == 429
+    assert client.post("/api/vc/verify/batch", json={"vcs": vcs[:1]}).status_code == 200
+    limiter.reset()
+
+
+def _presentation(client, vcs, holder_sk, holder_pk):
+    ch = client.post("/api/challenge/new", json={"audience": "kiosk"}).json()
+    msg = "|".join([ch["challenge"], "kiosk", str(ch["expires_at"])]).encode()
+    return {
+        "type": "presentation",
+        "challenge": ch["challenge"],
+        "aud": "kiosk",
+        "exp": ch["expires_at"],
+        "holder": {
+            "did": f"did:key:z{b64u(holder_pk)}",
+            "pk_b64u": b64u(holder_pk),
+            "sig_b64u": b64u(signer.sign(holder_sk, msg)),
+            "alg": "Ed25519",
+        },
+        "vcs": vcs,
+    }
+
+
+def test_present_verify_multiple_vcs(client):
+    holder_sk, holder_pk = signer.generate_keypair()
+    holder_did = f"did:key:z{b64u(holder_pk)}"
+
+    def held(jti):
+        body = {"jti": jti, "issuer": "did:key:batch-issuer", "credentialSubject": {"id": holder_did}}
+        return sign_vc(body, signer, sk, b64u(pk), "did:key:batch-issuer#key-1")
+
+    payload = _presentation(client, [held("vc-present-1"), held("vc-batch-rev")], holder_sk, holder_pk)
+    resp = client.post("/api/present/verify", json=payload)
+    assert resp.status_code == 200, resp.text
+    data = resp.json()
+    assert data["valid"] is False
+    assert data["reason"] == "revoked"
+    assert [(r["vc_id"], r["valid"]) for r in data["results"]] == [("vc-present-1", True), ("vc-batch-rev", False)]
+
+    # The challenge is consumed once for the whole presentation
+    replay = client.post("/api/present/verify", json=payload)
+    assert replay.status_code == 409
+
+
+
+def test_present_verify_receipt(client):
+    holder_sk, holder_pk = signer.generate_keypair()
+    holder_did = f"did:key:z{b64u(holder_pk)}"
+    body = {"jti": "vc-receipt-1", "issuer": "did:key:batch-issuer", "credentialSubject": {"id": holder_did}}
+    vc = sign_vc(body, signer, sk, b64u(pk), "did:key:batch-issuer#key-1")
+
+    payload = _presentation(client, [vc], holder_sk, holder_pk)
+    resp = client.post("/api/present/verify?receipt=true", json=payload)
+    assert resp.status_code == 200, resp.text
+    claims = verify_receipt(resp.json()["receipt"], server_key().pk, audience="kiosk", issuer=settings.RECEIPT_ISSUER)
+    assert (claims["sub"], claims["aud"], claims["valid"]) == (holder_did, "kiosk", True)
+    assert claims["vc_ids"] == ["vc-receipt-1"]
+    assert claims["vc_iss"] == ["did:key:batch-issuer"]
+    with pytest.raises(ValueError, match="receipt_audience_mismatch"):
+        verify_receipt(resp.json()["receipt"], server_key().pk, audience="other-gate")
+    with pytest.raises(ValueError, match="receipt_issuer_mismatch"):
+        verify_receipt(resp.json()["receipt"], server_key().pk, issuer="someone-else")
+    assert claims["exp"] - claims["iat"] == settings.RECEIPT_TTL_SECONDS
+
+    tampered = resp.json()["receipt"][:-4] + "AAAA"
+    with pytest.raises(ValueError, match="bad_receipt_signature"):
+        verify_receipt(tampered, server_key().pk)
+
+    # Receipts are opt-in
+    plain = client.post("/api/present/verify", json=_presentation(client, [vc], holder_sk, holder_pk))
+    assert plain.json().get("receipt") is None
+
+def test_verify_cache_reuses_verdicts_and_tracks_payload():
+    from backend.verification import VerifyCache, verify_vc_cached, verify_cache
+
+    vc = _vc("vc-cache-1")
+    before = verify_cache.metrics()
+    assert verify_vc_cached(vc, signer)[0] is True
+    assert verify_vc_cached(vc, signer)[0] is True
+    after = verify_cache.metrics()
+    assert after["hits"] == before["hits"] + 1
+
+    # Any change to the signed payload is a different cache key
+    forged = {**vc, "credentialSubject": {"id": "did:key:someone-else"}}
+    assert VerifyCache.key(forged) != VerifyCache.key(vc)
+    assert verify_vc_cached(forged, signer)[:2] == (False, "invalid_signature")
+
+    small = VerifyCache(max_entries=2)
+    for i in range(3):
+        small.put(f"k{i}", (True, "ok", None, None))
+    assert small.get("k0") is None
+    assert small.metrics()["evictions"] == 1
@@ -0,0 +1,89 @@
+import sqlite3
+import time
+
+import aiosqlite
+from fastapi.testclient import TestClient
+
+from backend.audit import audit_sink
+from backend.challenge_store import challenge_store
+from backend.core.crypto_ed25519 import Ed25519Signer, b64u
+from backend.core.vc import sign_vc
+from backend.revocation_index import RevocationIndex
+from backend.settings import settings
+from conftest import TEST_AUDIT_PATH, TEST_CHALLENGES_PATH
+
+signer = Ed25519Signer()
+
+
+async def test_revocation_index_follows_trust_changes():
+    now = int(time.time())
+    async with aiosqlite.connect(settings.SQLITE_PATH) as conn:
+        await conn.execute(
+            "INSERT INTO vc_status(vc_id, issuer_did, subject_did, status, created_at, updated_at) VALUES(?,?,?,?,?,?)",
+            ("vc-index-1", "did:i", "did:s", "revoked", now, now),
+        )
+        await conn.commit()
+
+        index = RevocationIndex(refresh_ms=1000)
+        await index.load(conn)
+        assert index.revoked(["vc-index-1", "vc-index-2"]) == {"vc-index-1"}
+
+        await conn.execute("UPDATE vc_status SET status='valid' WHERE vc_id='vc-index-1'")
+        await conn.execute(
+            "INSERT INTO vc_status(vc_id, issuer_did, subject_did, status, created_at, updated_at) VALUES(?,?,?,?,?,?)",
+            ("vc-index-2", "did:i", "did:s", "suspended", now, now),
+        )
+        await conn.commit()
+        assert await index.refresh(conn) == 2
+    assert index.revoked(["vc-index-1"]) == set()
+    assert index.status("vc-index-2") == "suspended"
+
+
+def test_verify_profile_mounts_only_verification_routes(monkeypatch):
+    from app import create_app
+
+    monkeypatch.setattr(settings, "CHALLENGE_STORE_URI", f"sqlite://{TEST_CHALLENGES_PATH}")
+    monkeypatch.setattr(settings, "AUDIT_STORE_URI", f"sqlite://{TEST_AUDIT_PATH}")
+    # Every connection to the main database must be read-only
+    connect = aiosqlite.connect
+    opened = []
+
+    def recording_connect(database, *args, **kwargs):
+        if settings.SQLITE_PATH in str(database):
+            opened.append(str(database))
+        return connect(database, *args, **kwargs)
+
+    monkeypatch.setattr(aiosqlite, "connect", recording_connect)
+    previous_uri, previous_audit_uri = challenge_store.uri, audit_sink.uri
+    try:
+        challenge_store.configure(f"sqlite://{TEST_CHALLENGES_PATH}")
+        audit_sink.configure(f"sqlite://{TEST_AUDIT_PATH}")
+        with TestClient(create_app("verify")) as client:
+            assert client.post("/api/admin/login", json={"username": "a", "password": "b"}).status_code == 404
+            assert client.get("/api/status/unknown-vc").json()["status"] == "unknown"
+
+            sk, pk = signer.generate_keypair()
+            holder_did = f"did:key:z{b64u(pk)}"
+            vc = sign_vc({"jti": "vc-verify-profile", "issuer": "did:key:edge", "credentialSubject": {"id": holder_did}},
+                         signer, sk, b64u(pk), "did:key:edge#key-1")
+            ch = client.post("/api/challenge/new", json={"audience": "gate"}).json()
+            msg = "|".join([ch["challenge"], "gate", str(ch["expires_at"])]).encode()
+            payload = {
+                "type": "presentation", "challenge": ch["challenge"], "aud": "gate", "exp": ch["expires_at"],
+                "holder": {"did": holder_did, "pk_b64u": b64u(pk), "sig_b64u": b64u(signer.sign(sk, msg))},
+                "vc": vc,
+            }
+            resp = client.post("/api/present/verify", json=payload)
+            assert resp.status_code == 200, resp.text
+            assert resp.json()["valid"] is True
+            assert client.post("/api/present/verify", json=payload).status_code == 409
+            assert client.post("/api/vc/verify", json={"vc": vc}).status_code == 200
+        assert opened and all(db.endswith("?mode=ro") for db in opened), opened
+
+        # Verification traffic is still audited, in the separate audit store
+        with sqlite3.connect(TEST_AUDIT_PATH) as conn:
+            actions = [r[0] for r in conn.execute("SELECT action FROM audit_logs WHERE vc_id='vc-verify-profile'")]
+        assert "present_verify" in actions and "vc_verify_simple" in actions
+    finally:
+        challenge_store.configure(previous_uri)
+        audit_sink.configure(previous_audit_uri)
@@ -0,0 +1,183 @@
+"""
+Temporary Payload Store
+Memory tier in front of the tmp_payloads table for /present/upload and
+/present/tmp/{pid}. Payloads are kept as the original request bytes, so a
+GET is answered without parsing or re-serialising JSON.
+
+The memory tier is bounded by entry count (TMP_PAYLOAD_MEMORY_MAX_ITEMS)
+and total bytes (TMP_PAYLOAD_MEMORY_MAX_BYTES). Expired entries go first,
+in expiry order; if that is not enough, the least recently used ones go.
+
+Rows are also written to SQLite behind the request (batched every
+TMP_PAYLOAD_FLUSH_MS), so other worker processes, and this one after an
+eviction, can still serve the payload from the database. A GET on another
+worker may miss a payload uploaded less than one flush interval earlier.
+
+A row whose write fails is retried on the next flushes, up to
+TMP_PAYLOAD_FLUSH_RETRIES attempts and only while it has not expired, then
+dropped. At most TMP_PAYLOAD_PENDING_MAX rows wait; beyond that uploads are
+written on the request's connection, so a failing database fails the
+upload instead of growing the queue.
+"""
+import asyncio
+import heapq
+import time
+from collections import OrderedDict, deque
+from typing import List, Optional, Tuple
+
+import aiosqlite
+
+from backend.settings import settings
+
+TMP_INSERT_SQL = "INSERT OR REPLACE INTO tmp_payloads(id, payload, created_at, expires_at) VALUES(?,?,?,?)"
+
+
+class TmpPayloadStore:
+    """Bounded in-memory payload cache with SQLite write-behind"""
+
+    def __init__(
+        self,
+        max_items: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        flush_interval_ms: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        max_retries: Optional[int] = None,
+    ):
+        self.max_items = max_items if max_items is not None else settings.TMP_PAYLOAD_MEMORY_MAX_ITEMS
+        self.max_bytes = max_bytes if max_bytes is not None else settings.TMP_PAYLOAD_MEMORY_MAX_BYTES
+        self.flush_interval = (flush_interval_ms or settings.TMP_PAYLOAD_FLUSH_MS) / 1000
+        self.max_pending = max_pending or settings.TMP_PAYLOAD_PENDING_MAX
+        self.max_retries = max_retries or settings.TMP_PAYLOAD_FLUSH_RETRIES
+        self._entries: "OrderedDict[str, Tuple[int, bytes]]" = OrderedDict()  # pid -> (expires_at, body), LRU order
+        self._expiry: List[Tuple[int, str]] = []  # heap of (expires_at, pid); may hold stale pairs
+        self._bytes = 0
+        self._pending: deque = deque()  # (row, failed attempts)
+        self._task: Optional[asyncio.Task] = None
+        self._conn: Optional[aiosqlite.Connection] = None
+        self._stopping = False
+        self.stats = {
+            "hits": 0, "misses": 0, "expired_evictions": 0, "lru_evictions": 0,
+            "written": 0, "flushes": 0, "errors": 0, "dropped": 0, "direct_writes": 0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done() and not self._stopping
+
+    def _drop(self, pid: str) -> None:
+        entry = self._entries.pop(pid, None)
+        if entry is not None:
+            self._bytes -= len(entry[1])
+
+    def _evict(self, now: int) -> None:
+        while self._expiry and self._expiry[0][0] < now:
+            expires_at, pid = heapq.heappop(self._expiry)
+            entry = self._entries.get(pid)
+            if entry is not None and entry[0] == expires_at:
+                self._drop(pid)
+                self.stats["expired_evictions"] += 1
+        while self._entries and (len(self._entries) > self.max_items or self._bytes > self.max_bytes):
+            pid, (_, body) = self._entries.popitem(last=False)
+            self._bytes -= len(body)
+            self.stats["lru_evictions"] += 1
+        if len(self._expiry) > 2 * len(self._entries) + 64:
+            self._expiry = [(e, pid) for pid, (e, _) in self._entries.items()]
+            heapq.heapify(self._expiry)
+
+    async def put(self, db: aiosqlite.Connection, pid: str, body: bytes, created_at: int, expires_at: int) -> None:
+        """Keep the payload in memory and queue its row; without the background
+        writer, or with the queue full, the row is inserted on `db` and the caller commits"""
+        if len(body) <= self.max_bytes:
+            self._drop(pid)
+            self._entries[pid] = (expires_at, body)
+            self._bytes += len(body)
+            heapq.heappush(self._expiry, (expires_at, pid))
+            self._evict(created_at)
+
+        row = (pid, body.decode("utf-8"), created_at, expires_at)
+        if self.running and len(self._pending) < self.max_pending:
+            self._pending.append((row, 0))
+        else:
+            if self.running:
+                self.stats["direct_writes"] += 1
+            await db.execute(TMP_INSERT_SQL, row)
+
+    def get(self, pid: str) -> Optional[Tuple[bytes, int]]:
+        """(body, expires_at) from memory, or None if this process does not hold it"""
+        entry = self._entries.get(pid)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        self._entries.move_to_end(pid)
+        self.stats["hits"] += 1
+        return entry[1], entry[0]
+
+    def discard(self, pid: str) -> None:
+        self._drop(pid)
+
+    async def start(self):
+        if self.running:
+            return
+        self._stopping = False
+        self._conn = await aiosqlite.connect(settings.SQLITE_PATH)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the writer and flush the rows still queued"""
+        if self._task is not None:
+            self._stopping = True
+            await self._task
+            self._task = None
+        if self._conn is not None:
+            await self.flush()
+            await self._conn.close()
+            self._conn = None
+
+    async def flush(self) -> bool:
+        if not self._pending:
+            return True
+        entries = list(self._pending)
+        self._pending.clear()
+        try:
+            await self._conn.executemany(TMP_INSERT_SQL, [row for row, _ in entries])
+            await self._conn.commit()
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"Tmp payloads: flush of {len(entries)} rows failed: {e}")
+            try:
+                await self._conn.rollback()
+            except Exception:
+                pass
+            # Retry in order, but give up on rows that keep failing or have expired anyway
+            now = int(time.time())
+            retry = [(row, attempts + 1) for row, attempts in entries
+                     if attempts + 1 < self.max_retries and row[3] >= now]
+            self.stats["dropped"] += len(entries) - len(retry)
+            self._pending.extendleft(reversed(retry))
+            return False
+        self.stats["written"] += len(entries)
+        self.stats["flushes"] += 1
+        return True
+
+    async def _run(self):
+        while not self._stopping:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                self._evict(int(time.time()))
+            except Exception as e:
+                print(f"Tmp payloads: run failed: {e}")
+
+    def metrics(self) -> dict:
+        return {
+            "running": self.running,
+            "items": len(self._entries),
+            "bytes": self._bytes,
+            "max_items": self.max_items,
+            "max_bytes": self.max_bytes,
+            "pending_writes": len(self._pending),
+            **self.stats,
+        }
+
+
+tmp_payload_store = TmpPayloadStore()
@@ -0,0 +1,276 @@
+"""
+Credential Verification
+Shared helpers for the verify endpoints. Ed25519 signature checks are CPU
+bound, so batches are spread over a thread pool (the cryptography backend
+releases the GIL while verifying) instead of running one after another on
+the event loop. Revocation state for a whole batch is read with a single
+`IN (...)` query.
+
+Signature verdicts are memoised in a bounded LRU keyed by a hash of the
+JWS signing input, signature and issuer key, so re-presented credentials
+skip the Ed25519 check. Revocation is never cached and is always read fresh.
+Issuer trust comes from the in-memory issuer_registry.
+
+Presentation checks can optionally return a short-lived receipt signed with
+the server key (see core/receipt.py).
+"""
+import asyncio
+import hashlib
+import os
+import secrets
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import aiosqlite
+
+from backend.core.crypto_base import Signer
+from backend.core.presentation import check_holder, split_presentation
+from backend.core.receipt import sign_receipt
+from backend.core.vc import jws_message, verify_vc
+from backend.issuer_registry import issuer_registry
+from backend.revocation_index import revocation_index
+from backend.audit import audit_row
+from backend.schemas import VerifyBatchItem, VerifyResp
+from backend.server_keys import server_key
+from backend.settings import settings
+
+VerifyResult = Tuple[bool, str, Optional[str], Optional[str]]
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_pid: Optional[int] = None
+
+
+def verify_workers() -> int:
+    return settings.VERIFY_WORKERS or os.cpu_count() or 1
+
+
+def _pool() -> ThreadPoolExecutor:
+    # Threads do not survive a fork, so each worker process builds its own pool
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        _executor = ThreadPoolExecutor(max_workers=verify_workers(), thread_name_prefix="vc-verify")
+        _executor_pid = os.getpid()
+    return _executor
+
+
+def vc_identifier(vc: Dict) -> Optional[str]:
+    """The id a credential is tracked under in vc_status"""
+    if not isinstance(vc, dict):
+        return None
+    return vc.get("jti") or vc.get("id")
+
+
+class VerifyCache:
+    """Thread-safe bounded LRU of signature verdicts"""
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries if max_entries is not None else settings.VERIFY_CACHE_SIZE
+        self._entries: "OrderedDict[str, VerifyResult]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def key(vc: Dict) -> Optional[str]:
+        """Hash of exactly what the signature covers; None if the VC has no proof"""
+        proof = vc.get("proof")
+        if not isinstance(proof, dict) or not (proof.get("jws") and proof.get("issuer_pk_b64u")):
+            return None
+        try:
+            payload = {k: v for k, v in vc.items() if k != "proof"}
+            msg = jws_message({"alg": "EdDSA", "typ": "JWT"}, payload)
+        except (TypeError, ValueError):
+            return None
+        digest = hashlib.sha256(msg)
+        digest.update(b"|" + str(proof["jws"]).encode() + b"|" + str(proof["issuer_pk_b64u"]).encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[VerifyResult]:
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return result
+
+    def put(self, key: str, result: VerifyResult) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "max_entries": self.max_entries, **self.stats}
+
+
+verify_cache = VerifyCache()
+
+
+def verify_vc_cached(vc: Dict, signer: Signer) -> VerifyResult:
+    """verify_vc() with the verdict memoised in verify_cache"""
+    if not isinstance(vc, dict):
+        return False, "bad_vc", None, None
+    key = verify_cache.key(vc)
+    if key is not None:
+        cached = verify_cache.get(key)
+        if cached is not None:
+            return cached
+    result = verify_vc(vc, signer)
+    if key is not None:
+        verify_cache.put(key, result)
+    return result
+
+
+def issuer_trusted(vc: Dict) -> bool:
+    """Registry check: the VC's issuer is trusted and signed with its registered key"""
+    if not isinstance(vc, dict):
+        return False
+    issuer = vc.get("issuer")
+    if isinstance(issuer, dict):
+        issuer = issuer.get("id")
+    proof = vc.get("proof")
+    pk_b64u = proof.get("issuer_pk_b64u") if isinstance(proof, dict) else None
+    return issuer_registry.is_trusted(issuer, pk_b64u)
+
+
+def _verify_chunk(vcs: List[Dict], signer: Signer) -> List[VerifyResult]:
+    return [verify_vc_cached(vc, signer) for vc in vcs]
+
+
+async def verify_vcs(vcs: List[Dict], signer: Signer) -> List[VerifyResult]:
+    """Verify many VC signatures concurrently; results keep the input order"""
+    if not vcs:
+        return []
+    pool = _pool()
+    # One task per worker keeps executor overhead flat for large batches
+    size = max(1, -(-len(vcs) // verify_workers()))
+    loop = asyncio.get_running_loop()
+    chunks = await asyncio.gather(*(
+        loop.run_in_executor(pool, _verify_chunk, vcs[i:i + size], signer)
+        for i in range(0, len(vcs), size)
+    ))
+    return [result for chunk in chunks for result in chunk]
+
+
+async def revoked_ids(db: aiosqlite.Connection, vc_ids: Iterable[Optional[str]]) -> Set[str]:
+    """Return which of `vc_ids` are revoked, using one query per 500 ids
+    (or the in-memory revocation_index when the verify-only profile runs it)"""
+    if revocation_index.active:
+        return revocation_index.revoked(vc_ids)
+    ids = sorted({i for i in vc_ids if i})
+    revoked: Set[str] = set()
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        cur = await db.execute(
+            f"SELECT vc_id FROM vc_status WHERE status='revoked' AND vc_id IN ({','.join('?' * len(chunk))})",
+            chunk,
+        )
+        revoked.update(r[0] for r in await cur.fetchall())
+    return revoked
+
+
+async def expired_ids(db: aiosqlite.Connection, vc_ids: Iterable[Optional[str]], now: int) -> Set[str]:
+    """Return which of `vc_ids` have expired, from the expires_at extracted at
+    issuance or an 'expired' status (the verify-only profile's revocation_index
+    only sees the latter, i.e. expiries the sweep has already applied)"""
+    if revocation_index.active:
+        return revocation_index.expired(vc_ids)
+    ids = sorted({i for i in vc_ids if i})
+    expired: Set[str] = set()
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        marks = ",".join("?" * len(chunk))
+        cur = await db.execute(
+            f"SELECT vc_id FROM issued_vcs WHERE expires_at <= ? AND vc_id IN ({marks}) "
+            f"UNION SELECT vc_id FROM vc_status WHERE status='expired' AND vc_id IN ({marks})",
+            [now, *chunk, *chunk],
+        )
+        expired.update(r[0] for r in await cur.fetchall())
+    return expired
+
+
+def presentation_vcs(payload: Dict) -> Tuple[bool, List]:
+    """(multi, vcs) of a presentation, at most VERIFY_BATCH_MAX credentials; raises ValueError"""
+    return split_presentation(payload, settings.VERIFY_BATCH_MAX)
+
+
+def presentation_outcome(
+    action: str,
+    vcs: List[Dict],
+    verdicts: List[VerifyResult],
+    revoked_set: Set[str],
+    multi: bool,
+    now: int,
+    expired_set: Set[str] = frozenset(),
+) -> Tuple[VerifyResp, List[tuple]]:
+    """Response and audit rows for a presentation whose signatures and holder checked out"""
+    results = []
+    audit_rows = []
+    for index, (vc, (_, _, issuer, subject)) in enumerate(zip(vcs, verdicts)):
+        vc_id = vc_identifier(vc)
+        revoked = vc_id in revoked_set
+        trusted = issuer_trusted(vc)
+        if revoked:
+            reason = "revoked"
+        elif vc_id in expired_set:
+            reason = "expired"
+        elif not trusted and settings.VERIFY_REQUIRE_TRUSTED_ISSUER:
+            reason = "untrusted_issuer"
+        else:
+            reason = "ok"
+        results.append(VerifyBatchItem(index=index, vc_id=vc_id, valid=reason == "ok", reason=reason,
+                                       issuer=issuer, subject=subject, revoked=revoked, issuer_trusted=trusted))
+        audit_rows.append(audit_row(action, "revoked" if revoked else ("ok" if reason == "ok" else "fail"),
+                                    did_issuer=issuer, did_subject=subject, vc_id=vc_id,
+                                    meta={"revoked": revoked, "expired": reason == "expired",
+                                          "issuer_trusted": trusted}, ts=now))
+
+    first = results[0]
+    failed = next((r for r in results if not r.valid), None)
+    resp = VerifyResp(
+        valid=failed is None,
+        reason=failed.reason if failed else "ok",
+        issuer=first.issuer,
+        subject=first.subject,
+        revoked=any(r.revoked for r in results),
+        issuer_trusted=all(r.issuer_trusted for r in results),
+        results=results if multi else None,
+    )
+    return resp, audit_rows
+
+
+def presentation_receipt(resp: VerifyResp, payload: Dict, vcs: List[Dict], signer: Signer, now: int) -> str:
+    """Signed receipt over the outcome of a presentation check"""
+    holder = payload.get("holder") or {}
+    claims = {
+        "iss": settings.RECEIPT_ISSUER,
+        "sub": holder.get("did") or resp.subject,
+        "aud": payload.get("aud") or "",
+        "iat": now,
+        "exp": now + settings.RECEIPT_TTL_SECONDS,
+        "jti": secrets.token_urlsafe(12),
+        "valid": resp.valid,
+        "reason": resp.reason,
+        "revoked": resp.revoked,
+        "issuer_trusted": resp.issuer_trusted,
+        "vc_iss": [r.issuer for r in resp.results] if resp.results else [resp.issuer],  # per VC, like vc_ids
+        "vc_ids": [vc_identifier(vc) for vc in vcs],
+    }
+    key = server_key()
+    return sign_receipt(claims, signer, key.sk, key.kid)
+
+
+# HTTP status for check_holder() errors other than 400
+HOLDER_ERROR_STATUS = {"bad_holder_signature": 401}